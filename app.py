@@ -1,9 +1,17 @@
+import importlib
+import threading
 from typing import Callable
 
 import streamlit as st
 
-from src.web.mypages.homepage import page as homepage
-from src.web.mypages.rag.qa import main as rag_main
+# Mapeamento de páginas disponíveis. Os módulos são importados apenas quando
+# a página é aberta, para que a página inicial não carregue o ChromaDB, a
+# OpenAI e o modelo de embeddings.
+PAGES = {
+    "home": "src.web.mypages.homepage:page",
+    "rag": "src.web.mypages.rag.qa:main",
+    "analytics": "src.web.mypages.analytics:main",
+}
 
 
 def create_button(
@@ -37,14 +45,66 @@ def change_page(name: str) -> None:
     st.session_state["page"] = name
 
 
+def load_page(name: str) -> Callable[[], None]:
+    """Importa o módulo da página e retorna a função que a renderiza.
+
+    Args:
+        name (str): Nome da página.
+
+    Returns:
+        Callable[[], None]: Função de renderização da página.
+    """
+    module_name, function_name = PAGES[name].split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+@st.cache_resource(show_spinner=False)
+def serve_metrics() -> None:
+    """Inicia, uma única vez por processo, o servidor de métricas do
+    Prometheus na porta `METRICS_PORT`, se definida."""
+    from src.config import settings  # noqa: PLC0415
+
+    if settings.METRICS_PORT:
+        from src.metrics import start_metrics_server  # noqa: PLC0415
+
+        start_metrics_server(settings.METRICS_PORT)
+
+
+def _warm_up() -> None:
+    from src.retrieval import warm_up  # noqa: PLC0415
+
+    warm_up()
+
+
+@st.cache_resource(show_spinner=False)
+def warm_up_models() -> threading.Thread | None:
+    """Inicia, uma única vez por processo, o carregamento do modelo de
+    embeddings em segundo plano, antes da primeira consulta.
+
+    Não faz nada quando as buscas (`SEARCH_API_URL`) ou os embeddings
+    (`EMBEDDING_SERVER_URL`) ficam a cargo de outro serviço, pois o modelo
+    não é carregado neste processo.
+    """
+    from src.config import settings  # noqa: PLC0415
+
+    if settings.SEARCH_API_URL or settings.EMBEDDING_SERVER_URL:
+        return None
+    thread = threading.Thread(target=_warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
 def main():
-    # Configurações da página
+    # Configurações da página; deve ser o primeiro comando do Streamlit.
     st.set_page_config(
         page_title="Teses e Dissertações - Buscador",
         page_icon=":books:",
         layout="wide",
     )
 
+    serve_metrics()
+    warm_up_models()
+
     with open("src/web/static/style.css", encoding="utf-8") as f:
         st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
 
@@ -59,12 +119,6 @@ def main():
         unsafe_allow_html=True,
     )
 
-    # Mapeamento de páginas disponíveis
-    pages = {
-        "home": homepage,
-        "rag": rag_main,
-    }
-
     # Inicialização da página atual
     if "page" not in st.session_state:
         st.session_state["page"] = "home"
@@ -73,6 +127,9 @@ def main():
     current_page = st.session_state["page"]
     create_button("🏠 Página Inicial", "home", current_page, change_page)
     create_button("📚 Consultar trabalhos", "rag", current_page, change_page)
+    create_button(
+        "📊 Estatísticas do catálogo", "analytics", current_page, change_page
+    )
     st.sidebar.markdown(
         "<h3 class='submenu'> 📫 Contato</h3>", unsafe_allow_html=True
     )
@@ -88,7 +145,7 @@ def main():
     )
 
     # Renderização da página atual
-    pages[current_page]()
+    load_page(current_page)()
 
 
 if __name__ == "__main__":
@@ -1,5 +1,7 @@
 import nox
 
+nox.options.sessions = ["test_unit"]
+
 py_versions = [
     "3.12",
     "3.11",
@@ -12,3 +14,23 @@ def test_unit(session: nox.Session):
     session.install("pytest")
     session.install("-e", ".[unit]")
     session.run("pytest", "-s", "tests/unit")
+
+
+@nox.session(python="3.12", venv_backend="uv")
+def benchmark(session: nox.Session):
+    """Executa os benchmarks e salva os resultados em `.benchmarks/`.
+
+    Exemplos:
+        nox -s benchmark
+        BENCHMARK_SCALES=10000,100000,1000000 nox -s benchmark
+        nox -s benchmark -- --benchmark-compare \
+            --benchmark-compare-fail=mean:10%
+    """
+    session.install("-e", ".[benchmark]")
+    session.run(
+        "pytest",
+        "tests/benchmarks",
+        "--benchmark-autosave",
+        "--benchmark-json=.benchmarks/results.json",
+        *session.posargs,
+    )
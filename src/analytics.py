@@ -0,0 +1,154 @@
+"""Consultas analíticas sobre o catálogo de teses em Parquet.
+
+Contagens por ano, área e UF, principais instituições e busca por palavras
+do título, calculadas com `pyarrow.compute` diretamente sobre o arquivo
+gerado por `src/download.py` (local ou no MinIO, via `s3fs`), sem passar
+pelo LLM nem pelo ChromaDB. Apenas as colunas usadas são lidas do arquivo.
+"""
+
+import fsspec
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from src.config import logger
+
+CATALOG_COLUMNS = [
+    "AN_BASE",
+    "SG_ENTIDADE_ENSINO",
+    "NM_ENTIDADE_ENSINO",
+    "NM_PRODUCAO",
+    "NM_GRAU_ACADEMICO",
+    "NM_REGIAO",
+    "SG_UF_IES",
+    "NM_GRANDE_AREA_CONHECIMENTO",
+    "NM_AREA_CONHECIMENTO",
+]
+FILTER_COLUMNS = [
+    "SG_UF_IES",
+    "NM_REGIAO",
+    "NM_GRAU_ACADEMICO",
+    "NM_GRANDE_AREA_CONHECIMENTO",
+]
+
+
+def load_catalog(path: str, columns: list[str] = CATALOG_COLUMNS) -> pa.Table:
+    """Lê as colunas informadas do catálogo.
+
+    Args:
+        path (str): Arquivo Parquet, local ou `s3://`.
+        columns (list[str], optional): Colunas lidas. Defaults to
+        CATALOG_COLUMNS.
+
+    Returns:
+        pa.Table: Tabela com as colunas selecionadas.
+    """
+    filesystem, path = fsspec.core.url_to_fs(path)
+    dataset = ds.dataset(path, filesystem=filesystem, format="parquet")
+    columns = [name for name in columns if name in dataset.schema.names]
+    table = dataset.to_table(columns=columns)
+    logger.info(f"Loaded {table.num_rows} catalog rows ({columns})")
+    return table
+
+
+def filter_catalog(
+    table: pa.Table,
+    years: tuple[int, int] | None = None,
+    **filters: list,
+) -> pa.Table:
+    """Aplica filtros exatos ao catálogo.
+
+    Args:
+        table (pa.Table): Catálogo.
+        years (tuple[int, int] | None, optional): Intervalo de `AN_BASE`,
+        inclusive. Defaults to None.
+        **filters (list): Valores aceitos em cada coluna; listas vazias
+        são ignoradas.
+
+    Returns:
+        pa.Table: Registros que satisfazem todos os filtros.
+    """
+    conditions = []
+    if years is not None:
+        conditions.append(
+            pc.and_(
+                pc.greater_equal(table["AN_BASE"], years[0]),
+                pc.less_equal(table["AN_BASE"], years[1]),
+            )
+        )
+    for column, values in filters.items():
+        if values:
+            value_type = table[column].type
+            # Colunas categóricas do catálogo são lidas como dicionários.
+            if pa.types.is_dictionary(value_type):
+                value_type = value_type.value_type
+            conditions.append(
+                pc.is_in(
+                    table[column],
+                    value_set=pa.array(values, type=value_type),
+                )
+            )
+    if not conditions:
+        return table
+    mask = conditions[0]
+    for condition in conditions[1:]:
+        mask = pc.and_(mask, condition)
+    return table.filter(mask)
+
+
+def count_by(table: pa.Table, column: str) -> pd.DataFrame:
+    """Conta os trabalhos por valor de uma coluna, em ordem decrescente."""
+    counts = table.group_by(column).aggregate([(column, "count")])
+    return (
+        counts.to_pandas()
+        .rename(columns={f"{column}_count": "trabalhos"})
+        .sort_values("trabalhos", ascending=False, ignore_index=True)
+    )
+
+
+def count_by_year(table: pa.Table) -> pd.DataFrame:
+    """Conta os trabalhos por ano, em ordem cronológica."""
+    return count_by(table, "AN_BASE").sort_values("AN_BASE", ignore_index=True)
+
+
+def top_institutions(table: pa.Table, n: int = 10) -> pd.DataFrame:
+    """Instituições com mais trabalhos."""
+    counts = table.group_by(
+        ["SG_ENTIDADE_ENSINO", "NM_ENTIDADE_ENSINO"]
+    ).aggregate([("SG_ENTIDADE_ENSINO", "count")])
+    return (
+        counts.to_pandas()
+        .rename(columns={"SG_ENTIDADE_ENSINO_count": "trabalhos"})
+        .nlargest(n, "trabalhos")
+        .reset_index(drop=True)
+    )
+
+
+def search_titles(
+    table: pa.Table, keywords: str, limit: int = 100
+) -> pd.DataFrame:
+    """Busca os trabalhos cujo título contém todas as palavras informadas,
+    sem diferenciar maiúsculas de minúsculas.
+
+    Args:
+        table (pa.Table): Catálogo.
+        keywords (str): Palavras buscadas.
+        limit (int, optional): Máximo de resultados. Defaults to 100.
+
+    Returns:
+        pd.DataFrame: Trabalhos encontrados, dos mais recentes aos mais
+        antigos.
+    """
+    mask = None
+    for word in keywords.split():
+        condition = pc.match_substring(
+            table["NM_PRODUCAO"], word, ignore_case=True
+        )
+        mask = condition if mask is None else pc.and_(mask, condition)
+    if mask is None:
+        return table.slice(0, 0).to_pandas()
+    # Títulos nulos são descartados pelo filtro.
+    result = table.filter(mask)
+    result = result.sort_by([("AN_BASE", "descending")]).slice(0, limit)
+    return result.to_pandas()
@@ -0,0 +1,235 @@
+"""Serviço HTTP de busca e resposta sobre as teses e dissertações.
+
+A coleção, o modelo de embeddings, o índice de facetas e os clientes são
+carregados uma única vez por worker, no início da aplicação. O cliente do
+ChromaDB mantém um pool de conexões HTTP reaproveitado entre as requisições.
+A coleção acompanha as trocas de versão do índice (ver
+`src/collection_alias.py`).
+
+Exemplo:
+    uvicorn src.api:app --host 0.0.0.0 --port 8080 --workers 4
+"""
+
+from contextlib import asynccontextmanager
+from http import HTTPStatus
+
+import openai
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from openai import AsyncOpenAI
+from pydantic import BaseModel, Field
+
+from src.cache import QueryEmbeddingCache, ResultCache
+from src.config import logger, settings
+from src.metrics import metrics_app, stage
+from src.rerank import candidate_count, get_reranker
+from src.resilience import CircuitOpenError
+from src.retrieval import (
+    aget_agent_response,
+    attach_abstracts,
+    build_answer_text,
+    connect_collection,
+    fetch_abstracts,
+    get_embedding_function,
+    load_prompts,
+    search_documents,
+    select_context,
+)
+
+
+class SearchRequest(BaseModel):
+    query: str
+    where: dict | None = None
+    n_results: int = Field(default=20, ge=1, le=100)
+    # Os resumos são omitidos por padrão; use `/documents` para buscá-los.
+    include_abstracts: bool = False
+
+
+class SearchResponse(BaseModel):
+    documents: list[dict]
+
+
+class DocumentsRequest(BaseModel):
+    ids: list[str] = Field(min_length=1, max_length=100)
+
+
+class DocumentsResponse(BaseModel):
+    abstracts: dict[str, str]
+
+
+class AnswerRequest(BaseModel):
+    question: str = Field(min_length=1)
+
+
+NO_ANSWER = "Não foi possível encontrar uma resposta."
+
+
+class AnswerResponse(BaseModel):
+    answer: str | None = None
+    ids: list[str]
+    query: str | None = None
+    where: dict | None = None
+    documents: list[dict]
+    # Contagem de trabalhos por faceta para os filtros da consulta, exibida
+    # pelo cliente Streamlit sem carregar o índice de facetas.
+    facet_counts: dict[str, dict[str, int]] | None = None
+
+
+def _facet_counts(facet_index, where: dict | None) -> dict | None:
+    if facet_index is None:
+        return None
+    return {
+        facet: {str(value): count for value, count in values.items()}
+        for facet, values in facet_index.counts(where).items()
+    }
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Carrega os recursos compartilhados pelas requisições do worker."""
+    app.state.collection = await run_in_threadpool(connect_collection)
+    app.state.query_encoder = QueryEmbeddingCache(
+        get_embedding_function(), maxsize=settings.QUERY_EMBEDDING_CACHE_SIZE
+    )
+    await run_in_threadpool(app.state.query_encoder, "aquecimento")
+    app.state.result_cache = ResultCache(
+        maxsize=settings.RESULT_CACHE_SIZE,
+        shared_dir=settings.RESULT_CACHE_SHARED_DIR,
+        version_ttl=settings.RESULT_CACHE_VERSION_TTL,
+    )
+    app.state.reranker = await run_in_threadpool(get_reranker)
+    app.state.prompt_chroma, app.state.prompt_rag = load_prompts()
+    # As novas tentativas são feitas por src/resilience.py.
+    app.state.openai = AsyncOpenAI(max_retries=0)
+    logger.info("Search API ready")
+    yield
+    await app.state.openai.close()
+
+
+app = FastAPI(title="Buscador de Teses e Dissertações", lifespan=lifespan)
+app.mount("/metrics", metrics_app())
+
+
+async def _search(request: Request, query: str, where, n_results: int):
+    return await run_in_threadpool(
+        search_documents,
+        request.app.state.collection,
+        query=query,
+        where=where,
+        n_results=n_results,
+        facet_index=request.app.state.collection.facet_index,
+        query_encoder=request.app.state.query_encoder,
+        result_cache=request.app.state.result_cache,
+    )
+
+
+async def _agent_response(text: str, prompt: str, client) -> dict:
+    """Chama o LLM, convertendo as falhas do serviço em erros HTTP: 503
+    quando ele está indisponível ou limitando as chamadas, e 502 para
+    erros e respostas inválidas."""
+    try:
+        response = await aget_agent_response(text, prompt, client)
+    except (
+        CircuitOpenError,
+        openai.APIConnectionError,
+        openai.RateLimitError,
+    ) as e:
+        logger.error(f"LLM unavailable: {e}")
+        raise HTTPException(
+            HTTPStatus.SERVICE_UNAVAILABLE, "LLM service unavailable"
+        ) from e
+    except (openai.APIError, ValueError) as e:
+        logger.error(f"LLM request failed: {e}")
+        raise HTTPException(
+            HTTPStatus.BAD_GATEWAY, "LLM service request failed"
+        ) from e
+    if not isinstance(response, dict):
+        logger.error(f"Unexpected LLM response: {response!r}")
+        raise HTTPException(
+            HTTPStatus.BAD_GATEWAY, "Invalid response from the LLM service"
+        )
+    return response
+
+
+@app.get("/health")
+async def health() -> dict:
+    return {"status": "ok"}
+
+
+@app.get("/stats")
+async def stats(request: Request) -> dict:
+    """Métricas de uso dos caches do worker."""
+    query_encoder = request.app.state.query_encoder
+    return {
+        "result_cache": request.app.state.result_cache.stats(),
+        "query_embedding_cache": {
+            "hits": query_encoder.hits,
+            "misses": query_encoder.misses,
+        },
+    }
+
+
+@app.post("/search")
+async def search(body: SearchRequest, request: Request) -> SearchResponse:
+    """Busca os documentos mais próximos da consulta."""
+    documents = await _search(request, body.query, body.where, body.n_results)
+    if body.include_abstracts:
+        documents = await run_in_threadpool(
+            attach_abstracts, request.app.state.collection, documents
+        )
+    return SearchResponse(documents=documents)
+
+
+@app.post("/documents")
+async def documents(
+    body: DocumentsRequest, request: Request
+) -> DocumentsResponse:
+    """Busca os resumos dos documentos pelos ids."""
+    abstracts = await run_in_threadpool(
+        fetch_abstracts, request.app.state.collection, body.ids
+    )
+    return DocumentsResponse(abstracts=abstracts)
+
+
+@app.post("/answer")
+async def answer(body: AnswerRequest, request: Request) -> AnswerResponse:
+    """Monta a consulta com o LLM, busca os documentos e gera a resposta."""
+    state = request.app.state
+    with stage("query_translation"):
+        chroma_query = await _agent_response(
+            body.question, state.prompt_chroma, state.openai
+        )
+    documents = await _search(
+        request,
+        chroma_query.get("query", body.question),
+        chroma_query.get("where"),
+        candidate_count(chroma_query.get("n_results", 20), state.reranker),
+    )
+    documents = await run_in_threadpool(
+        select_context,
+        state.collection,
+        body.question,
+        documents,
+        state.reranker,
+    )
+    text = build_answer_text(body.question, documents)
+    with stage("answer_generation"):
+        response = await _agent_response(text, state.prompt_rag, state.openai)
+    ids = [str(i) for i in response.get("ids") or []]
+    # Apenas os documentos citados na resposta levam o resumo.
+    documents = [
+        document
+        if str(document.get("id")) in ids
+        else {k: v for k, v in document.items() if k != "DS_RESUMO"}
+        for document in documents
+    ]
+    return AnswerResponse(
+        answer=response.get("answer") or NO_ANSWER,
+        ids=ids,
+        query=chroma_query.get("query"),
+        where=chroma_query.get("where"),
+        documents=documents,
+        facet_counts=_facet_counts(
+            state.collection.facet_index, chroma_query.get("where")
+        ),
+    )
@@ -0,0 +1,237 @@
+"""Consulta em lote de perguntas sobre as teses e dissertações.
+
+Lê perguntas de um arquivo JSONL, gera as consultas e respostas com o LLM
+em paralelo (com concorrência limitada), agrupa as buscas no Chroma em
+chamadas com várias consultas e grava os resultados em JSONL ou Parquet.
+
+Exemplo:
+    typer src/batch.py run perguntas.jsonl respostas.parquet
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import smart_open as so
+from openai import OpenAI
+from tqdm.auto import tqdm
+
+from src.cache import QueryEmbeddingCache
+from src.config import logger, settings
+from src.metrics import stage
+from src.rerank import candidate_count, get_reranker
+from src.retrieval import (
+    build_answer_text,
+    connect_collection,
+    get_agent_response,
+    get_embedding_function,
+    load_prompts,
+    search_documents_batch,
+    select_context,
+)
+
+
+def read_questions(path: str) -> list[dict]:
+    """Lê as perguntas de um arquivo JSONL.
+
+    Cada linha deve conter a chave `question` e, opcionalmente, um `id`.
+    Linhas sem `id` recebem o número da linha como identificador.
+
+    Args:
+        path (str): Caminho do arquivo JSONL, local ou no S3.
+
+    Returns:
+        list[dict]: Lista de perguntas.
+    """
+    questions = []
+    with so.open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            record.setdefault("id", line_number)
+            questions.append(record)
+    return questions
+
+
+def write_results(results: list[dict], path: str) -> None:
+    """Grava os resultados em JSONL ou Parquet, conforme a extensão.
+
+    Args:
+        results (list[dict]): Resultados das perguntas.
+        path (str): Caminho de destino (`.jsonl` ou `.parquet`).
+    """
+    if path.endswith(".parquet"):
+        df = pd.DataFrame(results)
+        for column in ("where", "documents", "ids"):
+            if column in df.columns:
+                df[column] = df[column].map(
+                    lambda value: json.dumps(value, ensure_ascii=False)
+                )
+        df.to_parquet(path)
+        return
+
+    with so.open(path, "w", encoding="utf-8") as f:
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False, default=str))
+            f.write("\n")
+
+
+def _safe_agent_response(
+    text: str, prompt: str, client: OpenAI, stage_name: str
+) -> dict:
+    try:
+        with stage(stage_name):
+            return get_agent_response(text, prompt, client)
+    except Exception as e:
+        logger.error(f"Error getting agent response: {e}")
+        return {"error": str(e)}
+
+
+def _map_concurrently(func, items: list, max_workers: int, desc: str):
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(
+            tqdm(executor.map(func, items), total=len(items), desc=desc)
+        )
+
+
+def answer_questions(  # noqa: PLR0913
+    questions: list[str],
+    client: OpenAI,
+    collection,
+    *,
+    facet_index=None,
+    query_encoder=None,
+    n_results: int = 20,
+    batch_size: int = 32,
+    max_workers: int = 8,
+    reranker=None,
+) -> list[dict]:
+    """Responde uma lista de perguntas.
+
+    Args:
+        questions (list[str]): Perguntas dos usuários.
+        client (OpenAI): Cliente da OpenAI.
+        collection (Collection): Coleção de teses e dissertações.
+        facet_index (FacetIndex, optional): Índice de facetas. Defaults to
+        None.
+        query_encoder (QueryEmbeddingCache, optional): Cache dos embeddings
+        das consultas. Defaults to None.
+        n_results (int, optional): Número de resultados por pergunta.
+        Defaults to 20.
+        batch_size (int, optional): Máximo de consultas por chamada ao
+        Chroma. Defaults to 32.
+        max_workers (int, optional): Máximo de chamadas simultâneas ao LLM.
+        Defaults to 8.
+        reranker (Reranker, optional): Modelo de reordenação dos
+        candidatos. Defaults to None.
+
+    Returns:
+        list[dict]: Consulta gerada, documentos recuperados e resposta de
+        cada pergunta, na mesma ordem de `questions`.
+    """
+    prompt_chroma, prompt_rag = load_prompts()
+
+    chroma_queries = _map_concurrently(
+        lambda question: _safe_agent_response(
+            question, prompt_chroma, client, "query_translation"
+        ),
+        questions,
+        max_workers,
+        desc="Montando consultas",
+    )
+    searchable = [
+        i for i, query in enumerate(chroma_queries) if query.get("query")
+    ]
+    found = search_documents_batch(
+        collection,
+        [chroma_queries[i] for i in searchable],
+        n_results=candidate_count(n_results, reranker),
+        batch_size=batch_size,
+        facet_index=facet_index,
+        query_encoder=query_encoder,
+    )
+    documents = [[] for _ in questions]
+    for i, metadatas in zip(searchable, found):
+        documents[i] = metadatas
+    # A busca não traz os resumos, que são carregados por id para compor
+    # o contexto das respostas e, com o `reranker`, reordenar os candidatos.
+    documents = _map_concurrently(
+        lambda item: (
+            select_context(collection, *item, reranker) if item[1] else item[1]
+        ),
+        list(zip(questions, documents)),
+        max_workers,
+        desc="Selecionando documentos",
+    )
+
+    responses = _map_concurrently(
+        lambda item: _safe_agent_response(
+            build_answer_text(*item), prompt_rag, client, "answer_generation"
+        ),
+        list(zip(questions, documents)),
+        max_workers,
+        desc="Gerando respostas",
+    )
+
+    return [
+        {
+            "question": question,
+            "query": chroma_query.get("query"),
+            "where": chroma_query.get("where"),
+            "documents": docs,
+            "answer": response.get("answer"),
+            "ids": response.get("ids", []),
+            "error": chroma_query.get("error") or response.get("error"),
+        }
+        for question, chroma_query, docs, response in zip(
+            questions, chroma_queries, documents, responses
+        )
+    ]
+
+
+def main(
+    input_path: str,
+    output_path: str,
+    n_results: int = 20,
+    batch_size: int = 32,
+    max_workers: int = 8,
+) -> None:
+    """Responde as perguntas de um arquivo JSONL e grava os resultados.
+
+    Args:
+        input_path (str): Arquivo JSONL com as perguntas.
+        output_path (str): Arquivo de saída (`.jsonl` ou `.parquet`).
+        n_results (int, optional): Número de resultados por pergunta.
+        Defaults to 20.
+        batch_size (int, optional): Máximo de consultas por chamada ao
+        Chroma. Defaults to 32.
+        max_workers (int, optional): Máximo de chamadas simultâneas ao LLM.
+        Defaults to 8.
+    """
+    records = read_questions(input_path)
+    logger.info(f"Answering {len(records)} questions from {input_path}")
+
+    collection = connect_collection()
+    results = answer_questions(
+        [record["question"] for record in records],
+        client=OpenAI(max_retries=0),
+        collection=collection,
+        facet_index=collection.facet_index,
+        query_encoder=QueryEmbeddingCache(
+            get_embedding_function(),
+            maxsize=settings.QUERY_EMBEDDING_CACHE_SIZE,
+        ),
+        n_results=n_results,
+        batch_size=batch_size,
+        max_workers=max_workers,
+        reranker=get_reranker(),
+    )
+    for record, result in zip(records, results):
+        result["id"] = record["id"]
+
+    if not output_path.startswith("s3://"):
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    write_results(results, output_path)
+    logger.info(f"Results saved to {output_path}")
@@ -0,0 +1,241 @@
+"""Caches dos embeddings das consultas e dos resultados de busca.
+
+Os resultados são indexados pela consulta normalizada, pelos filtros em
+JSON canônico, pelo número de resultados e pela versão do índice. A versão
+combina o identificador da coleção com a quantidade de documentos, de modo
+que novas cargas feitas por `extract_embeddings` invalidam o cache sem
+intervenção manual.
+
+O cache local é um LRU limitado em número de entradas. Opcionalmente, os
+resultados também são gravados em um diretório compartilhado (local ou
+S3), permitindo que várias réplicas da aplicação aproveitem os mesmos
+acertos.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+import smart_open as so
+
+from src.config import logger
+from src.metrics import record_cache
+
+
+def normalize_query(query: str) -> str:
+    """Normaliza o texto da consulta usado como chave do cache."""
+    return " ".join(query.lower().split())
+
+
+class QueryEmbeddingCache:
+    """Cache LRU dos embeddings das consultas.
+
+    As consultas são normalizadas antes da codificação, de modo que
+    variações de caixa e espaços reaproveitam o mesmo embedding.
+    """
+
+    def __init__(
+        self,
+        embedding_function: Callable[[list[str]], list],
+        maxsize: int = 4096,
+    ) -> None:
+        self.embedding_function = embedding_function
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, queries: list[str]) -> list:
+        """Retorna os embeddings das consultas, codificando apenas as que
+        não estão no cache.
+
+        Args:
+            queries (list[str]): Textos das consultas.
+
+        Returns:
+            list: Embeddings na mesma ordem de `queries`.
+        """
+        keys = [normalize_query(query) for query in queries]
+        with self._lock:
+            found = {}
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    found[key] = self._cache[key]
+            missing = list(dict.fromkeys(k for k in keys if k not in found))
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        record_cache("query_embedding", "hit", len(keys) - len(missing))
+        record_cache("query_embedding", "miss", len(missing))
+
+        if missing:
+            embeddings = self.embedding_function(missing)
+            with self._lock:
+                for key, embedding in zip(missing, embeddings):
+                    found[key] = embedding
+                    self._cache[key] = embedding
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+        return [found[key] for key in keys]
+
+    def __call__(self, query: str):
+        return self.encode([query])[0]
+
+
+class ResultCache:
+    """Cache LRU de resultados de busca com armazenamento compartilhado
+    opcional.
+
+    Args:
+        maxsize (int, optional): Máximo de entradas em memória. Defaults to
+        1024.
+        shared_dir (str | None, optional): Diretório compartilhado entre
+        réplicas, local ou `s3://`. Defaults to None.
+        version_ttl (float, optional): Intervalo, em segundos, para
+        reconsultar a versão do índice. Defaults to 60.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        shared_dir: str | None = None,
+        version_ttl: float = 60,
+    ) -> None:
+        self.maxsize = maxsize
+        self.shared_dir = shared_dir.rstrip("/") if shared_dir else None
+        if self.shared_dir and not self.shared_dir.startswith("s3://"):
+            os.makedirs(self.shared_dir, exist_ok=True)
+        self.version_ttl = version_ttl
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def index_version(self, collection) -> str:
+        """Retorna a versão do índice da coleção, reconsultando-a no máximo
+        uma vez a cada `version_ttl` segundos.
+
+        Args:
+            collection (Collection): Coleção consultada.
+
+        Returns:
+            str: Versão do índice.
+        """
+        now = time.monotonic()
+        cached = self._versions.get(collection.name)
+        if cached is not None and now - cached[1] < self.version_ttl:
+            return cached[0]
+        version = f"{collection.name}:{collection.id}:{collection.count()}"
+        if cached is not None and cached[0] != version:
+            logger.info(f"Index version changed to {version}")
+        self._versions[collection.name] = (version, now)
+        return version
+
+    @staticmethod
+    def make_key(
+        query: str, where: dict | None, n_results: int, version: str
+    ) -> str:
+        """Gera a chave do cache para uma busca.
+
+        Args:
+            query (str): Texto da consulta.
+            where (dict | None): Filtros da consulta.
+            n_results (int): Número de resultados.
+            version (str): Versão do índice.
+
+        Returns:
+            str: Chave do cache.
+        """
+        payload = json.dumps(
+            [normalize_query(query), where or None, n_results, version],
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _shared_path(self, key: str) -> str:
+        return f"{self.shared_dir}/{key}.json"
+
+    def _remember(self, key: str, value: list[dict]) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> list[dict] | None:
+        """Busca um resultado no cache local e, em seguida, no
+        compartilhado.
+
+        Args:
+            key (str): Chave gerada por `make_key`.
+
+        Returns:
+            list[dict] | None: Resultado armazenado ou None.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                record_cache("search_results", "hit")
+                return self._entries[key]
+
+        if self.shared_dir:
+            try:
+                with so.open(self._shared_path(key), encoding="utf-8") as f:
+                    value = json.load(f)
+            except (OSError, ValueError):
+                value = None
+            if value is not None:
+                self._remember(key, value)
+                with self._lock:
+                    self.shared_hits += 1
+                record_cache("search_results", "shared_hit")
+                return value
+
+        with self._lock:
+            self.misses += 1
+        record_cache("search_results", "miss")
+        return None
+
+    def set(self, key: str, value: list[dict]) -> None:
+        """Armazena um resultado no cache.
+
+        Args:
+            key (str): Chave gerada por `make_key`.
+            value (list[dict]): Resultado da busca.
+        """
+        self._remember(key, value)
+        if self.shared_dir:
+            try:
+                with so.open(
+                    self._shared_path(key), "w", encoding="utf-8"
+                ) as f:
+                    json.dump(value, f, ensure_ascii=False, default=str)
+            except OSError as e:
+                logger.warning(f"Could not write shared result cache: {e}")
+
+    def stats(self) -> dict:
+        """Retorna as métricas de uso do cache."""
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": (
+                    (self.hits + self.shared_hits) / lookups
+                    if lookups
+                    else 0.0
+                ),
+            }
@@ -0,0 +1,339 @@
+"""Coleções versionadas e alias da coleção de teses em uso.
+
+Cada reconstrução do índice grava uma nova coleção `thesis_capes_v<N>`,
+sem tocar na coleção consultada pela aplicação. Depois de validada, a nova
+versão passa a ser a ativa com a atualização dos metadados de uma pequena
+coleção de alias (`thesis_capes_alias`), uma única escrita no ChromaDB. Os
+leitores resolvem o alias ao conectar e o consultam novamente a cada
+`COLLECTION_ALIAS_TTL` segundos, passando para a nova versão sem reiniciar.
+
+Sem alias, a coleção `thesis_capes` original continua sendo usada.
+
+Com `YEAR_SHARD_SPAN`, uma versão é formada por uma coleção por faixa de
+anos (`thesis_capes_v<N>_y<ano inicial>`, ver src/routing.py), e o alias
+registra os anos iniciais das coleções em `year_shards`.
+
+Com `EMBEDDING_REDUCTION`, cada versão grava a própria projeção dos
+embeddings, registrada no alias em `reducer_path`; as consultas à versão
+ativa passam pela projeção usada na construção dela.
+
+Com `DEDUP_MODE`, o alias registra `deduplicated`, e os filtros das
+consultas à versão ativa são reescritos por `expand_where` para também
+encontrar os valores das duplicatas agrupadas (ver src/dedup.py).
+"""
+
+import re
+import threading
+import time
+from pathlib import PurePosixPath
+
+from chromadb.errors import InvalidCollectionException
+
+from src.config import logger, settings
+from src.dedup import expand_where
+from src.routing import ShardedCollection, shard_collection_name
+
+COLLECTION_NAME = "thesis_capes"
+SMOKE_QUERIES = [
+    "inteligência artificial na educação",
+    "saúde pública no Brasil",
+    "mudanças climáticas e agricultura",
+]
+
+
+def alias_name() -> str:
+    return f"{COLLECTION_NAME}_alias"
+
+
+def version_name(version: int) -> str:
+    """Nome da coleção de uma versão do índice."""
+    return f"{COLLECTION_NAME}_v{version}"
+
+
+def versioned_path(path: str, version: int) -> str:
+    """Caminho de um artefato da versão (`data/facets.npz` ->
+    `data/facets_v3.npz`)."""
+    suffix = PurePosixPath(path).suffix
+    return f"{path.removesuffix(suffix)}_v{version}{suffix}"
+
+
+def list_versions(client) -> list[int]:
+    """Lista as versões existentes da coleção, em ordem crescente."""
+    return sorted(set(_version_collections(client).values()))
+
+
+def _version_collections(client) -> dict[str, int]:
+    """Versão de cada coleção versionada, inclusive as de faixas de anos."""
+    pattern = re.compile(rf"{re.escape(COLLECTION_NAME)}_v(\d+)(_y\d+)?$")
+    collections = {}
+    for collection in client.list_collections():
+        name = getattr(collection, "name", collection)
+        match = pattern.match(name)
+        if match:
+            collections[name] = int(match.group(1))
+    return collections
+
+
+def read_alias(client) -> dict | None:
+    """Lê o alias da coleção ativa.
+
+    Returns:
+        dict | None: Nome da coleção ativa (`collection`) e caminhos dos
+        artefatos da versão, ou None se nenhum alias foi criado.
+    """
+    try:
+        return dict(client.get_collection(alias_name()).metadata or {})
+    except (InvalidCollectionException, ValueError):
+        return None
+
+
+def resolve_alias(client) -> dict:
+    """Resolve a coleção ativa e o índice de facetas correspondente.
+
+    Para versões divididas por anos, inclui também os anos iniciais das
+    coleções (`year_shards`) e os anos por coleção (`year_shard_span`).
+    Para versões com embeddings reduzidos, inclui a projeção da versão
+    (`reducer_path`); versões publicadas antes de ela ser registrada no
+    alias usam `EMBEDDING_REDUCER_PATH`. Para versões com resumos
+    agrupados, inclui `deduplicated`.
+    """
+    alias = read_alias(client) or {}
+    resolved = {
+        "collection": alias.get("collection", COLLECTION_NAME),
+        "facet_index_path": alias.get(
+            "facet_index_path", settings.FACET_INDEX_PATH
+        ),
+    }
+    if alias.get("year_shards"):
+        resolved["year_shards"] = [
+            int(start) for start in str(alias["year_shards"]).split(",")
+        ]
+        resolved["year_shard_span"] = int(alias.get("year_shard_span", 1))
+    reducer_path = alias.get("reducer_path")
+    if not reducer_path and settings.EMBEDDING_REDUCTION != "none":
+        reducer_path = settings.EMBEDDING_REDUCER_PATH
+    if reducer_path:
+        resolved["reducer_path"] = reducer_path
+    if alias.get("deduplicated"):
+        resolved["deduplicated"] = True
+    return resolved
+
+
+def switch_alias(client, collection: str, **artifacts) -> None:
+    """Aponta o alias para outra coleção.
+
+    Args:
+        client (ClientAPI): Cliente do ChromaDB.
+        collection (str): Nome da coleção que passa a ser a ativa.
+        **artifacts: Caminhos dos artefatos da versão, como
+        `facet_index_path`.
+    """
+    previous = read_alias(client)
+    alias = client.get_or_create_collection(
+        alias_name(), embedding_function=None
+    )
+    alias.modify(
+        metadata={
+            "collection": collection,
+            "switched_at": time.time(),
+            **artifacts,
+        }
+    )
+    logger.info(
+        f"Collection alias switched from "
+        f"{(previous or {}).get('collection')} to {collection}"
+    )
+
+
+def validate_collection(
+    collection,
+    expected_count: int,
+    queries: list[str] = SMOKE_QUERIES,
+    n_results: int = 5,
+) -> dict:
+    """Confere a nova versão antes da troca do alias.
+
+    Args:
+        collection (Collection): Coleção recém-construída.
+        expected_count (int): Número de documentos esperado.
+        queries (list[str], optional): Consultas de verificação. Defaults
+        to SMOKE_QUERIES.
+        n_results (int, optional): Resultados por consulta. Defaults to 5.
+
+    Raises:
+        ValueError: Se a contagem divergir ou alguma consulta não retornar
+        documentos.
+
+    Returns:
+        dict: Contagem e latência das consultas de verificação.
+    """
+    count = collection.count()
+    if count != expected_count:
+        raise ValueError(
+            f"{collection.name} has {count} documents, "
+            f"expected {expected_count}"
+        )
+    latencies = []
+    for query in queries:
+        tic = time.perf_counter()
+        result = collection.query(
+            query_texts=[query],
+            n_results=min(n_results, count),
+            include=["distances"],
+        )
+        latencies.append(time.perf_counter() - tic)
+        if not result["ids"][0]:
+            raise ValueError(f"{collection.name} returned no results")
+    return {"count": count, "max_query_s": max(latencies, default=0.0)}
+
+
+def garbage_collect(client, keep: int = 1) -> list[str]:
+    """Remove as versões antigas, preservando a ativa e as `keep` versões
+    anteriores a ela, para que seja possível voltar o alias.
+
+    Args:
+        client (ClientAPI): Cliente do ChromaDB.
+        keep (int, optional): Versões anteriores preservadas. Defaults to 1.
+
+    Returns:
+        list[str]: Coleções removidas.
+    """
+    active = resolve_alias(client)["collection"]
+    collections = _version_collections(client)
+    versions = sorted(set(collections.values()))
+    names = [version_name(version) for version in versions]
+    if active not in names:
+        return []
+    position = names.index(active)
+    old_versions = set(versions[: max(0, position - keep)])
+    removed = sorted(
+        (
+            name
+            for name, version in collections.items()
+            if version in old_versions
+        ),
+        key=lambda name: (collections[name], name),
+    )
+    for name in removed:
+        client.delete_collection(name)
+        logger.info(f"Deleted old collection {name}")
+    return removed
+
+
+class LiveCollection:
+    """Coleção ativa, resolvida pelo alias e atualizada periodicamente.
+
+    Repassa os atributos e métodos da coleção (`query`, `count`, `name`,
+    ...), de modo que pode ser usada no lugar de uma `Collection`.
+
+    Args:
+        client (ClientAPI): Cliente do ChromaDB.
+        open_collection (Callable[[str], Collection]): Abre uma coleção
+        pelo nome.
+        open_facet_index (Callable[[str], FacetIndex | None]): Carrega o
+        índice de facetas de um caminho.
+        ttl (float | None, optional): Intervalo, em segundos, entre as
+        consultas ao alias. Defaults to `COLLECTION_ALIAS_TTL`.
+        open_reducer (Callable[[str], ReducedEmbeddingFunction] | None,
+        optional): Carrega a projeção da versão de um caminho e a aplica à
+        função de embeddings das consultas. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        client,
+        open_collection,
+        open_facet_index,
+        ttl: float | None = None,
+        open_reducer=None,
+    ) -> None:
+        self._client = client
+        self._open_collection = open_collection
+        self._open_facet_index = open_facet_index
+        self._open_reducer = open_reducer
+        self._ttl = settings.COLLECTION_ALIAS_TTL if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._alias = None
+        self._collection = None
+        self._facet_index = None
+        self._query_function = None
+        self.refresh()
+
+    def refresh(self, force: bool = True) -> None:
+        """Consulta o alias e troca de coleção se ele tiver mudado."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked_at < self._ttl:
+                return
+            self._checked_at = now
+            try:
+                alias = resolve_alias(self._client)
+            except Exception as e:
+                if self._collection is None:
+                    raise
+                logger.error(f"Error reading collection alias: {e}")
+                return
+            if alias == self._alias:
+                return
+            collection = self._open(alias)
+            facet_index = self._open_facet_index(alias["facet_index_path"])
+            query_function = None
+            if alias.get("reducer_path") and self._open_reducer is not None:
+                query_function = self._open_reducer(alias["reducer_path"])
+            self._collection, self._facet_index = collection, facet_index
+            self._query_function = query_function
+            self._alias = alias
+            logger.info(f"Using collection {alias['collection']}")
+
+    def _open(self, alias: dict):
+        if "year_shards" not in alias:
+            return self._open_collection(alias["collection"])
+        return ShardedCollection(
+            alias["collection"],
+            {
+                start: self._open_collection(
+                    shard_collection_name(alias["collection"], start)
+                )
+                for start in alias["year_shards"]
+            },
+            span=alias["year_shard_span"],
+        )
+
+    @property
+    def collection(self):
+        self.refresh(force=False)
+        return self._collection
+
+    @property
+    def facet_index(self):
+        self.refresh(force=False)
+        return self._facet_index
+
+    @property
+    def reducer(self):
+        """Projeção dos embeddings da versão ativa, ou None."""
+        self.refresh(force=False)
+        query_function = self._query_function
+        return None if query_function is None else query_function.reducer
+
+    def query(self, **kwargs):
+        """Consulta a versão ativa, projetando os embeddings das consultas
+        com a projeção dessa versão, se houver, e reescrevendo os filtros
+        das versões com resumos agrupados."""
+        self.refresh(force=False)
+        collection, query_function = self._collection, self._query_function
+        if self._alias.get("deduplicated") and kwargs.get("where"):
+            kwargs["where"] = expand_where(kwargs["where"])
+        if query_function is not None:
+            if kwargs.get("query_embeddings") is None:
+                embeddings = query_function(kwargs.pop("query_texts"))
+            else:
+                embeddings = query_function.reducer.transform(
+                    kwargs["query_embeddings"]
+                )
+            kwargs["query_embeddings"] = embeddings
+        return collection.query(**kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(self.collection, name)
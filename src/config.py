@@ -1,31 +1,108 @@
+import hashlib
+import random
+import sys
+from typing import Literal
+
 from loguru import logger
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-logger.add(
-    "logs/info.log",
-    level="INFO",
-    rotation="10 MB",
-    compression="zip",
-    retention="10 days",
-)
-logger.add(
-    "logs/error.log",
-    level="ERROR",
-    rotation="10 MB",
-    compression="zip",
-    retention="10 days",
-)
-
 
 class Settings(BaseSettings):
     CHROMA_CLIENT_AUTH_CREDENTIALS: SecretStr
     CHROMA_CLIENT_HOSTNAME: str
     CHROMA_CLIENT_PORT: int
     CHROMA_CLIENT_AUTH_PROVIDER: str
+    # "http" conecta ao servidor do ChromaDB; "persistent" abre um banco
+    # local em CHROMA_PERSIST_PATH, usado em testes de carga e benchmarks.
+    CHROMA_CLIENT_MODE: Literal["http", "persistent"] = "http"
+    CHROMA_PERSIST_PATH: str = "data/chroma"
 
     MODEL_NAME_OR_PATH: str = "models/instructor"
     DEVICE: str | None = None
+    QUERY_EMBEDDING_CACHE_SIZE: int = 4096
+
+    # Redução de dimensão dos embeddings armazenados (ver src/reduction.py).
+    EMBEDDING_REDUCTION: Literal["none", "pca", "random_projection"] = "none"
+    EMBEDDING_REDUCTION_DIM: int = 256
+    EMBEDDING_REDUCTION_SAMPLE_SIZE: int = 20000
+    EMBEDDING_REDUCER_PATH: str = "data/reducer.npz"
+
+    EMBEDDING_SERVER_URL: str | None = None
+    EMBEDDING_SERVER_SOCKET: str | None = None
+    EMBEDDING_SERVER_TIMEOUT: float = 30
+    EMBEDDING_BATCH_MAX_SIZE: int = 64
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5
+
+    # Parâmetros do índice HNSW da coleção, aplicados apenas quando a
+    # coleção é criada. Use `src/tune_hnsw.py` para escolhê-los.
+    HNSW_SPACE: Literal["l2", "cosine", "ip"] = "l2"
+    HNSW_M: int = 16
+    HNSW_CONSTRUCTION_EF: int = 100
+    HNSW_SEARCH_EF: int = 10
+    HNSW_BATCH_SIZE: int = 100
+    HNSW_SYNC_THRESHOLD: int = 1000
+
+    FACET_INDEX_PATH: str = "data/facets.npz"
+    # Arquivos Arrow trocados entre as etapas de src/extract_embeddings.py.
+    HANDOFF_DIR: str = "data/.handoff"
+    CATALOG_PATH: str = "data/catalogo_de_teses_e_dissertacoes.parquet"
+
+    # Indexação em shards concorrentes, com marcadores de conclusão por
+    # shard (ver `index_shard` em src/extract_embeddings.py).
+    INDEX_SHARD_BY: Literal["hash", "year"] = "hash"
+    INDEX_SHARDS: int = 8
+    INDEX_CONCURRENCY: int = 4
+
+    # Agrupamento de resumos duplicados antes da indexação (src/dedup.py).
+    # Opcional: os filtros e as facetas usam apenas os metadados do
+    # registro mantido em cada grupo.
+    DEDUP_MODE: Literal["none", "exact", "near"] = "none"
+    DEDUP_THRESHOLD: float = 0.9
+
+    # Coleções versionadas (ver src/collection_alias.py).
+    COLLECTION_ALIAS_TTL: float = 30
+    COLLECTION_KEEP_VERSIONS: int = 1
+    # Coleções por faixa de anos e roteamento das buscas pelo filtro de ano
+    # (ver src/routing.py). 0 mantém uma única coleção por versão.
+    YEAR_SHARD_SPAN: int = 0
+    ROUTING_MAX_WORKERS: int = 8
+
+    RESULT_CACHE_SIZE: int = 1024
+    RESULT_CACHE_SHARED_DIR: str | None = None
+    RESULT_CACHE_VERSION_TTL: float = 60
+
+    # Limites, novas tentativas e circuito das chamadas à OpenAI e ao
+    # ChromaDB (ver src/resilience.py).
+    OPENAI_MAX_CONCURRENCY: int = 8
+    OPENAI_TIMEOUT: float = 60
+    CHROMA_MAX_CONCURRENCY: int = 16
+    BACKEND_RETRY_ATTEMPTS: int = 4
+    BACKEND_RETRY_MAX_WAIT: float = 10
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_RESET_TIMEOUT: float = 30
+
+    # Reordenação local dos candidatos da busca (ver src/rerank.py).
+    RERANK_MODE: Literal["none", "fusion", "cross_encoder"] = "none"
+    RERANK_CANDIDATES: int = 100
+    RERANK_TOP_K: int = 5
+    RERANK_MODEL_NAME_OR_PATH: str = (
+        "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+    )
+    RERANK_BATCH_SIZE: int = 32
+    RERANK_QUANTIZE: bool = True
+
+    SEARCH_API_URL: str | None = None
+    SEARCH_API_TIMEOUT: float = 60
+
+    METRICS_PORT: int | None = None
+
+    # Registros de log (ver `configure_logging` e `log_payload`).
+    LOG_DIR: str = "logs"
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    LOG_PAYLOAD_MAX_CHARS: int = 500
+    LOG_SAMPLE_RATE: float = 0.1
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -37,5 +114,78 @@ class Settings(BaseSettings):
 
 settings = Settings()
 
+
+def configure_logging() -> None:
+    """Configura os destinos dos logs.
+
+    Os registros são gravados por uma thread em segundo plano
+    (`enqueue=True`), de modo que a escrita em disco, a rotação e a
+    compressão dos arquivos não ocorrem na thread da requisição. Com
+    `LOG_JSON`, os arquivos têm um registro JSON por linha, incluindo os
+    campos associados com `logger.bind`.
+    """
+    logger.remove()
+    logger.add(sys.stderr, level=settings.LOG_LEVEL, enqueue=True)
+    for name, level in (("info", "INFO"), ("error", "ERROR")):
+        logger.add(
+            f"{settings.LOG_DIR}/{name}.log",
+            level=level,
+            rotation="10 MB",
+            compression="zip",
+            retention="10 days",
+            serialize=settings.LOG_JSON,
+            enqueue=True,
+        )
+
+
+def summarize_payload(value, max_chars: int | None = None) -> str:
+    """Resume um conteúdo grande para o log.
+
+    Args:
+        value: Texto ou objeto registrado.
+        max_chars (int | None, optional): Máximo de caracteres mantidos.
+        Defaults to `LOG_PAYLOAD_MAX_CHARS`.
+
+    Returns:
+        str: O próprio texto, se curto, ou o início do texto seguido do
+        tamanho e do hash SHA-256 do conteúdo completo.
+    """
+    text = value if isinstance(value, str) else str(value)
+    if max_chars is None:
+        max_chars = settings.LOG_PAYLOAD_MAX_CHARS
+    if len(text) <= max_chars:
+        return text
+    digest = hashlib.sha256(text.encode()).hexdigest()[:16]
+    return f"{text[:max_chars]}... [{len(text)} chars, sha256:{digest}]"
+
+
+def log_payload(
+    message: str,
+    value,
+    max_chars: int | None = None,
+    level: str = "INFO",
+) -> None:
+    """Registra um conteúdo verboso (textos enviados ao LLM, respostas,
+    consultas) em uma amostra de `LOG_SAMPLE_RATE` das chamadas.
+
+    O conteúdo é resumido por `summarize_payload`, e o sorteio ocorre antes
+    do resumo, de modo que as chamadas fora da amostra não têm custo.
+
+    Args:
+        message (str): Descrição do conteúdo.
+        value: Conteúdo registrado.
+        max_chars (int | None, optional): Máximo de caracteres mantidos.
+        Defaults to `LOG_PAYLOAD_MAX_CHARS`.
+        level (str, optional): Nível do registro. Defaults to "INFO".
+    """
+    if random.random() >= settings.LOG_SAMPLE_RATE:
+        return
+    logger.opt(depth=1).bind(sampled=True).log(
+        level, "{}: {}", message, summarize_payload(value, max_chars)
+    )
+
+
+configure_logging()
+
 if __name__ == "__main__":
     print(settings.model_dump())
@@ -0,0 +1,350 @@
+"""Agrupamento de resumos idênticos ou quase idênticos antes da indexação.
+
+O mesmo resumo aparece no catálogo em vários anos, programas ou áreas, e
+cada ocorrência viraria um vetor na coleção. Os resumos são agrupados em
+duas etapas: primeiro pelo hash do texto normalizado e, em seguida, pela
+similaridade de Jaccard entre os conjuntos de n-gramas de palavras,
+estimada com MinHash e com candidatos encontrados por LSH (bandas da
+assinatura). Cada grupo é indexado uma única vez, com os metadados das
+ocorrências agregados.
+
+Como os metadados do ChromaDB são escalares, o registro mantido em cada
+grupo é o mais recente (maior `AN_BASE`), e os demais valores de cada
+coluna são concatenados em `<COLUNA>_AGRUPADO`. Para que os filtros
+continuem encontrando o grupo pelos valores das outras ocorrências, cada
+valor agrupado das colunas filtradas (`FILTER_COLUMNS`) é gravado também
+como um marcador `<COLUNA>=<valor>`, e o menor ano em `AN_BASE_MIN`;
+`expand_where` reescreve os filtros `where` para consultar esses
+marcadores. As condições `$ne` e `$nin` continuam valendo apenas para o
+registro mantido. O índice de facetas conta cada grupo em todos os seus
+valores, e as consultas com filtro de ano em coleções por faixa de anos
+passam a consultar todas as faixas.
+"""
+
+import re
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from src.config import logger
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+BANDS = 16
+# Primo de Mersenne 2^31 - 1: os produtos das permutações cabem em uint64.
+_PRIME = np.uint64(2**31 - 1)
+_MAX_HASH = np.uint32(2**32 - 1)
+
+AGGREGATED_COLUMNS = [
+    "AN_BASE",
+    "SG_ENTIDADE_ENSINO",
+    "NM_ENTIDADE_ENSINO",
+    "NM_PRODUCAO",
+    "NM_GRAU_ACADEMICO",
+    "NM_REGIAO",
+    "SG_UF_IES",
+    "NM_GRANDE_AREA_CONHECIMENTO",
+    "NM_AREA_CONHECIMENTO",
+]
+# Colunas agrupadas usadas nos filtros, com um marcador por valor.
+FILTER_COLUMNS = [
+    "AN_BASE",
+    "SG_ENTIDADE_ENSINO",
+    "NM_GRAU_ACADEMICO",
+    "NM_REGIAO",
+    "SG_UF_IES",
+    "NM_GRANDE_AREA_CONHECIMENTO",
+    "NM_AREA_CONHECIMENTO",
+]
+YEAR_COLUMN = "AN_BASE"
+MIN_YEAR_KEY = "AN_BASE_MIN"
+GROUPED_SUFFIX = "_AGRUPADO"
+SEPARATOR = "; "
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_texts(texts: pd.Series) -> pd.Series:
+    """Remove acentos, pontuação, caixa e espaços repetidos dos textos."""
+    return (
+        texts.astype(str)
+        .str.normalize("NFKD")
+        .str.encode("ascii", errors="ignore")
+        .str.decode("ascii")
+        .str.lower()
+        .str.replace(_NON_WORD, " ", regex=True)
+        .str.replace(_SPACES, " ", regex=True)
+        .str.strip()
+    )
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """Hashes dos n-gramas de palavras de um texto normalizado.
+
+    Args:
+        text (str): Texto normalizado.
+        size (int, optional): Palavras por n-grama. Defaults to
+        SHINGLE_SIZE.
+
+    Returns:
+        np.ndarray: Hashes distintos (uint64) dos n-gramas.
+    """
+    words = text.split()
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    grams = {
+        " ".join(words[i : i + size])
+        for i in range(max(1, len(words) - size + 1))
+    }
+    return np.fromiter(
+        (zlib.crc32(gram.encode()) for gram in grams),
+        dtype=np.uint64,
+        count=len(grams),
+    )
+
+
+class MinHasher:
+    """Assinaturas MinHash com permutações `(a * x + b) mod p`.
+
+    Args:
+        num_perm (int, optional): Tamanho da assinatura. Defaults to
+        NUM_PERM.
+        seed (int, optional): Semente das permutações. Defaults to 0.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 0) -> None:
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        """Calcula a assinatura de um conjunto de hashes de n-gramas."""
+        if not hashes.size:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        values = (self.a[:, None] * (hashes % _PRIME) + self.b[:, None]) % (
+            _PRIME
+        )
+        return values.min(axis=1).astype(np.uint32)
+
+
+def _find(parent: np.ndarray, i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _union(parent: np.ndarray, i: int, j: int) -> None:
+    root_i, root_j = _find(parent, i), _find(parent, j)
+    if root_i != root_j:
+        parent[max(root_i, root_j)] = min(root_i, root_j)
+
+
+def near_duplicate_groups(
+    texts: list[str],
+    threshold: float = 0.9,
+    num_perm: int = NUM_PERM,
+    bands: int = BANDS,
+) -> np.ndarray:
+    """Agrupa textos cuja similaridade de Jaccard estimada atinge o limiar.
+
+    Os pares candidatos são os textos que coincidem em ao menos uma banda
+    da assinatura; cada candidato é confirmado pela fração de posições
+    iguais das assinaturas.
+
+    Args:
+        texts (list[str]): Textos normalizados.
+        threshold (float, optional): Similaridade mínima. Defaults to 0.9.
+        num_perm (int, optional): Tamanho da assinatura. Defaults to
+        NUM_PERM.
+        bands (int, optional): Número de bandas do LSH. Defaults to BANDS.
+
+    Returns:
+        np.ndarray: Grupo de cada texto, identificado pela menor posição.
+    """
+    if not texts:
+        return np.empty(0, dtype=np.int64)
+    hasher = MinHasher(num_perm)
+    signatures = np.vstack([hasher.signature(shingles(t)) for t in texts])
+    empty = (signatures == _MAX_HASH).all(axis=1)
+    parent = np.arange(len(texts))
+
+    rows = num_perm // bands
+    weights = np.random.default_rng(1).integers(
+        1, 2**63, size=rows, dtype=np.uint64
+    )
+    for band in range(bands):
+        block = signatures[:, band * rows : (band + 1) * rows]
+        keys = pd.Series((block.astype(np.uint64) * weights).sum(axis=1))
+        keys = keys[~empty]
+        for members in keys.groupby(keys).indices.values():
+            if len(members) < 2:  # noqa: PLR2004
+                continue
+            positions = keys.index[members].to_numpy()
+            for k in range(1, len(positions)):
+                similarity = (
+                    signatures[positions[:k]] == signatures[positions[k]]
+                ).mean(axis=1)
+                for match in positions[:k][similarity >= threshold]:
+                    _union(parent, int(match), int(positions[k]))
+
+    return np.array([_find(parent, i) for i in range(len(texts))])
+
+
+def duplicate_groups(
+    texts: pd.Series, near: bool = True, threshold: float = 0.9
+) -> np.ndarray:
+    """Atribui um grupo a cada resumo, unindo idênticos e quase idênticos.
+
+    Args:
+        texts (pd.Series): Resumos.
+        near (bool, optional): Agrupa também os quase idênticos. Defaults
+        to True.
+        threshold (float, optional): Similaridade de Jaccard mínima.
+        Defaults to 0.9.
+
+    Returns:
+        np.ndarray: Código do grupo de cada resumo.
+    """
+    # Resumos idênticos após a normalização formam um único texto, e só os
+    # textos distintos passam pelo MinHash.
+    normalized = normalize_texts(texts)
+    exact, uniques = pd.factorize(normalized)
+    if not near:
+        return exact
+    groups = near_duplicate_groups(list(uniques), threshold=threshold)
+    return groups[exact]
+
+
+def _join(values: pd.Series) -> str:
+    return SEPARATOR.join(sorted({str(v) for v in values if pd.notna(v)}))
+
+
+def collapse_duplicates(df: pd.DataFrame, groups: np.ndarray) -> pd.DataFrame:
+    """Mantém um registro por grupo, com os metadados agregados.
+
+    Args:
+        df (pd.DataFrame): Registros pré-processados.
+        groups (np.ndarray): Grupo de cada registro.
+
+    Returns:
+        pd.DataFrame: O registro mais recente de cada grupo, com
+        `N_DUPLICATAS` e as colunas `<COLUNA>_AGRUPADO`.
+    """
+    df = df.assign(_grupo=groups).sort_values(
+        ["_grupo", "AN_BASE"], ascending=[True, False], kind="stable"
+    )
+    grouped = df.groupby("_grupo", sort=False)
+
+    result = grouped.head(1).set_index("_grupo")
+    result["N_DUPLICATAS"] = grouped.size()
+    # A agregação em Python só é necessária nos grupos com duplicatas.
+    repeated = df[df["_grupo"].map(result["N_DUPLICATAS"]) > 1]
+    for column in AGGREGATED_COLUMNS:
+        if column in df:
+            aggregated = result[column].astype(str)
+            aggregated.update(repeated.groupby("_grupo")[column].agg(_join))
+            result[f"{column}{GROUPED_SUFFIX}"] = aggregated
+    return result.reset_index(drop=True)
+
+
+def split_grouped(value) -> list[str]:
+    """Separa os valores de uma coluna `<COLUNA>_AGRUPADO`."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return []
+    return [item for item in str(value).split(SEPARATOR) if item]
+
+
+def value_key(column: str, value) -> str:
+    """Nome do marcador de um valor agrupado de uma coluna."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return f"{column}={value}"
+
+
+def grouped_metadata(record: dict) -> dict:
+    """Marcadores dos valores agrupados de um registro, gravados nos
+    metadados da coleção.
+
+    Args:
+        record (dict): Registro com as colunas `<COLUNA>_AGRUPADO`.
+
+    Returns:
+        dict: Um marcador `<COLUNA>=<valor>` por valor das colunas com
+        mais de um valor no grupo e, para o ano, o menor ano em
+        `AN_BASE_MIN`.
+    """
+    metadata = {}
+    for column in FILTER_COLUMNS:
+        values = split_grouped(record.get(f"{column}{GROUPED_SUFFIX}"))
+        if len(values) < 2:  # noqa: PLR2004
+            continue
+        metadata.update({value_key(column, value): True for value in values})
+        if column == YEAR_COLUMN:
+            metadata[MIN_YEAR_KEY] = min(int(value) for value in values)
+    return metadata
+
+
+def _expand_condition(column: str, condition) -> dict:
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+    clauses = [{column: condition}]
+    if len(condition) == 1:
+        ((operator, operand),) = condition.items()
+        if operator == "$eq":
+            clauses.append({value_key(column, operand): True})
+        elif operator == "$in":
+            clauses.extend({value_key(column, v): True} for v in operand)
+        elif column == YEAR_COLUMN and operator in {"$lt", "$lte"}:
+            clauses.append({MIN_YEAR_KEY: {operator: operand}})
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def expand_where(where: dict | None) -> dict | None:
+    """Reescreve um filtro `where` para que as condições sobre as colunas
+    agrupadas também encontrem os valores das duplicatas não mantidas.
+
+    Args:
+        where (dict | None): Filtros da consulta.
+
+    Returns:
+        dict | None: Filtros equivalentes sobre os marcadores dos valores
+        agrupados.
+    """
+    if not where:
+        return where
+    parts = []
+    for key, condition in where.items():
+        if key in {"$and", "$or"}:
+            parts.append({key: [expand_where(clause) for clause in condition]})
+        elif key in FILTER_COLUMNS:
+            parts.append(_expand_condition(key, condition))
+        else:
+            parts.append({key: condition})
+    return parts[0] if len(parts) == 1 else {"$and": parts}
+
+
+def deduplicate(
+    df: pd.DataFrame, near: bool = True, threshold: float = 0.9
+) -> pd.DataFrame:
+    """Agrupa os resumos duplicados de um DataFrame pré-processado.
+
+    Args:
+        df (pd.DataFrame): Registros com a coluna `DS_RESUMO`.
+        near (bool, optional): Agrupa também os quase idênticos. Defaults
+        to True.
+        threshold (float, optional): Similaridade de Jaccard mínima.
+        Defaults to 0.9.
+
+    Returns:
+        pd.DataFrame: Um registro por resumo distinto.
+    """
+    groups = duplicate_groups(df["DS_RESUMO"], near=near, threshold=threshold)
+    result = collapse_duplicates(df, groups)
+    logger.info(
+        f"Collapsed {len(df)} records into {len(result)} distinct abstracts"
+    )
+    return result
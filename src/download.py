@@ -3,9 +3,9 @@ CAPES a partir de 2013."""
 
 import datetime
 import os
+import time
 from pathlib import Path
 
-import boto3
 import pandas as pd
 import requests
 import smart_open as so
@@ -14,6 +14,22 @@ from prefect.cache_policies import INPUTS
 from prefect.runtime import flow_run, task_run
 from tqdm.auto import tqdm
 
+from src.metrics import push_metrics, record_throughput
+from src.profiling import profiled
+from src.schema import (
+    apply_schema,
+    concat_catalogs,
+    memory_usage,
+    validate_schema,
+)
+from src.storage import (
+    is_s3,
+    list_objects,
+    open_file,
+    upload_fileobj,
+    write_parquet,
+)
+
 CAPES_API_URL = "https://dadosabertos.capes.gov.br/api/3/action"
 TIMEOUT = 10
 HEADERS = {
@@ -23,7 +39,6 @@ HEADERS = {
     "Accept-Encoding": "gzip, deflate, br, zstd",
     "host": "dadosabertos.capes.gov.br",
 }
-DT_FORMAT = "%d/%m/%Y %H:%M:%S"
 
 
 def generate_flow_run_name():
@@ -152,7 +167,7 @@ def download(
     Returns:
         str: caminho do arquivo baixado
     """
-    if not output_dir.startswith("s3://"):
+    if not is_s3(output_dir):
         os.makedirs(output_dir, exist_ok=True)
 
     filename = os.path.join(output_dir, url.split("/")[-1])
@@ -160,24 +175,33 @@ def download(
     response_headers = requests.head(url, timeout=TIMEOUT).headers
     total = int(response_headers.get("content-length", 0))
 
-    with so.open(filename, "wb") as f:
-        with requests.get(
-            url, stream=True, headers=HEADERS, timeout=TIMEOUT
-        ) as r:
-            r.raise_for_status()
-            tqdm_params = {
-                "desc": url.split("/")[-1],
-                "total": total,
-                "miniters": 1,
-                "unit": "B",
-                "unit_scale": True,
-                "unit_divisor": 1024,
-                "leave": True,
-            }
-            with tqdm(**tqdm_params) as pb:
+    tic = time.perf_counter()
+    tqdm_params = {
+        "desc": url.split("/")[-1],
+        "total": total,
+        "miniters": 1,
+        "unit": "B",
+        "unit_scale": True,
+        "unit_divisor": 1024,
+        "leave": True,
+    }
+    with (
+        requests.get(url, stream=True, headers=HEADERS, timeout=TIMEOUT) as r,
+        tqdm(**tqdm_params) as pb,
+    ):
+        r.raise_for_status()
+        if is_s3(filename):
+            # O corpo da resposta é enviado ao S3 em partes paralelas, sem
+            # passar pelo disco.
+            r.raw.decode_content = True
+            upload_fileobj(r.raw, filename, callback=pb.update)
+        else:
+            with so.open(filename, "wb") as f:
                 for chunk in r.iter_content(chunk_size=8192):
                     pb.update(len(chunk))
                     f.write(chunk)
+        written = pb.n
+    record_throughput("download", "bytes", written, time.perf_counter() - tic)
     del etag
     return str(filename)
 
@@ -198,18 +222,8 @@ def list_files(directory_or_bucket: str, extension: str = ".xlsx") -> list:
     if Path(directory_or_bucket).is_dir():
         files = list(Path(directory_or_bucket).glob(f"*{extension}"))
         return [file.as_posix() for file in files]
-    elif directory_or_bucket.startswith("s3://"):
-        s3_client = boto3.client("s3")
-        bucket_name = directory_or_bucket.split("/")[2]
-        response = s3_client.list_objects_v2(
-            Bucket=bucket_name, Prefix="data/raw/"
-        )
-        files = [
-            f"s3://{bucket_name}/{content['Key']}"
-            for content in response.get("Contents", [])
-            if content["Key"].endswith(extension)
-        ]
-        return files
+    elif is_s3(directory_or_bucket):
+        return list_objects(directory_or_bucket, extension)
 
 
 @task(
@@ -217,41 +231,43 @@ def list_files(directory_or_bucket: str, extension: str = ".xlsx") -> list:
     description="Unir os catálogos de teses e dissertações e salvar em parquet.",  # noqa
     log_prints=True,
 )
+@profiled
 def load_and_process_data(output_dir: str = "./data") -> None:
     """Carrega e processa os dados do Catálogo de Teses e Dissertações.
 
     Args:
         output_dir (str, optional): diretório dos dados. Defaults to "data".
     """
+    tic = time.perf_counter()
     files = list_files(output_dir) or []
     print(files)
     dfs = []
 
     print("Carregando catálogos de teses e dissertações...")
+    inferred_bytes = 0
     for file in files:
-        df = pd.read_excel(file)
-        dfs.append(df)
+        with open_file(file) as f:
+            df = pd.read_excel(f)
+        inferred_bytes += memory_usage(df)
+        dfs.append(apply_schema(df))
 
     print("Unindo conjunto de dados...")
-    df = pd.concat(dfs, ignore_index=True)
-
-    df["DH_INICIO_AREA_CONC"] = pd.to_datetime(
-        df["DH_INICIO_AREA_CONC"], format=DT_FORMAT
+    df = concat_catalogs(dfs)
+    validate_schema(df)
+    typed_bytes = memory_usage(df)
+    print(
+        f"Memória do catálogo: {typed_bytes / 2**20:.1f} MB "
+        f"({inferred_bytes / 2**20:.1f} MB com os tipos inferidos)"
     )
-    df["DH_FIM_AREA_CONC"] = pd.to_datetime(
-        df["DH_FIM_AREA_CONC"], format=DT_FORMAT
-    )
-    df["DH_INICIO_LINHA"] = pd.to_datetime(
-        df["DH_INICIO_LINHA"], format=DT_FORMAT
-    )
-    df["DH_FIM_LINHA"] = pd.to_datetime(df["DH_FIM_LINHA"], format=DT_FORMAT)
-    df["DT_TITULACAO"] = pd.to_datetime(df["DT_TITULACAO"], format=DT_FORMAT)
-    df["DT_MATRICULA"] = pd.to_datetime(df["DT_MATRICULA"], format=DT_FORMAT)
 
     print("Salvando em parquet...")
     df = df.drop_duplicates()
-    df.to_parquet(
-        os.path.join(output_dir, "catalogo_de_teses_e_dissertacoes.parquet")
+    write_parquet(
+        df,
+        os.path.join(output_dir, "catalogo_de_teses_e_dissertacoes.parquet"),
+    )
+    record_throughput(
+        "load_and_process_data", "rows", len(df), time.perf_counter() - tic
     )
 
 
@@ -271,3 +287,4 @@ def main(output_dir: str = "./data") -> None:
         etag = get_resource_etag(url)
         download(url, etag=etag, output_dir=output_dir)
     load_and_process_data(output_dir)
+    push_metrics("download")
@@ -0,0 +1,170 @@
+"""Servidor local de embeddings com agrupamento dinâmico das requisições.
+
+O modelo INSTRUCTOR é carregado uma única vez e compartilhado por todas as
+sessões e réplicas da aplicação no mesmo host. As requisições que chegam
+ao mesmo tempo são reunidas em micro-lotes, limitados pelo tamanho máximo
+do lote e por uma janela máxima de espera, e codificadas em uma única
+chamada ao modelo.
+
+Exemplo:
+    uvicorn src.embedding_server:app --uds /tmp/embeddings.sock
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Callable
+
+import numpy as np
+from fastapi import FastAPI, Request
+from pydantic import BaseModel, Field
+
+from src.config import logger, settings
+from src.metrics import metrics_app, stage
+
+
+class EmbedRequest(BaseModel):
+    texts: list[str] = Field(min_length=1)
+
+
+class EmbedResponse(BaseModel):
+    embeddings: list[list[float]]
+
+
+class MicroBatcher:
+    """Agrupa requisições concorrentes de codificação em micro-lotes.
+
+    Args:
+        encode (Callable[[list[str]], list]): Função que codifica uma lista
+        de textos.
+        max_batch_size (int, optional): Máximo de textos por lote. Defaults
+        to 64.
+        max_wait_ms (float, optional): Tempo máximo, em milissegundos, que o
+        primeiro pedido de um lote aguarda por outros. Defaults to 5.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[list[str]], list],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5,
+    ) -> None:
+        self.encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.texts = 0
+        self._queue = None
+        self._worker = None
+        # O modelo é usado por uma única thread por vez.
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, texts: list[str]) -> list:
+        """Enfileira os textos e aguarda os embeddings correspondentes.
+
+        Args:
+            texts (list[str]): Textos a codificar.
+
+        Returns:
+            list: Embeddings na mesma ordem de `texts`.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((texts, future))
+        return await future
+
+    async def _collect(self) -> list[tuple[list[str], asyncio.Future]]:
+        requests = [await self._queue.get()]
+        size = len(requests[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            requests.append(request)
+            size += len(request[0])
+        return requests
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            requests = await self._collect()
+            texts = [
+                text for request_texts, _ in requests for text in request_texts
+            ]
+            try:
+                with stage("embedding_batch"):
+                    embeddings = await loop.run_in_executor(
+                        self._executor, self.encode, texts
+                    )
+            except Exception as e:
+                logger.error(f"Error encoding batch: {e}")
+                for _, future in requests:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.texts += len(texts)
+            start = 0
+            for request_texts, future in requests:
+                end = start + len(request_texts)
+                if not future.done():
+                    future.set_result(embeddings[start:end])
+                start = end
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Carrega o modelo e inicia o agrupador de requisições."""
+    from src.extract_embeddings import (  # noqa: PLC0415
+        ThesisEmbeddingFunction,
+    )
+
+    embedding_function = ThesisEmbeddingFunction()
+    app.state.batcher = MicroBatcher(
+        embedding_function,
+        max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+        max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+    )
+    app.state.batcher.start()
+    logger.info("Embedding server ready")
+    yield
+    await app.state.batcher.stop()
+
+
+app = FastAPI(title="Servidor de embeddings", lifespan=lifespan)
+app.mount("/metrics", metrics_app())
+
+
+@app.get("/health")
+async def health(request: Request) -> dict:
+    batcher = request.app.state.batcher
+    return {
+        "status": "ok",
+        "batches": batcher.batches,
+        "texts": batcher.texts,
+    }
+
+
+@app.post("/embed")
+async def embed(body: EmbedRequest, request: Request) -> EmbedResponse:
+    """Codifica os textos, agrupando-os com requisições concorrentes."""
+    embeddings = await request.app.state.batcher.submit(body.texts)
+    return EmbedResponse(embeddings=np.asarray(embeddings).tolist())
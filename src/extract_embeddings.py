@@ -1,15 +1,68 @@
 import hashlib
+import json
+import os
+import shutil
+import time
 
 import chromadb
+import httpx
+import numpy as np
 import pandas as pd
 from chromadb import Documents, EmbeddingFunction, Embeddings, Settings
 from chromadb.utils.batch_utils import create_batches
 from prefect import flow, task
-from prefect.cache_policies import INPUTS
+from prefect.task_runners import ThreadPoolTaskRunner
 from tqdm.auto import tqdm
 
-from instructor_embedding.InstructorEmbedding import INSTRUCTOR
-from src.config import settings
+from src.collection_alias import (
+    garbage_collect,
+    list_versions,
+    resolve_alias,
+    switch_alias,
+    validate_collection,
+    version_name,
+    versioned_path,
+)
+from src.config import logger, settings
+from src.dedup import GROUPED_SUFFIX, deduplicate, grouped_metadata
+from src.facets import FacetIndex
+from src.metrics import push_metrics, record_throughput
+from src.profiling import profiled
+from src.routing import ShardedCollection, shard_collection_name, shard_start
+from src.storage import (
+    checkpoint_dir,
+    fingerprint,
+    handoff_path,
+    read_arrow,
+    read_parquet,
+    write_arrow,
+)
+
+THESIS_COLUMNS = [
+    "AN_BASE",
+    "SG_ENTIDADE_ENSINO",
+    "NM_ENTIDADE_ENSINO",
+    "NM_PRODUCAO",
+    "NM_SUBTIPO_PRODUCAO",
+    "NM_GRAU_ACADEMICO",
+    "NM_REGIAO",
+    "SG_UF_IES",
+    "NM_UF_IES",
+    "NM_GRANDE_AREA_CONHECIMENTO",
+    "NM_AREA_CONHECIMENTO",
+    "DS_RESUMO",
+]
+
+
+def __getattr__(name: str):
+    """Importa o modelo INSTRUCTOR (e, com ele, o sentence-transformers e o
+    torch) apenas quando for utilizado pela primeira vez."""
+    if name == "INSTRUCTOR":
+        from instructor_embedding.InstructorEmbedding import INSTRUCTOR  # noqa: PLC0415
+
+        globals()["INSTRUCTOR"] = INSTRUCTOR
+        return INSTRUCTOR
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class ThesisEmbeddingFunction(EmbeddingFunction):
@@ -20,7 +73,8 @@ class ThesisEmbeddingFunction(EmbeddingFunction):
     """
 
     def __init__(self) -> None:
-        self.model = INSTRUCTOR(
+        instructor = globals().get("INSTRUCTOR") or __getattr__("INSTRUCTOR")
+        self.model = instructor(
             settings.MODEL_NAME_OR_PATH, device=settings.DEVICE
         )
 
@@ -42,6 +96,39 @@ class ThesisEmbeddingFunction(EmbeddingFunction):
         return embs
 
 
+class RemoteEmbeddingFunction(EmbeddingFunction):
+    """Embeddings obtidos do servidor local de embeddings.
+
+    Permite que várias sessões e réplicas compartilhem um único modelo
+    carregado em `src.embedding_server`, via HTTP ou socket Unix.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        socket_path: str | None = None,
+        timeout: float = 30,
+    ) -> None:
+        # Um caminho vazio (variável em branco no .env) equivale a HTTP.
+        transport = httpx.HTTPTransport(uds=socket_path or None, retries=2)
+        self.client = httpx.Client(
+            base_url=url, transport=transport, timeout=timeout
+        )
+
+    def __call__(self, documents: Documents) -> Embeddings:
+        """Envia os documentos ao servidor e retorna os embeddings.
+
+        Args:
+            documents (Documents): Uma lista de documentos.
+
+        Returns:
+            Uma lista de embeddings correspondentes aos documentos.
+        """
+        response = self.client.post("/embed", json={"texts": list(documents)})
+        response.raise_for_status()
+        return np.array(response.json()["embeddings"], dtype=np.float32)
+
+
 @task
 def create_chroma_client(
     host: str,
@@ -71,59 +158,128 @@ def create_chroma_client(
     )
 
 
+@task
+def create_persistent_chroma_client(path: str) -> chromadb.PersistentClient:
+    """Crie um cliente ChromaDB local, persistido em disco.
+
+    Args:
+        path (str): Diretório do banco local.
+
+    Returns:
+        Uma instância de `chromadb.PersistentClient`.
+    """
+
+    return chromadb.PersistentClient(path=path)
+
+
+@task(cache_policy=None)
+def create_configured_chroma_client() -> chromadb.ClientAPI:
+    """Cria o cliente ChromaDB conforme `CHROMA_CLIENT_MODE`.
+
+    Returns:
+        Um cliente HTTP ou um cliente local persistido em
+        `CHROMA_PERSIST_PATH`.
+    """
+    if settings.CHROMA_CLIENT_MODE == "persistent":
+        return create_persistent_chroma_client.fn(settings.CHROMA_PERSIST_PATH)
+    return create_chroma_client.fn(
+        host=settings.CHROMA_CLIENT_HOSTNAME,
+        port=settings.CHROMA_CLIENT_PORT,
+        auth_provider=settings.CHROMA_CLIENT_AUTH_PROVIDER,
+        auth_credentials=(
+            settings.CHROMA_CLIENT_AUTH_CREDENTIALS.get_secret_value()
+        ),
+    )
+
+
+def hnsw_metadata(overrides: dict | None = None) -> dict:
+    """Monta os parâmetros do índice HNSW a partir das configurações.
+
+    Args:
+        overrides (dict | None, optional): Parâmetros que substituem os das
+        configurações, com as chaves do ChromaDB (`hnsw:M`, ...). Defaults
+        to None.
+
+    Returns:
+        dict: Metadados da coleção com os parâmetros do índice.
+    """
+    metadata = {
+        "hnsw:space": settings.HNSW_SPACE,
+        "hnsw:M": settings.HNSW_M,
+        "hnsw:construction_ef": settings.HNSW_CONSTRUCTION_EF,
+        "hnsw:search_ef": settings.HNSW_SEARCH_EF,
+        "hnsw:batch_size": settings.HNSW_BATCH_SIZE,
+        "hnsw:sync_threshold": settings.HNSW_SYNC_THRESHOLD,
+    }
+    metadata.update(overrides or {})
+    return metadata
+
+
 @task(cache_policy=None)
 def create_thesis_collection(
     client: chromadb.HttpClient,
+    embedding_function: EmbeddingFunction | None = None,
+    name: str = "thesis_capes",
 ) -> chromadb.Collection:
     """Cria uma coleção no ChromaDB para armazenar os embeddings das teses.
 
+    Os parâmetros do índice HNSW vêm das configurações e só têm efeito
+    quando a coleção ainda não existe.
+
     Args:
         client (HttpClient): Um cliente ChromaDB.
+        embedding_function (EmbeddingFunction | None, optional): Função de
+        embeddings da coleção. Defaults to `ThesisEmbeddingFunction()`.
+        name (str, optional): Nome da coleção. Defaults to "thesis_capes".
 
     Returns:
         Uma instância de `chromadb.Collection`.
     """
 
     return client.get_or_create_collection(
-        name="thesis_capes",
-        embedding_function=ThesisEmbeddingFunction(),
+        name=name,
+        embedding_function=embedding_function or ThesisEmbeddingFunction(),
+        metadata=hnsw_metadata(),
     )
 
 
 @task(
     name="Pré-processamento dos dados das teses",
     description="Gera o identificador único para cada tese e seleciona colunas de interesse.",  # noqa
-    cache_policy=INPUTS,
+    cache_policy=None,
 )
-def preprocess_thesis_data(file_path: str) -> pd.DataFrame:
+@profiled
+def preprocess_thesis_data(
+    file_path: str, handoff_dir: str | None = None
+) -> str:
     """Pré-processamento dos dados das teses.
 
+    O resultado é gravado em um arquivo Arrow nomeado pela impressão
+    digital do arquivo de entrada (tamanho e data de modificação, ou ETag
+    no S3) e reaproveitado enquanto o arquivo não mudar.
+
     Args:
         file_path (str): O caminho do arquivo contendo o conjunto de dados.
+        handoff_dir (str | None, optional): Diretório dos arquivos
+        intermediários. Defaults to `HANDOFF_DIR`.
 
     Returns:
-        Um DataFrame contendo registros únicos e sem valores nulos no
-        campo do resumo.
+        str: Caminho do arquivo Arrow com registros únicos e sem valores
+        nulos no campo do resumo.
     """
+    output_path = handoff_path(
+        handoff_dir or settings.HANDOFF_DIR,
+        "preprocess",
+        fingerprint(file_path),
+        *THESIS_COLUMNS,
+    )
+    if os.path.exists(output_path):
+        print(f"Reaproveitando dados pré-processados de {output_path}")
+        return output_path
 
     print("Carregando dados...")
-    df = pd.read_parquet(
-        file_path,
-        columns=[
-            "AN_BASE",
-            "SG_ENTIDADE_ENSINO",
-            "NM_ENTIDADE_ENSINO",
-            "NM_PRODUCAO",
-            "NM_SUBTIPO_PRODUCAO",
-            "NM_GRAU_ACADEMICO",
-            "NM_REGIAO",
-            "SG_UF_IES",
-            "NM_UF_IES",
-            "NM_GRANDE_AREA_CONHECIMENTO",
-            "NM_AREA_CONHECIMENTO",
-            "DS_RESUMO",
-        ],
-    )
+    tic = time.perf_counter()
+    df = read_parquet(file_path, columns=THESIS_COLUMNS)
     print("Removendo registros duplicados e valores nulos nos resumos...")
     df = df.drop_duplicates()
     df = df.dropna(subset=["DS_RESUMO"])
@@ -136,7 +292,40 @@ def preprocess_thesis_data(file_path: str) -> pd.DataFrame:
         ).hexdigest(),
         axis=1,
     )
-    return df
+    write_arrow(df, output_path)
+    record_throughput(
+        "preprocess_thesis_data", "rows", len(df), time.perf_counter() - tic
+    )
+    return output_path
+
+
+def collection_metadatas(df: pd.DataFrame) -> list[dict]:
+    """Converte os registros nos metadados gravados na coleção.
+
+    O resumo já é o documento da coleção e não é repetido nos metadados.
+    Valores ausentes são omitidos, pois o ChromaDB não aceita `None` nos
+    metadados. Registros agrupados por `deduplicate_abstracts` recebem os
+    marcadores dos valores das duplicatas (ver src/dedup.py).
+
+    Args:
+        df (pd.DataFrame): Registros com os campos exibidos e filtrados.
+
+    Returns:
+        list[dict]: Metadados de cada registro.
+    """
+    records = df.drop(columns="DS_RESUMO", errors="ignore").to_dict(
+        orient="records"
+    )
+    grouped = any(column.endswith(GROUPED_SUFFIX) for column in df.columns)
+    metadatas = []
+    for record in records:
+        metadata = {
+            key: value for key, value in record.items() if not pd.isna(value)
+        }
+        if grouped:
+            metadata.update(grouped_metadata(record))
+        metadatas.append(metadata)
+    return metadatas
 
 
 @task(
@@ -144,6 +333,7 @@ def preprocess_thesis_data(file_path: str) -> pd.DataFrame:
     description="Armazena os embeddings das teses no ChromaDB.",
     cache_policy=None,
 )
+@profiled
 def add_documents_to_collection(
     chroma_client: chromadb.HttpClient,
     collection: chromadb.Collection,
@@ -163,40 +353,510 @@ def add_documents_to_collection(
         e dissertações.
     """
 
+    tic = time.perf_counter()
     batches = create_batches(
         api=chroma_client, ids=ids, documents=documents, metadatas=metadatas
     )
     for batch in tqdm(batches, desc="Adding documents"):
         batch_ids, _, batch_metadatas, batch_documents = batch
-        collection.add(
+        # `upsert` permite repetir um shard interrompido no meio sem
+        # duplicar nem rejeitar os documentos já gravados.
+        collection.upsert(
             ids=batch_ids, documents=batch_documents, metadatas=batch_metadatas
         )
+    record_throughput(
+        "add_documents_to_collection",
+        "docs",
+        len(ids),
+        time.perf_counter() - tic,
+    )
 
 
-@flow(
-    name="Extração de embeddings das teses",
+@task(
+    name="Agrupamento de resumos duplicados",
+    description="Indexa uma única vez os resumos idênticos ou quase idênticos.",  # noqa
+    cache_policy=None,
 )
-def main(file_path: str = "./data/catalogo_de_teses_e_dissertacoes") -> None:
-    chroma_client = create_chroma_client(
-        host=settings.CHROMA_CLIENT_HOSTNAME,
-        port=settings.CHROMA_CLIENT_PORT,
-        auth_provider=settings.CHROMA_CLIENT_AUTH_PROVIDER,
-        auth_credentials=(
-            settings.CHROMA_CLIENT_AUTH_CREDENTIALS.get_secret_value()
-        ),
+@profiled
+def deduplicate_abstracts(path: str, handoff_dir: str | None = None) -> str:
+    """Agrupa os resumos duplicados conforme `DEDUP_MODE`.
+
+    Args:
+        path (str): Arquivo Arrow gerado por `preprocess_thesis_data`.
+        handoff_dir (str | None, optional): Diretório dos arquivos
+        intermediários. Defaults to `HANDOFF_DIR`.
+
+    Returns:
+        str: Caminho do arquivo Arrow com um registro por resumo distinto
+        e os metadados das duplicatas agregados.
+    """
+    if settings.DEDUP_MODE == "none":
+        return path
+    output_path = handoff_path(
+        handoff_dir or settings.HANDOFF_DIR,
+        "deduplicate",
+        fingerprint(path),
+        settings.DEDUP_MODE,
+        settings.DEDUP_THRESHOLD,
     )
-    collection = create_thesis_collection(client=chroma_client)
+    if os.path.exists(output_path):
+        print(f"Reaproveitando resumos agrupados de {output_path}")
+        return output_path
+    tic = time.perf_counter()
+    df = read_arrow(path)
+    result = deduplicate(
+        df,
+        near=settings.DEDUP_MODE == "near",
+        threshold=settings.DEDUP_THRESHOLD,
+    )
+    write_arrow(result, output_path)
+    record_throughput(
+        "deduplicate_abstracts", "rows", len(df), time.perf_counter() - tic
+    )
+    print(f"{len(df) - len(result)} resumos duplicados agrupados")
+    return output_path
 
-    df = preprocess_thesis_data(file_path=file_path)
 
-    ids = df["id"].tolist()
-    documents = df["DS_RESUMO"].tolist()
-    metadatas = df.to_dict(orient="records")
+@task(
+    name="Construção do índice de facetas",
+    description="Pré-computa bitmaps dos metadados de baixa cardinalidade.",
+    cache_policy=None,
+)
+def build_facet_index(df: pd.DataFrame, path: str) -> str:
+    """Constrói e salva o índice de facetas dos documentos da coleção.
+
+    Args:
+        df (pd.DataFrame): DataFrame com os documentos indexados.
+        path (str): Caminho onde o índice será salvo.
+
+    Returns:
+        str: Caminho do índice salvo.
+    """
+    facet_index = FacetIndex.from_dataframe(df)
+    facet_index.save(path)
+    print(f"Índice de facetas salvo em {path}")
+    return path
+
+
+@task(
+    name="Ajuste da redução de dimensão",
+    description="Ajusta a projeção dos embeddings sobre uma amostra dos resumos.",  # noqa
+    cache_policy=None,
+)
+def fit_embedding_reducer(
+    documents: list[str],
+    embedding_function: EmbeddingFunction,
+    path: str,
+) -> EmbeddingFunction:
+    """Ajusta e salva a redução de dimensão configurada em
+    `EMBEDDING_REDUCTION`, reportando a perda de recall.
+
+    Uma projeção já salva em `path` com o mesmo método e dimensão é
+    reaproveitada, para que uma construção retomada após uma falha use a
+    mesma projeção dos shards já indexados.
 
-    add_documents_to_collection(
+    Args:
+        documents (list[str]): Resumos das teses.
+        embedding_function (EmbeddingFunction): Função de embeddings
+        original.
+        path (str): Caminho onde a projeção será salva.
+
+    Returns:
+        EmbeddingFunction: Função de embeddings com a projeção aplicada.
+    """
+    from src.reduction import (  # noqa: PLC0415
+        EmbeddingReducer,
+        ReducedEmbeddingFunction,
+        fit_on_sample,
+        sample_embeddings,
+    )
+
+    try:
+        reducer = EmbeddingReducer.load(path)
+    except OSError:
+        reducer = None
+    if (
+        reducer is not None
+        and reducer.method == settings.EMBEDDING_REDUCTION
+        and reducer.n_components == settings.EMBEDDING_REDUCTION_DIM
+    ):
+        logger.info(f"Reusing reducer saved in {path}")
+        return ReducedEmbeddingFunction(embedding_function, reducer)
+
+    embeddings = sample_embeddings(
+        documents, embedding_function, settings.EMBEDDING_REDUCTION_SAMPLE_SIZE
+    )
+    reducer, recall = fit_on_sample(
+        embeddings,
+        settings.EMBEDDING_REDUCTION_DIM,
+        method=settings.EMBEDDING_REDUCTION,
+    )
+    reducer.save(path)
+    logger.info(
+        f"Saved {reducer.method} reducer ({reducer.n_components} dimensions, "
+        f"recall@10 {recall:.3f}) to {path}"
+    )
+    return ReducedEmbeddingFunction(embedding_function, reducer)
+
+
+def assign_shards(
+    df: pd.DataFrame, shard_by: str, n_shards: int, span: int = 1
+) -> pd.Series:
+    """Shard de cada documento na indexação.
+
+    Args:
+        df (pd.DataFrame): Documentos, com as colunas `id` e `AN_BASE`.
+        shard_by (str): `year`, um shard por faixa de `span` anos de
+        `AN_BASE`, ou `hash`, shards por faixa do hash do id.
+        n_shards (int): Número de shards no modo `hash`.
+        span (int, optional): Anos por shard no modo `year`. Defaults to 1.
+
+    Returns:
+        pd.Series: Nome do shard de cada documento; no modo `year`, o ano
+        inicial da faixa.
+    """
+    if shard_by == "year":
+        return (
+            df["AN_BASE"]
+            .astype(int)
+            .map(lambda year: str(shard_start(year, span)))
+        )
+    return df["id"].map(
+        lambda value: str(
+            int(
+                hashlib.md5(
+                    str(value).encode(), usedforsecurity=False
+                ).hexdigest()[:8],
+                16,
+            )
+            % n_shards
+        )
+    )
+
+
+def shard_plan() -> tuple[str, int, int]:
+    """Modo, número e anos por shard da indexação.
+
+    Com `YEAR_SHARD_SPAN`, os shards são as faixas de anos, cada uma
+    gravada em uma coleção própria; caso contrário, seguem
+    `INDEX_SHARD_BY` e `INDEX_SHARDS`.
+    """
+    if settings.YEAR_SHARD_SPAN > 0:
+        return "year", settings.INDEX_SHARDS, settings.YEAR_SHARD_SPAN
+    return settings.INDEX_SHARD_BY, settings.INDEX_SHARDS, 1
+
+
+@task(
+    name="Divisão dos documentos em shards",
+    description="Atribui cada documento a um shard da indexação.",
+    cache_policy=None,
+)
+def plan_index_shards(
+    path: str, handoff_dir: str | None = None
+) -> tuple[str, list[str]]:
+    """Divide os documentos em shards conforme `shard_plan`.
+
+    Args:
+        path (str): Arquivo Arrow com os documentos a indexar.
+        handoff_dir (str | None, optional): Diretório dos arquivos
+        intermediários. Defaults to `HANDOFF_DIR`.
+
+    Returns:
+        tuple[str, list[str]]: Arquivo Arrow com a coluna `SHARD` e os
+        nomes dos shards.
+    """
+    plan = shard_plan()
+    output_path = handoff_path(
+        handoff_dir or settings.HANDOFF_DIR,
+        "shards",
+        fingerprint(path),
+        *plan,
+    )
+    if os.path.exists(output_path):
+        print(f"Reaproveitando a divisão em shards de {output_path}")
+        shards = read_arrow(output_path, columns=["SHARD"])["SHARD"]
+    else:
+        df = read_arrow(path)
+        df["SHARD"] = assign_shards(df, *plan)
+        write_arrow(df, output_path)
+        shards = df["SHARD"]
+    return output_path, sorted(shards.unique().tolist())
+
+
+def _count_existing(collection: chromadb.Collection, ids: list[str]) -> int:
+    """Conta quantos dos ids já estão gravados na coleção."""
+    batch_size = settings.HNSW_BATCH_SIZE * 10
+    return sum(
+        len(collection.get(ids=ids[i : i + batch_size], include=[])["ids"])
+        for i in range(0, len(ids), batch_size)
+    )
+
+
+@task(
+    name="Indexação de um shard",
+    description="Armazena os embeddings de um shard das teses no ChromaDB.",
+    task_run_name="index-shard-{shard}",
+    cache_policy=None,
+    retries=2,
+    retry_delay_seconds=10,
+)
+@profiled
+def index_shard(
+    chroma_client: chromadb.ClientAPI,
+    collection: chromadb.Collection,
+    path: str,
+    shard: str,
+    checkpoints: str,
+) -> dict:
+    """Indexa os documentos de um shard e grava o marcador de conclusão.
+
+    Shards com marcador são pulados, de modo que uma execução interrompida
+    é retomada apenas com os shards que faltam.
+
+    Args:
+        chroma_client (ClientAPI): Cliente do ChromaDB.
+        collection (Collection): Coleção em construção.
+        path (str): Arquivo Arrow gerado por `plan_index_shards`.
+        shard (str): Nome do shard.
+        checkpoints (str): Diretório dos marcadores de conclusão.
+
+    Raises:
+        ValueError: Se a coleção não tiver todos os documentos do shard
+        depois da indexação.
+
+    Returns:
+        dict: Shard, documentos indexados, duração e documentos por
+        segundo.
+    """
+    checkpoint = os.path.join(checkpoints, f"shard-{shard}.json")
+    if os.path.exists(checkpoint):
+        with open(checkpoint, encoding="utf-8") as f:
+            report = json.load(f)
+        print(f"Shard {shard} já indexado ({report['count']} documentos)")
+        return report
+
+    tic = time.perf_counter()
+    df = read_arrow(path)
+    df = df[df["SHARD"] == shard].drop(columns="SHARD")
+    ids = df["id"].tolist()
+    add_documents_to_collection.fn(
         chroma_client=chroma_client,
         collection=collection,
         ids=ids,
-        documents=documents,
-        metadatas=metadatas,
+        documents=df["DS_RESUMO"].tolist(),
+        metadatas=collection_metadatas(df),
+    )
+    found = _count_existing(collection, ids)
+    if found != len(ids):
+        raise ValueError(
+            f"Shard {shard}: {found} of {len(ids)} documents in "
+            f"{collection.name}"
+        )
+    seconds = time.perf_counter() - tic
+    report = {
+        "shard": shard,
+        "count": len(ids),
+        "seconds": round(seconds, 3),
+        "docs_per_second": round(len(ids) / seconds, 1) if seconds else None,
+    }
+    record_throughput(f"index_shard:{shard}", "docs", len(ids), seconds)
+    with open(checkpoint, "w", encoding="utf-8") as f:
+        json.dump(report, f)
+    return report
+
+
+@task(
+    name="Verificação dos shards",
+    description="Confere se todos os shards foram gravados na coleção.",
+    cache_policy=None,
+)
+def verify_shards(
+    collection: chromadb.Collection, reports: list[dict], expected_count: int
+) -> None:
+    """Confere a coleção montada pelos shards antes da publicação.
+
+    Args:
+        collection (Collection): Coleção em construção.
+        reports (list[dict]): Relatórios retornados por `index_shard`.
+        expected_count (int): Número de documentos a indexar.
+
+    Raises:
+        ValueError: Se a soma dos shards ou a contagem da coleção divergir
+        de `expected_count`.
+    """
+    for report in reports:
+        print(
+            f"Shard {report['shard']}: {report['count']} documentos, "
+            f"{report['docs_per_second']} docs/s"
+        )
+    indexed = sum(report["count"] for report in reports)
+    if indexed != expected_count:
+        raise ValueError(
+            f"Shards indexed {indexed} documents, expected {expected_count}"
+        )
+    count = collection.count()
+    if count != expected_count:
+        raise ValueError(
+            f"{collection.name} has {count} documents, "
+            f"expected {expected_count}"
+        )
+
+
+def resume_or_create_version(
+    chroma_client: chromadb.ClientAPI, state_path: str
+) -> int:
+    """Escolhe a versão da coleção a construir.
+
+    Uma versão iniciada sobre as mesmas entradas e ainda não publicada é
+    retomada; caso contrário, é criada uma nova versão.
+
+    Args:
+        chroma_client (ClientAPI): Cliente do ChromaDB.
+        state_path (str): Arquivo com a versão em construção.
+
+    Returns:
+        int: Número da versão.
+    """
+    versions = list_versions(chroma_client)
+    if os.path.exists(state_path):
+        with open(state_path, encoding="utf-8") as f:
+            version = json.load(f)["version"]
+        active = resolve_alias(chroma_client)["collection"]
+        if version in versions and version_name(version) != active:
+            print(f"Retomando a construção de {version_name(version)}")
+            return version
+    version = max(versions, default=0) + 1
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version}, f)
+    return version
+
+
+@task(
+    name="Publicação da nova versão da coleção",
+    description="Valida a nova versão, troca o alias e remove versões antigas.",  # noqa
+    cache_policy=None,
+)
+def publish_collection(  # noqa: PLR0913
+    chroma_client: chromadb.ClientAPI,
+    collection: chromadb.Collection,
+    expected_count: int,
+    facet_index_path: str,
+    *,
+    reducer_path: str | None = None,
+    deduplicated: bool = False,
+) -> None:
+    """Torna ativa a versão recém-construída da coleção.
+
+    Args:
+        chroma_client (ClientAPI): Cliente do ChromaDB.
+        collection (Collection | ShardedCollection): Nova versão da
+        coleção.
+        expected_count (int): Número de documentos indexados.
+        facet_index_path (str): Índice de facetas da nova versão.
+        reducer_path (str | None, optional): Projeção dos embeddings da
+        nova versão. Defaults to None, sem redução.
+        deduplicated (bool, optional): Se a versão tem resumos agrupados.
+        Defaults to False.
+    """
+    report = validate_collection(collection, expected_count)
+    print(f"Coleção {collection.name} validada: {report}")
+    artifacts = {"facet_index_path": facet_index_path}
+    if reducer_path:
+        artifacts["reducer_path"] = reducer_path
+    if deduplicated:
+        artifacts["deduplicated"] = True
+    if isinstance(collection, ShardedCollection):
+        artifacts["year_shards"] = ",".join(map(str, collection.shards))
+        artifacts["year_shard_span"] = collection.span
+    switch_alias(chroma_client, collection.name, **artifacts)
+    garbage_collect(chroma_client, keep=settings.COLLECTION_KEEP_VERSIONS)
+
+
+@flow(
+    name="Extração de embeddings das teses",
+    task_runner=ThreadPoolTaskRunner(max_workers=settings.INDEX_CONCURRENCY),
+)
+def main(file_path: str = "./data/catalogo_de_teses_e_dissertacoes") -> None:
+    chroma_client = create_configured_chroma_client()
+
+    # As etapas trocam arquivos Arrow, lidos por mapeamento de memória, em
+    # vez de DataFrames serializados pelo Prefect.
+    preprocessed_path = preprocess_thesis_data(file_path=file_path)
+    deduplicated_path = deduplicate_abstracts(preprocessed_path)
+    df = read_arrow(deduplicated_path)
+
+    shards_path, shards = plan_index_shards(deduplicated_path)
+    # Os marcadores dos shards concluídos e a versão em construção ficam
+    # em um diretório próprio das entradas, para que uma nova execução
+    # após uma falha retome a mesma versão com os shards que faltam.
+    checkpoints = checkpoint_dir(
+        settings.HANDOFF_DIR, "index", fingerprint(shards_path)
+    )
+    # A nova versão é construída em uma coleção própria; a coleção ativa
+    # continua atendendo às consultas até a troca do alias.
+    version = resume_or_create_version(
+        chroma_client, os.path.join(checkpoints, "version.json")
+    )
+    # Uma única função de embeddings (e um único modelo carregado) é
+    # compartilhada por todas as coleções da versão. A projeção também é
+    # própria da versão: a versão ativa continua sendo consultada com a
+    # projeção usada na construção dela.
+    embedding_function, reducer_path = ThesisEmbeddingFunction(), None
+    if settings.EMBEDDING_REDUCTION != "none":
+        reducer_path = versioned_path(settings.EMBEDDING_REDUCER_PATH, version)
+        embedding_function = fit_embedding_reducer(
+            df["DS_RESUMO"].tolist(),
+            embedding_function,
+            path=reducer_path,
+        )
+    if settings.YEAR_SHARD_SPAN > 0:
+        # Cada faixa de anos é gravada em uma coleção própria, e as buscas
+        # consultam apenas as faixas permitidas pelo filtro de ano.
+        collections = {
+            shard: create_thesis_collection(
+                client=chroma_client,
+                embedding_function=embedding_function,
+                name=shard_collection_name(version_name(version), int(shard)),
+            )
+            for shard in shards
+        }
+        collection = ShardedCollection(
+            version_name(version),
+            {int(shard): value for shard, value in collections.items()},
+            span=settings.YEAR_SHARD_SPAN,
+        )
+    else:
+        collection = create_thesis_collection(
+            client=chroma_client,
+            embedding_function=embedding_function,
+            name=version_name(version),
+        )
+        collections = dict.fromkeys(shards, collection)
+
+    futures = [
+        index_shard.submit(
+            chroma_client=chroma_client,
+            collection=collections[shard],
+            path=shards_path,
+            shard=shard,
+            checkpoints=checkpoints,
+        )
+        for shard in shards
+    ]
+    verify_shards(
+        collection,
+        [future.result() for future in futures],
+        expected_count=len(df),
+    )
+    facet_index_path = versioned_path(settings.FACET_INDEX_PATH, version)
+    build_facet_index(df, path=facet_index_path)
+    publish_collection(
+        chroma_client,
+        collection,
+        expected_count=len(df),
+        facet_index_path=facet_index_path,
+        reducer_path=reducer_path,
+        deduplicated=settings.DEDUP_MODE != "none",
     )
+    shutil.rmtree(checkpoints, ignore_errors=True)
+    push_metrics("extract_embeddings")
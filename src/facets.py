@@ -0,0 +1,290 @@
+"""Índice de facetas para filtragem rápida dos metadados das teses.
+
+Os filtros de baixa cardinalidade (ano, UF, região, grau acadêmico e grande
+área) são pré-computados como bitmaps compactados, um por valor de faceta,
+indexados pela posição de cada documento na coleção. A árvore `where`
+gerada pelo LLM é resolvida com operações bit a bit, sem passar pela camada
+de metadados do ChromaDB.
+
+Nas coleções com resumos agrupados (src/dedup.py), cada documento é marcado
+em todos os valores do grupo (`<COLUNA>_AGRUPADO`), como nos filtros
+reescritos por `expand_where`.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import smart_open as so
+
+from src.dedup import GROUPED_SUFFIX, split_grouped
+
+FACET_COLUMNS = [
+    "AN_BASE",
+    "SG_UF_IES",
+    "NM_REGIAO",
+    "NM_GRAU_ACADEMICO",
+    "NM_GRANDE_AREA_CONHECIMENTO",
+]
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+_COMPARISONS = {
+    "$gt": lambda a, b: a > b,
+    "$gte": lambda a, b: a >= b,
+    "$lt": lambda a, b: a < b,
+    "$lte": lambda a, b: a <= b,
+}
+
+
+def _to_python(value):
+    """Converte escalares do NumPy/pandas para tipos nativos do Python."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class FacetIndex:
+    """Bitmaps compactados por valor de faceta.
+
+    Cada bitmap é um vetor de bits empacotados (`np.packbits`) em que o bit
+    `i` indica se o documento na posição `i` de `ids` possui o valor.
+    Nas colunas de `grouped`, um documento pode ter mais de um valor.
+    """
+
+    def __init__(
+        self,
+        ids: list[str],
+        values: dict[str, list],
+        bitmaps: dict[str, np.ndarray],
+        grouped: list[str] | None = None,
+    ) -> None:
+        self.ids = np.asarray(ids)
+        self.size = len(ids)
+        self.values = values
+        self.bitmaps = bitmaps
+        self.grouped = list(grouped or [])
+        self._positions = {
+            column: {value: i for i, value in enumerate(column_values)}
+            for column, column_values in values.items()
+        }
+        n_bytes = (self.size + 7) // 8
+        self._all = np.packbits(np.ones(self.size, dtype=bool))
+        self._none = np.zeros(n_bytes, dtype=np.uint8)
+
+    @classmethod
+    def from_dataframe(
+        cls,
+        df: pd.DataFrame,
+        columns: list[str] = FACET_COLUMNS,
+        id_column: str = "id",
+    ) -> "FacetIndex":
+        """Constrói o índice a partir do DataFrame indexado na coleção.
+
+        Args:
+            df (pd.DataFrame): DataFrame com os documentos da coleção.
+            columns (list[str], optional): Colunas de facetas. Defaults to
+            FACET_COLUMNS.
+            id_column (str, optional): Coluna com o identificador dos
+            documentos. Defaults to "id".
+
+        Returns:
+            FacetIndex: Índice de facetas.
+        """
+        values = {}
+        bitmaps = {}
+        grouped = []
+        for column in columns:
+            if column not in df.columns:
+                continue
+            keys = df[column].reset_index(drop=True)
+            rows = np.arange(len(df))
+            if f"{column}{GROUPED_SUFFIX}" in df.columns:
+                # Valores das duplicatas agrupadas no mesmo documento.
+                extra = (
+                    df[f"{column}{GROUPED_SUFFIX}"]
+                    .reset_index(drop=True)
+                    .map(split_grouped)
+                    .explode()
+                    .dropna()
+                )
+                if pd.api.types.is_numeric_dtype(keys):
+                    extra = pd.to_numeric(extra)
+                keys = pd.concat([keys.astype(object), extra.astype(object)])
+                rows = np.concatenate([rows, extra.index.to_numpy(int)])
+                grouped.append(column)
+            codes, uniques = pd.factorize(keys, use_na_sentinel=True)
+            masks = np.zeros((len(uniques), len(df)), dtype=bool)
+            valid = codes >= 0
+            masks[codes[valid], rows[valid]] = True
+            values[column] = [_to_python(value) for value in uniques]
+            bitmaps[column] = np.packbits(masks, axis=1)
+        return cls(df[id_column].tolist(), values, bitmaps, grouped)
+
+    def save(self, path: str) -> None:
+        """Salva o índice em um arquivo `.npz` local ou no S3.
+
+        Args:
+            path (str): Caminho de destino.
+        """
+        arrays = {f"bitmap:{col}": bits for col, bits in self.bitmaps.items()}
+        with so.open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                ids=self.ids.astype(str),
+                values=np.array(json.dumps(self.values, ensure_ascii=False)),
+                grouped=np.array(self.grouped, dtype=str),
+                **arrays,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "FacetIndex":
+        """Carrega um índice salvo com `save`.
+
+        Args:
+            path (str): Caminho do arquivo `.npz`.
+
+        Returns:
+            FacetIndex: Índice de facetas.
+        """
+        with so.open(path, "rb") as f, np.load(f) as data:
+            values = json.loads(str(data["values"]))
+            bitmaps = {
+                key.removeprefix("bitmap:"): data[key]
+                for key in data.files
+                if key.startswith("bitmap:")
+            }
+            grouped = (
+                data["grouped"].tolist() if "grouped" in data.files else []
+            )
+            return cls(data["ids"].tolist(), values, bitmaps, grouped)
+
+    def _bitmap(self, column: str, value) -> np.ndarray:
+        try:
+            position = self._positions[column].get(value)
+        except TypeError:
+            position = None
+        if position is None:
+            return self._none
+        return self.bitmaps[column][position]
+
+    def _union(self, column: str, values) -> np.ndarray:
+        result = self._none.copy()
+        for value in values:
+            result |= self._bitmap(column, value)
+        return result
+
+    def _resolve_field(
+        self, column: str, condition
+    ) -> tuple[np.ndarray, bool]:
+        if column not in self.bitmaps:
+            return self._all, False
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        result = self._all.copy()
+        exact = True
+        for operator, operand in condition.items():
+            if operator in {"$ne", "$nin"} and column in self.grouped:
+                # Nos documentos agrupados, `$ne` e `$nin` valem para o
+                # registro mantido, que os bitmaps não distinguem.
+                mask, exact = self._all, False
+            elif operator == "$eq":
+                mask = self._bitmap(column, operand)
+            elif operator == "$ne":
+                mask = self._all & ~self._bitmap(column, operand)
+            elif operator == "$in":
+                mask = self._union(column, operand)
+            elif operator == "$nin":
+                mask = self._all & ~self._union(column, operand)
+            elif operator in _COMPARISONS and isinstance(
+                operand, (int, float)
+            ):
+                compare = _COMPARISONS[operator]
+                mask = self._union(
+                    column,
+                    [
+                        value
+                        for value in self.values[column]
+                        if isinstance(value, (int, float))
+                        and compare(value, operand)
+                    ],
+                )
+            else:
+                mask, exact = self._all, False
+            result &= mask
+        return result, exact
+
+    def _resolve(self, where: dict) -> tuple[np.ndarray, bool]:
+        result = self._all.copy()
+        exact = True
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask, clause_exact = self._resolve(clause)
+                    result &= mask
+                    exact = exact and clause_exact
+            elif key == "$or":
+                union = self._none.copy()
+                for clause in condition:
+                    mask, clause_exact = self._resolve(clause)
+                    union |= mask
+                    exact = exact and clause_exact
+                result &= union
+            else:
+                mask, field_exact = self._resolve_field(key, condition)
+                result &= mask
+                exact = exact and field_exact
+        return result, exact
+
+    def resolve(self, where: dict | None) -> tuple[np.ndarray, bool]:
+        """Resolve uma árvore `where` do ChromaDB em um bitmap de candidatos.
+
+        Condições sobre campos que não são facetas não podem ser resolvidas
+        pelo índice; nesse caso o bitmap retornado é um superconjunto dos
+        documentos que satisfazem o filtro.
+
+        Args:
+            where (dict | None): Filtros da consulta.
+
+        Returns:
+            tuple[np.ndarray, bool]: Bitmap empacotado dos candidatos e se
+            ele corresponde exatamente ao filtro.
+        """
+        if not where:
+            return self._all, True
+        return self._resolve(where)
+
+    @staticmethod
+    def count(bitmap: np.ndarray) -> int:
+        """Conta quantos documentos estão presentes no bitmap."""
+        return int(_POPCOUNT[bitmap].sum())
+
+    def candidate_ids(self, bitmap: np.ndarray) -> list[str]:
+        """Lista os identificadores dos documentos presentes no bitmap."""
+        mask = np.unpackbits(bitmap, count=self.size).astype(bool)
+        return self.ids[mask].tolist()
+
+    def counts(
+        self, where: dict | None = None, columns: list[str] | None = None
+    ) -> dict[str, dict]:
+        """Calcula a contagem de documentos por valor de faceta.
+
+        Args:
+            where (dict | None, optional): Filtros aplicados antes da
+            contagem. Defaults to None.
+            columns (list[str] | None, optional): Facetas contadas.
+            Defaults to todas as facetas do índice.
+
+        Returns:
+            dict[str, dict]: Contagem por faceta e valor, em ordem
+            decrescente.
+        """
+        candidates, _ = self.resolve(where)
+        result = {}
+        for column in columns or list(self.bitmaps):
+            totals = _POPCOUNT[self.bitmaps[column] & candidates].sum(axis=1)
+            order = np.argsort(-totals, kind="stable")
+            result[column] = {
+                self.values[column][i]: int(totals[i])
+                for i in order
+                if totals[i] > 0
+            }
+        return result
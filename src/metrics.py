@@ -0,0 +1,244 @@
+"""Métricas de latência, volume de dados e uso dos caches.
+
+As métricas são expostas no formato do Prometheus: pelo endpoint
+`/metrics` da API, pelo servidor HTTP iniciado em `METRICS_PORT` na
+aplicação Streamlit e nos fluxos do Prefect. Quando o OpenTelemetry está
+instalado e configurado, cada etapa também gera um span. Os fluxos do
+Prefect enviam as métricas ao Pushgateway definido em
+`PROMETHEUS_PUSHGATEWAY_URL`, se houver.
+
+O módulo não depende de `src.config`, para que o fluxo de download possa
+utilizá-lo sem as configurações do ChromaDB.
+
+Etapas registradas no caminho de uma pergunta:
+    query_translation, query_encoding, chroma_query, context_building e
+    answer_generation.
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+from loguru import logger
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    make_asgi_app,
+    multiprocess,
+    push_to_gateway,
+    start_http_server,
+)
+
+try:
+    from opentelemetry import trace
+except ImportError:  # pragma: no cover
+    trace = None
+
+_tracer = trace.get_tracer(__name__) if trace is not None else None
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+)
+BYTES_BUCKETS = tuple(2**i for i in range(8, 27, 2))
+
+STAGE_LATENCY = Histogram(
+    "buscador_stage_duration_seconds",
+    "Duração de cada etapa do processamento.",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+PAYLOAD_BYTES = Histogram(
+    "buscador_payload_bytes",
+    "Tamanho dos dados trocados em cada etapa.",
+    ["stage"],
+    buckets=BYTES_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "buscador_llm_tokens_total",
+    "Tokens consumidos nas chamadas ao LLM.",
+    ["model", "kind"],
+)
+CACHE_EVENTS = Counter(
+    "buscador_cache_events_total",
+    "Acertos e faltas dos caches.",
+    ["cache", "result"],
+)
+BACKEND_EVENTS = Counter(
+    "buscador_backend_events_total",
+    "Chamadas agrupadas, novas tentativas e recusas do circuito por serviço.",
+    ["backend", "event"],
+)
+PIPELINE_ITEMS = Counter(
+    "buscador_pipeline_items_total",
+    "Itens processados pelas tarefas dos fluxos.",
+    ["task", "unit"],
+)
+PIPELINE_THROUGHPUT = Gauge(
+    "buscador_pipeline_throughput",
+    "Itens por segundo na última execução de cada tarefa.",
+    ["task", "unit"],
+    multiprocess_mode="livemax",
+)
+
+
+@contextmanager
+def stage(name: str):
+    """Mede a duração de uma etapa e, se disponível, abre um span.
+
+    Args:
+        name (str): Nome da etapa.
+    """
+    span = (
+        _tracer.start_as_current_span(name)
+        if _tracer is not None
+        else nullcontext()
+    )
+    tic = time.perf_counter()
+    with span:
+        try:
+            yield
+        finally:
+            STAGE_LATENCY.labels(name).observe(time.perf_counter() - tic)
+
+
+def timed(name: str):
+    """Decorador que registra a duração da função como a etapa `name`."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def payload_size(value) -> int:
+    """Retorna o tamanho, em bytes, do valor serializado em JSON."""
+    if isinstance(value, bytes):
+        return len(value)
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False, default=str)
+    return len(value.encode())
+
+
+def record_payload(name: str, value) -> None:
+    """Registra o tamanho dos dados de uma etapa."""
+    PAYLOAD_BYTES.labels(name).observe(payload_size(value))
+
+
+def record_tokens(model: str, usage) -> None:
+    """Registra os tokens informados na resposta do LLM.
+
+    Args:
+        model (str): Modelo utilizado.
+        usage (CompletionUsage | None): Uso retornado pela OpenAI.
+    """
+    if usage is None:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        count = getattr(usage, kind, None)
+        if isinstance(count, int):
+            LLM_TOKENS.labels(model, kind.removesuffix("_tokens")).inc(count)
+
+
+def record_cache(cache: str, result: str, count: int = 1) -> None:
+    """Registra eventos de um cache (`hit`, `shared_hit` ou `miss`)."""
+    if count:
+        CACHE_EVENTS.labels(cache, result).inc(count)
+
+
+def record_backend(backend: str, event: str) -> None:
+    """Registra um evento de um serviço externo (`coalesced`, `retry` ou
+    `circuit_open`)."""
+    BACKEND_EVENTS.labels(backend, event).inc()
+
+
+def record_throughput(
+    task: str, unit: str, count: float, seconds: float
+) -> float:
+    """Registra o volume processado por uma tarefa e sua vazão.
+
+    Args:
+        task (str): Nome da tarefa.
+        unit (str): Unidade dos itens (`rows`, `bytes`, `docs`).
+        count (float): Quantidade processada.
+        seconds (float): Duração da tarefa.
+
+    Returns:
+        float: Itens por segundo.
+    """
+    rate = count / seconds if seconds > 0 else 0.0
+    PIPELINE_ITEMS.labels(task, unit).inc(count)
+    PIPELINE_THROUGHPUT.labels(task, unit).set(rate)
+    logger.info(f"{task}: {count} {unit} in {seconds:.2f}s ({rate:.1f}/s)")
+    return rate
+
+
+def _registry() -> CollectorRegistry | None:
+    # Com vários workers do uvicorn, as métricas de cada processo são
+    # agregadas a partir de `PROMETHEUS_MULTIPROC_DIR`.
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return None
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_app():
+    """Aplicação ASGI que expõe as métricas, para montar em `/metrics`."""
+    registry = _registry()
+    if registry is not None:
+        return make_asgi_app(registry)
+    return make_asgi_app()
+
+
+def start_metrics_server(port: int) -> None:
+    """Inicia o servidor HTTP de métricas em segundo plano.
+
+    Args:
+        port (int): Porta do servidor.
+    """
+    registry = _registry()
+    if registry is not None:
+        start_http_server(port, registry=registry)
+    else:
+        start_http_server(port)
+    logger.info(f"Metrics server listening on port {port}")
+
+
+def push_metrics(job: str) -> None:
+    """Envia as métricas do processo ao Pushgateway, quando configurado.
+
+    Processos de curta duração, como os fluxos do Prefect, terminam antes
+    de serem coletados pelo Prometheus.
+
+    Args:
+        job (str): Nome do job no Pushgateway.
+    """
+    gateway = os.environ.get("PROMETHEUS_PUSHGATEWAY_URL")
+    if not gateway:
+        return
+    try:
+        push_to_gateway(gateway, job=job, registry=REGISTRY)
+    except OSError as e:
+        logger.warning(f"Could not push metrics to {gateway}: {e}")
@@ -0,0 +1,303 @@
+"""Perfis de CPU e de memória sob demanda.
+
+Os perfis são desativados por padrão e ativados pela variável de ambiente
+`PROFILING`: `1` (ou `all`) perfila todas as etapas instrumentadas, e uma
+lista separada por vírgulas (`search,preprocess_thesis_data`) perfila
+apenas as etapas listadas. Na página de consulta, o parâmetro
+`?debug=profile` perfila apenas a busca da sessão.
+
+Cada perfil registra:
+
+- o tempo de CPU por função, com o pyinstrument, se instalado, ou com o
+  cProfile;
+- o pico de memória alocada durante a etapa e as linhas que mais alocaram,
+  com o `tracemalloc`.
+
+Os relatórios são gravados em `PROFILE_DIR/<etapa>-<data e hora>/` e, se
+`MLFLOW_TRACKING_URI` estiver definido e o mlflow instalado, enviados como
+artefatos de uma execução do experimento `PROFILE_MLFLOW_EXPERIMENT`.
+
+O módulo não depende de `src.config`, para que o fluxo de download possa
+utilizá-lo sem as configurações do ChromaDB.
+"""
+
+import cProfile
+import datetime as dt
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+
+from loguru import logger
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "data/profiles")
+MLFLOW_EXPERIMENT = os.environ.get("PROFILE_MLFLOW_EXPERIMENT", "profiling")
+TOP_FUNCTIONS = 50
+TOP_ALLOCATIONS = 20
+
+_local = threading.local()
+# O tracemalloc é global ao processo: perfis simultâneos em threads
+# diferentes o compartilham, e apenas o último a terminar o desliga.
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+def profiling_enabled(name: str) -> bool:
+    """Indica se a etapa `name` deve ser perfilada, conforme `PROFILING`."""
+    value = os.environ.get("PROFILING", "").strip().lower()
+    if value in {"", "0", "false", "no"}:
+        return False
+    if value in {"1", "true", "yes", "all"}:
+        return True
+    return name.lower() in {item.strip() for item in value.split(",")}
+
+
+class _CpuProfiler:
+    """Perfil de CPU com o pyinstrument, se instalado, ou com o cProfile."""
+
+    def __init__(self) -> None:
+        try:
+            from pyinstrument import Profiler  # noqa: PLC0415
+        except ImportError:
+            self._profiler = cProfile.Profile()
+            self.kind = "cprofile"
+        else:
+            self._profiler = Profiler(async_mode="disabled")
+            self.kind = "pyinstrument"
+
+    def start(self) -> None:
+        if self.kind == "pyinstrument":
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        if self.kind == "pyinstrument":
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+    def save(self, directory: str) -> str:
+        """Grava os relatórios e retorna o resumo em texto."""
+        if self.kind == "pyinstrument":
+            text = self._profiler.output_text()
+            with open(
+                os.path.join(directory, "cpu.html"), "w", encoding="utf-8"
+            ) as f:
+                f.write(self._profiler.output_html())
+        else:
+            self._profiler.dump_stats(os.path.join(directory, "cpu.prof"))
+            stream = io.StringIO()
+            stats = pstats.Stats(self._profiler, stream=stream)
+            stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+            text = stream.getvalue()
+        with open(
+            os.path.join(directory, "cpu.txt"), "w", encoding="utf-8"
+        ) as f:
+            f.write(text)
+        return text
+
+
+def _start_tracemalloc() -> None:
+    global _tracemalloc_users  # noqa: PLW0603
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_users = 1
+        elif _tracemalloc_users > 0:
+            _tracemalloc_users += 1
+        else:
+            # Ligado por outra ferramenta, que continua responsável por ele.
+            tracemalloc.reset_peak()
+
+
+def _stop_tracemalloc() -> tuple[int, tracemalloc.Snapshot | None]:
+    """Retorna o pico de memória e o snapshot das alocações, desligando o
+    tracemalloc se nenhum outro perfil o estiver usando."""
+    global _tracemalloc_users  # noqa: PLW0603
+    with _tracemalloc_lock:
+        if not tracemalloc.is_tracing():
+            _tracemalloc_users = 0
+            return 0, None
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if _tracemalloc_users > 0:
+            _tracemalloc_users -= 1
+            if _tracemalloc_users == 0:
+                tracemalloc.stop()
+        return peak, snapshot
+
+
+def _allocations(snapshot: tracemalloc.Snapshot | None) -> str:
+    if snapshot is None:
+        return ""
+    lines = [
+        str(statistic)
+        for statistic in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+    ]
+    return "\n".join(lines)
+
+
+def log_to_mlflow(name: str, directory: str) -> None:
+    """Envia os relatórios ao servidor do MLflow, se configurado.
+
+    Com uma execução do MLflow ativa, os relatórios são anexados a ela;
+    caso contrário, é criada uma execução no experimento
+    `PROFILE_MLFLOW_EXPERIMENT`.
+
+    Args:
+        name (str): Nome da etapa.
+        directory (str): Diretório dos relatórios.
+    """
+    if not os.environ.get("MLFLOW_TRACKING_URI"):
+        return
+    try:
+        import mlflow  # noqa: PLC0415
+    except ImportError:
+        logger.warning(
+            "MLFLOW_TRACKING_URI is set but mlflow is not installed"
+        )
+        return
+    artifact_path = f"profiles/{os.path.basename(directory)}"
+    try:
+        if mlflow.active_run() is not None:
+            mlflow.log_artifacts(directory, artifact_path=artifact_path)
+            return
+        mlflow.set_experiment(MLFLOW_EXPERIMENT)
+        with mlflow.start_run(run_name=f"profile-{name}"):
+            mlflow.log_artifacts(directory, artifact_path=artifact_path)
+    except Exception as e:
+        logger.warning(f"Could not log profile to MLflow: {e}")
+
+
+@contextmanager
+def profile(name: str, enabled: bool | None = None):
+    """Perfila o tempo de CPU e a memória do bloco.
+
+    Perfis aninhados na mesma thread não são abertos: o perfil externo já
+    inclui o bloco interno. Perfis simultâneos em threads diferentes
+    compartilham o `tracemalloc`, de modo que o pico de memória de cada um
+    inclui as alocações das outras threads. Erros do perfil são registrados
+    no log e não interrompem o bloco perfilado.
+
+    Args:
+        name (str): Nome da etapa, usado nos relatórios e em `PROFILING`.
+        enabled (bool | None, optional): Força a ativação ou desativação.
+        Defaults to None, que segue `PROFILING`.
+
+    Yields:
+        dict | None: Com o perfil ativo, um dicionário preenchido ao final
+        do bloco com `directory`, `wall_seconds`, `cpu_seconds`,
+        `peak_memory_bytes` e `report` (resumo em texto). None, caso
+        contrário.
+    """
+    if enabled is None:
+        enabled = profiling_enabled(name)
+    if not enabled or getattr(_local, "active", False):
+        yield None
+        return
+
+    result = {}
+    _start_tracemalloc()
+    profiler = _CpuProfiler()
+    try:
+        profiler.start()
+    except ValueError as e:
+        # Outro perfilador (de outra thread ou ferramenta) já está ativo.
+        logger.warning(f"CPU profiling of {name} skipped: {e}")
+        profiler = None
+    _local.active = True
+    tic, cpu_tic = time.perf_counter(), time.process_time()
+    try:
+        yield result
+    finally:
+        wall_seconds = time.perf_counter() - tic
+        cpu_seconds = time.process_time() - cpu_tic
+        _local.active = False
+        try:
+            _finish_profile(
+                name,
+                profiler,
+                result,
+                wall_seconds=round(wall_seconds, 4),
+                cpu_seconds=round(cpu_seconds, 4),
+            )
+        except Exception as e:
+            logger.warning(f"Could not finish profile of {name}: {e}")
+
+
+def _finish_profile(name: str, profiler, result: dict, **summary) -> None:
+    try:
+        if profiler is not None:
+            profiler.stop()
+    finally:
+        peak, snapshot = _stop_tracemalloc()
+    _save_profile(
+        name, profiler, snapshot, result, peak_memory_bytes=peak, **summary
+    )
+
+
+def _write_reports(directory: str, profiler, snapshot, summary: dict) -> str:
+    os.makedirs(directory, exist_ok=True)
+    cpu_report = profiler.save(directory) if profiler is not None else ""
+    allocations = _allocations(snapshot)
+    with open(
+        os.path.join(directory, "memory.txt"), "w", encoding="utf-8"
+    ) as f:
+        f.write(allocations)
+    with open(
+        os.path.join(directory, "summary.json"), "w", encoding="utf-8"
+    ) as f:
+        json.dump(summary, f, indent=2)
+    return f"{cpu_report}\n{allocations}".strip()
+
+
+def _save_profile(
+    name: str, profiler, snapshot, result: dict, **summary
+) -> None:
+    timestamp = dt.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    directory = os.path.join(PROFILE_DIR, f"{name}-{timestamp}")
+    try:
+        report = _write_reports(
+            directory, profiler, snapshot, {"name": name, **summary}
+        )
+    except OSError as e:
+        logger.warning(f"Could not save profile of {name}: {e}")
+        return
+    result.update(directory=directory, report=report, **summary)
+    logger.info(
+        f"Profiled {name}: {summary['wall_seconds']}s wall, "
+        f"{summary['cpu_seconds']}s CPU, "
+        f"{summary['peak_memory_bytes'] / 2**20:.1f} MB peak; "
+        f"reports in {directory}"
+    )
+    log_to_mlflow(name, directory)
+
+
+def profiled(func=None, *, name: str | None = None):
+    """Decorador que perfila a função quando `PROFILING` a inclui.
+
+    Deve ser aplicado abaixo do `@task` do Prefect, para que o perfil
+    cubra apenas a execução da tarefa.
+
+    Args:
+        name (str | None, optional): Nome da etapa. Defaults to None, que
+        usa o nome da função.
+    """
+
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile(stage_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator(func) if func is not None else decorator
@@ -0,0 +1,253 @@
+"""Redução de dimensionalidade dos embeddings armazenados na coleção.
+
+Uma projeção (PCA ou aleatória) é ajustada sobre uma amostra dos resumos
+e aplicada tanto aos documentos, na indexação, quanto às consultas, na
+busca. Com 768 dimensões reduzidas para 256, o índice HNSW ocupa cerca de
+um terço da memória.
+
+O ChromaDB armazena os vetores sempre em float32, de modo que a
+quantização escalar (float16/int8) não reduziria o índice; a redução de
+dimensão é a alternativa disponível nesse backend.
+
+Exemplo de avaliação da perda de recall:
+    typer src/reduction.py run data/catalogo.parquet --n-components 128,256
+"""
+
+import numpy as np
+import smart_open as so
+from chromadb import Documents, EmbeddingFunction, Embeddings
+
+from src.config import logger, settings
+
+METHODS = ("pca", "random_projection")
+
+
+class EmbeddingReducer:
+    """Projeção linear dos embeddings para um espaço de menor dimensão.
+
+    Args:
+        method (str): `pca` ou `random_projection`.
+        mean (np.ndarray): Média subtraída antes da projeção.
+        components (np.ndarray): Matriz de projeção
+        (`n_components` x dimensão original).
+    """
+
+    def __init__(
+        self, method: str, mean: np.ndarray, components: np.ndarray
+    ) -> None:
+        self.method = method
+        self.mean = mean.astype(np.float32)
+        self.components = components.astype(np.float32)
+
+    @property
+    def n_components(self) -> int:
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(
+        cls,
+        embeddings: np.ndarray,
+        n_components: int,
+        method: str = "pca",
+        seed: int = 0,
+    ) -> "EmbeddingReducer":
+        """Ajusta a projeção sobre uma amostra de embeddings.
+
+        Args:
+            embeddings (np.ndarray): Amostra de embeddings.
+            n_components (int): Dimensão reduzida.
+            method (str, optional): `pca` ou `random_projection`. Defaults
+            to "pca".
+            seed (int, optional): Semente da projeção aleatória. Defaults
+            to 0.
+
+        Returns:
+            EmbeddingReducer: Projeção ajustada.
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown reduction method: {method}")
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        dim = embeddings.shape[1]
+        if n_components >= dim:
+            raise ValueError(
+                f"n_components ({n_components}) must be smaller than {dim}"
+            )
+
+        if method == "pca":
+            mean = embeddings.mean(axis=0)
+            _, _, vt = np.linalg.svd(embeddings - mean, full_matrices=False)
+            components = vt[:n_components]
+        else:
+            rng = np.random.default_rng(seed)
+            mean = np.zeros(dim, dtype=np.float32)
+            components = rng.normal(
+                scale=1 / np.sqrt(n_components), size=(n_components, dim)
+            )
+        return cls(method, mean, components)
+
+    def transform(self, embeddings) -> np.ndarray:
+        """Projeta os embeddings no espaço reduzido."""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        return (embeddings - self.mean) @ self.components.T
+
+    def save(self, path: str) -> None:
+        """Salva a projeção em um arquivo `.npz` local ou no S3."""
+        with so.open(path, "wb") as f:
+            np.savez(
+                f,
+                method=np.array(self.method),
+                mean=self.mean,
+                components=self.components,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "EmbeddingReducer":
+        """Carrega uma projeção salva com `save`."""
+        with so.open(path, "rb") as f, np.load(f) as data:
+            return cls(str(data["method"]), data["mean"], data["components"])
+
+
+class ReducedEmbeddingFunction(EmbeddingFunction):
+    """Aplica a projeção aos embeddings de outra função de embeddings.
+
+    Args:
+        embedding_function (EmbeddingFunction): Função de embeddings
+        original.
+        reducer (EmbeddingReducer): Projeção ajustada.
+    """
+
+    def __init__(
+        self, embedding_function: EmbeddingFunction, reducer: EmbeddingReducer
+    ) -> None:
+        self.embedding_function = embedding_function
+        self.reducer = reducer
+
+    def __call__(self, documents: Documents) -> Embeddings:
+        return self.reducer.transform(self.embedding_function(documents))
+
+
+def reduction_recall(
+    embeddings: np.ndarray,
+    queries: np.ndarray,
+    reducer: EmbeddingReducer,
+    k: int = 10,
+    space: str = "l2",
+) -> float:
+    """Mede o recall@k da busca exata no espaço reduzido em relação à
+    busca exata com os embeddings completos.
+
+    Args:
+        embeddings (np.ndarray): Embeddings completos dos documentos.
+        queries (np.ndarray): Embeddings completos das consultas.
+        reducer (EmbeddingReducer): Projeção avaliada.
+        k (int, optional): Número de vizinhos. Defaults to 10.
+        space (str, optional): Métrica de distância. Defaults to "l2".
+
+    Returns:
+        float: Recall@k.
+    """
+    from src.tune_hnsw import exact_neighbors, recall_at_k  # noqa: PLC0415
+
+    full = exact_neighbors(embeddings, queries, k, space)
+    reduced = exact_neighbors(
+        reducer.transform(embeddings), reducer.transform(queries), k, space
+    )
+    return recall_at_k(reduced.tolist(), full.tolist())
+
+
+def sample_embeddings(
+    documents: list[str],
+    embedding_function: EmbeddingFunction,
+    sample_size: int = 20000,
+) -> np.ndarray:
+    """Codifica uma amostra aleatória dos documentos.
+
+    Args:
+        documents (list[str]): Resumos das teses.
+        embedding_function (EmbeddingFunction): Função de embeddings
+        original.
+        sample_size (int, optional): Tamanho da amostra. Defaults to 20000.
+
+    Returns:
+        np.ndarray: Embeddings completos da amostra.
+    """
+    rng = np.random.default_rng(0)
+    size = min(sample_size, len(documents))
+    positions = rng.choice(len(documents), size=size, replace=False)
+    return np.asarray(
+        embedding_function([documents[i] for i in positions]),
+        dtype=np.float32,
+    )
+
+
+def fit_on_sample(
+    embeddings: np.ndarray,
+    n_components: int,
+    method: str = "pca",
+    n_queries: int = 200,
+    k: int = 10,
+) -> tuple[EmbeddingReducer, float]:
+    """Ajusta a projeção sobre a amostra e mede a perda de recall com
+    documentos da amostra que não participam do ajuste.
+
+    Args:
+        embeddings (np.ndarray): Embeddings completos da amostra.
+        n_components (int): Dimensão reduzida.
+        method (str, optional): `pca` ou `random_projection`. Defaults to
+        "pca".
+        n_queries (int, optional): Documentos usados como consultas.
+        Defaults to 200.
+        k (int, optional): Número de vizinhos. Defaults to 10.
+
+    Returns:
+        tuple[EmbeddingReducer, float]: Projeção ajustada e recall@k.
+    """
+    n_queries = max(1, min(n_queries, len(embeddings) // 10))
+    queries, sample = embeddings[:n_queries], embeddings[n_queries:]
+
+    reducer = EmbeddingReducer.fit(sample, n_components, method=method)
+    recall = reduction_recall(
+        sample, queries, reducer, k=k, space=settings.HNSW_SPACE
+    )
+    logger.info(
+        f"{method} {embeddings.shape[1]} -> {n_components} dimensions: "
+        f"recall@{k} {recall:.3f}"
+    )
+    return reducer, recall
+
+
+def main(
+    file_path: str,
+    n_components: str = "64,128,256",
+    method: str = "pca",
+    sample_size: int = 20000,
+    k: int = 10,
+) -> None:
+    """Reporta a perda de recall de cada dimensão reduzida.
+
+    Args:
+        file_path (str): Arquivo Parquet do catálogo.
+        n_components (str, optional): Dimensões avaliadas, separadas por
+        vírgula. Defaults to "64,128,256".
+        method (str, optional): `pca` ou `random_projection`. Defaults to
+        "pca".
+        sample_size (int, optional): Tamanho da amostra. Defaults to 20000.
+        k (int, optional): Número de vizinhos. Defaults to 10.
+    """
+    import pandas as pd  # noqa: PLC0415
+
+    from src.extract_embeddings import (  # noqa: PLC0415
+        ThesisEmbeddingFunction,
+    )
+
+    documents = (
+        pd.read_parquet(file_path, columns=["DS_RESUMO"])["DS_RESUMO"]
+        .dropna()
+        .tolist()
+    )
+    embeddings = sample_embeddings(
+        documents, ThesisEmbeddingFunction(), sample_size
+    )
+    for dim in (int(value) for value in n_components.split(",")):
+        _, recall = fit_on_sample(embeddings, dim, method=method, k=k)
+        print(f"{method} {dim}: recall@{k} = {recall:.3f}")
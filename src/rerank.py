@@ -0,0 +1,253 @@
+"""Reordenação local dos candidatos da busca antes da resposta do LLM.
+
+A busca vetorial traz um conjunto maior de candidatos
+(`RERANK_CANDIDATES`), que são reordenados no próprio processo; apenas os
+`RERANK_TOP_K` primeiros seguem como contexto para o LLM, o que reduz os
+tokens e a latência da resposta. Há dois modos (`RERANK_MODE`):
+
+- `fusion`: combina, por reciprocal rank fusion, a ordem da busca vetorial
+  com a ordem do BM25 calculado sobre o texto dos candidatos. Não carrega
+  nenhum modelo;
+- `cross_encoder`: pontua cada par (pergunta, documento) com um
+  cross-encoder do sentence-transformers (`RERANK_MODEL_NAME_OR_PATH`), em
+  lotes de `RERANK_BATCH_SIZE` pares. Na CPU, as camadas lineares do
+  modelo são quantizadas para int8 (`RERANK_QUANTIZE`).
+
+No modo `fusion`, os candidatos são reordenados pelos metadados trazidos
+pela busca (o título), e os resumos são carregados apenas para os
+documentos mantidos: o BM25 perde os termos que só aparecem no resumo, em
+troca de uma única leitura de `RERANK_TOP_K` resumos. O cross-encoder
+depende do texto completo, e os resumos de todos os candidatos são
+carregados antes da pontuação.
+
+A duração da etapa é registrada na métrica de etapas como `rerank`.
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from typing import Protocol
+
+import numpy as np
+
+from src.config import logger, settings
+from src.metrics import stage
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class Reranker(Protocol):
+    # Se os candidatos devem ter os resumos carregados antes da pontuação.
+    needs_abstracts: bool
+
+    def score(self, query: str, documents: list[dict]) -> np.ndarray: ...
+
+
+def tokenize(text: str) -> list[str]:
+    """Separa o texto em palavras minúsculas e sem acentos."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return TOKEN_PATTERN.findall(text)
+
+
+def document_text(document: dict) -> str:
+    """Texto do documento usado na reordenação: título e, quando
+    carregado, resumo."""
+    return " ".join(
+        str(document.get(column) or "")
+        for column in ("NM_PRODUCAO", "DS_RESUMO")
+    ).strip()
+
+
+def bm25_scores(
+    query: str, texts: list[str], k1: float = 1.2, b: float = 0.75
+) -> np.ndarray:
+    """Pontuação BM25 da consulta em cada texto, com as frequências
+    calculadas sobre os próprios textos.
+
+    Args:
+        query (str): Texto da consulta.
+        texts (list[str]): Textos dos documentos.
+        k1 (float, optional): Saturação da frequência dos termos. Defaults
+        to 1.2.
+        b (float, optional): Normalização pelo tamanho do texto. Defaults
+        to 0.75.
+
+    Returns:
+        np.ndarray: Pontuação de cada texto.
+    """
+    documents = [Counter(tokenize(text)) for text in texts]
+    lengths = np.array([sum(doc.values()) for doc in documents], dtype=float)
+    average_length = lengths.mean() if len(lengths) and lengths.any() else 1
+    scores = np.zeros(len(documents))
+    for term in set(tokenize(query)):
+        frequencies = np.array([doc[term] for doc in documents], dtype=float)
+        n_documents = np.count_nonzero(frequencies)
+        if n_documents == 0:
+            continue
+        idf = np.log(
+            1 + (len(documents) - n_documents + 0.5) / (n_documents + 0.5)
+        )
+        scores += idf * (
+            frequencies
+            * (k1 + 1)
+            / (frequencies + k1 * (1 - b + b * lengths / average_length))
+        )
+    return scores
+
+
+class FusionReranker:
+    """Combina a ordem da busca vetorial com a ordem do BM25.
+
+    Args:
+        k (int, optional): Constante do reciprocal rank fusion. Defaults
+        to 60.
+    """
+
+    needs_abstracts = False
+
+    def __init__(self, k: int = 60) -> None:
+        self.k = k
+
+    def score(self, query: str, documents: list[dict]) -> np.ndarray:
+        """Pontua os documentos, que devem estar na ordem da busca.
+
+        Args:
+            query (str): Pergunta do usuário.
+            documents (list[dict]): Candidatos, na ordem da busca vetorial.
+
+        Returns:
+            np.ndarray: Pontuação de cada documento.
+        """
+        positions = np.arange(len(documents))
+        lexical = bm25_scores(query, [document_text(d) for d in documents])
+        # Posição de cada documento na ordem do BM25, mantendo a ordem da
+        # busca entre os empates. Documentos sem nenhum termo da pergunta
+        # ficam fora da lista do BM25.
+        lexical_rank = np.empty(len(documents), dtype=int)
+        lexical_rank[np.argsort(-lexical, kind="stable")] = positions
+        return 1 / (self.k + positions + 1) + np.where(
+            lexical > 0, 1 / (self.k + lexical_rank + 1), 0
+        )
+
+
+class CrossEncoderReranker:
+    """Pontua os pares (pergunta, documento) com um cross-encoder.
+
+    Args:
+        model_name_or_path (str): Modelo do sentence-transformers.
+        batch_size (int, optional): Pares pontuados por lote. Defaults to
+        32.
+        device (str | None, optional): Dispositivo do modelo. Defaults to
+        None, que usa a GPU, se disponível.
+        quantize (bool, optional): Quantiza as camadas lineares para int8
+        quando o modelo está na CPU. Defaults to True.
+    """
+
+    needs_abstracts = True
+
+    def __init__(
+        self,
+        model_name_or_path: str,
+        batch_size: int = 32,
+        device: str | None = None,
+        quantize: bool = True,
+    ) -> None:
+        self.batch_size = batch_size
+        self.model = self._load_model(model_name_or_path, device, quantize)
+
+    @staticmethod
+    def _load_model(model_name_or_path: str, device, quantize: bool):
+        import torch  # noqa: PLC0415
+        from sentence_transformers import CrossEncoder  # noqa: PLC0415
+
+        model = CrossEncoder(model_name_or_path, device=device)
+        if quantize and str(model._target_device) == "cpu":
+            model.model = torch.quantization.quantize_dynamic(
+                model.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        return model
+
+    def score(self, query: str, documents: list[dict]) -> np.ndarray:
+        """Pontua os documentos em lotes de `batch_size` pares.
+
+        Args:
+            query (str): Pergunta do usuário.
+            documents (list[dict]): Candidatos.
+
+        Returns:
+            np.ndarray: Pontuação de cada documento.
+        """
+        pairs = [(query, document_text(document)) for document in documents]
+        return np.asarray(
+            self.model.predict(
+                pairs, batch_size=self.batch_size, convert_to_numpy=True
+            )
+        )
+
+
+def rerank(
+    query: str, documents: list[dict], reranker: Reranker, top_k: int
+) -> list[dict]:
+    """Reordena os candidatos e mantém os `top_k` mais relevantes.
+
+    Args:
+        query (str): Pergunta do usuário.
+        documents (list[dict]): Candidatos, na ordem da busca vetorial.
+        reranker (Reranker): Modelo de reordenação.
+        top_k (int): Número de documentos mantidos.
+
+    Returns:
+        list[dict]: Novos dicionários dos documentos mantidos, do mais ao
+        menos relevante, com a pontuação em `rerank_score`.
+    """
+    if not documents:
+        return []
+    tic = time.perf_counter()
+    with stage("rerank"):
+        scores = reranker.score(query, documents)
+        order = np.argsort(-scores, kind="stable")[:top_k]
+    logger.info(
+        f"Reranked {len(documents)} documents to {len(order)} in "
+        f"{time.perf_counter() - tic:.3f}s"
+    )
+    return [{**documents[i], "rerank_score": float(scores[i])} for i in order]
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> Reranker | None:
+    """Retorna o modelo de reordenação compartilhado pelo processo.
+
+    Returns:
+        Reranker | None: Modelo de `RERANK_MODE` ou None, quando a
+        reordenação está desativada.
+    """
+    global _reranker  # noqa: PLW0603
+    if settings.RERANK_MODE == "none":
+        return None
+    with _reranker_lock:
+        if _reranker is None:
+            if settings.RERANK_MODE == "cross_encoder":
+                logger.info("Loading reranker model")
+                _reranker = CrossEncoderReranker(
+                    settings.RERANK_MODEL_NAME_OR_PATH,
+                    batch_size=settings.RERANK_BATCH_SIZE,
+                    device=settings.DEVICE,
+                    quantize=settings.RERANK_QUANTIZE,
+                )
+            else:
+                _reranker = FusionReranker()
+    return _reranker
+
+
+def candidate_count(n_results: int, reranker: Reranker | None) -> int:
+    """Número de resultados a buscar: `RERANK_CANDIDATES` quando há
+    reordenação, ou `n_results`."""
+    if reranker is None:
+        return n_results
+    return max(n_results, settings.RERANK_CANDIDATES)
@@ -0,0 +1,401 @@
+"""Proteções das chamadas aos serviços externos (OpenAI e ChromaDB).
+
+Cada serviço tem um `Backend`, que aplica às chamadas, nesta ordem:
+
+- agrupamento de chamadas idênticas em andamento (single-flight): uma
+  rajada da mesma pergunta gera uma única requisição, cujo resultado é
+  compartilhado por todos que a aguardavam;
+- circuito (circuit breaker): após `CIRCUIT_FAILURE_THRESHOLD` chamadas
+  seguidas que falharam por erros transitórios, mesmo depois das novas
+  tentativas, as chamadas falham imediatamente com
+  `CircuitOpenError` durante `CIRCUIT_RESET_TIMEOUT` segundos, quando uma
+  chamada de teste decide se o circuito volta a fechar;
+- limite de chamadas simultâneas ao serviço;
+- novas tentativas, com espera exponencial aleatória (`tenacity`), em erros
+  429, 5xx e falhas de conexão ou de tempo limite.
+
+Os limites vêm das configurações `OPENAI_MAX_CONCURRENCY`,
+`CHROMA_MAX_CONCURRENCY`, `BACKEND_RETRY_ATTEMPTS`,
+`BACKEND_RETRY_MAX_WAIT`, `CIRCUIT_FAILURE_THRESHOLD` e
+`CIRCUIT_RESET_TIMEOUT`.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import weakref
+from collections.abc import Awaitable, Callable, Hashable
+from concurrent.futures import Future
+from typing import Any
+
+import httpx
+from tenacity import (
+    AsyncRetrying,
+    Retrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from src.config import logger, settings
+from src.metrics import record_backend
+
+TOO_MANY_REQUESTS = 429
+SERVER_ERROR = 500
+
+
+class CircuitOpenError(RuntimeError):
+    """O circuito do serviço está aberto e a chamada não foi feita."""
+
+
+def status_code(exc: BaseException) -> int | None:
+    """Código HTTP de um erro da OpenAI, do httpx ou do ChromaDB."""
+    code = getattr(exc, "status_code", None)
+    if isinstance(code, int):
+        return code
+    code = getattr(getattr(exc, "response", None), "status_code", None)
+    if isinstance(code, int):
+        return code
+    # Os erros do ChromaDB informam o código por um método.
+    code = getattr(exc, "code", None)
+    if callable(code):
+        try:
+            code = code()
+        except Exception:
+            return None
+        return code if isinstance(code, int) else None
+    return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Indica se o erro é transitório: limite de requisições (429), erro
+    do servidor (5xx), falha de conexão ou tempo limite."""
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return True
+    openai = sys.modules.get("openai")
+    if openai is not None and isinstance(exc, openai.APIConnectionError):
+        return True
+    code = status_code(exc)
+    return code is not None and (
+        code == TOO_MANY_REQUESTS or code >= SERVER_ERROR
+    )
+
+
+class CircuitBreaker:
+    """Circuito que interrompe as chamadas a um serviço com falhas
+    seguidas.
+
+    Args:
+        failure_threshold (int): Falhas seguidas que abrem o circuito.
+        reset_timeout (float): Segundos com o circuito aberto antes de uma
+        chamada de teste.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        """`closed`, `open` ou `half_open`."""
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        """Indica se a chamada pode ser feita. Com o circuito meio aberto,
+        apenas uma chamada de teste é permitida por vez."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self) -> None:
+        """Libera a chamada de teste interrompida sem resultado
+        (cancelamento, `KeyboardInterrupt`), para que outra chamada possa
+        testar o serviço."""
+        with self._lock:
+            self._probing = False
+
+
+class _LeaderCancelled(Exception):
+    """A chamada aguardada por `SingleFlight.ado` foi cancelada."""
+
+
+class SingleFlight:
+    """Agrupa chamadas idênticas em andamento.
+
+    Enquanto a chamada de uma chave está em andamento, as chamadas com a
+    mesma chave aguardam e recebem o mesmo resultado (ou o mesmo erro).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+        self._async_calls: dict[Hashable, asyncio.Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """Executa `fn` ou aguarda a chamada em andamento com a mesma chave.
+
+        Returns:
+            tuple[Any, bool]: Resultado e se ele veio de outra chamada.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def ado(
+        self, key: Hashable, fn: Callable[[], Awaitable[Any]]
+    ) -> tuple[Any, bool]:
+        """Versão assíncrona de `do`, para chamadas no mesmo event loop."""
+        loop = asyncio.get_running_loop()
+        key = (id(loop), key)
+        while (future := self._async_calls.get(key)) is not None:
+            try:
+                return await asyncio.shield(future), True
+            except _LeaderCancelled:
+                # A chamada aguardada foi cancelada, mas esta não: a
+                # primeira a retomar passa a executar `fn`.
+                continue
+        future = self._async_calls[key] = loop.create_future()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Evita o aviso de exceção não lida quando ninguém aguardava.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._async_calls[key]
+
+
+class Backend:
+    """Proteções das chamadas a um serviço externo.
+
+    Args:
+        name (str): Nome do serviço, usado nos logs e nas métricas.
+        max_concurrency (int): Máximo de chamadas simultâneas.
+        retry_attempts (int, optional): Tentativas por chamada. Defaults
+        to 4.
+        retry_max_wait (float, optional): Espera máxima entre tentativas,
+        em segundos. Defaults to 10.
+        failure_threshold (int, optional): Falhas seguidas que abrem o
+        circuito. Defaults to 5.
+        reset_timeout (float, optional): Segundos com o circuito aberto.
+        Defaults to 30.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        name: str,
+        max_concurrency: int,
+        *,
+        retry_attempts: int = 4,
+        retry_max_wait: float = 10,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+    ) -> None:
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.retry_attempts = retry_attempts
+        self.retry_max_wait = retry_max_wait
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.single_flight = SingleFlight()
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        # Um semáforo assíncrono por event loop.
+        self._async_semaphores = weakref.WeakKeyDictionary()
+
+    def _retry_options(self) -> dict:
+        return {
+            "retry": retry_if_exception(is_retryable),
+            "stop": stop_after_attempt(self.retry_attempts),
+            "wait": wait_random_exponential(
+                multiplier=0.5, max=self.retry_max_wait
+            ),
+            "before_sleep": self._before_retry,
+            "reraise": True,
+        }
+
+    def _before_retry(self, retry_state) -> None:
+        record_backend(self.name, "retry")
+        logger.warning(
+            f"Retrying {self.name} call (attempt "
+            f"{retry_state.attempt_number}): {retry_state.outcome.exception()}"
+        )
+
+    def _check_circuit(self) -> None:
+        if not self.breaker.allow():
+            record_backend(self.name, "circuit_open")
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+    def _record(self, exc: BaseException | None) -> None:
+        # Erros não transitórios (400, JSON inválido, ...) mostram que o
+        # serviço respondeu e não contam como falhas do circuito.
+        if exc is None or not is_retryable(exc):
+            self.breaker.record_success()
+            return
+        was_open = self.breaker.state != "closed"
+        self.breaker.record_failure()
+        if not was_open and self.breaker.state == "open":
+            logger.error(f"{self.name} circuit opened: {exc}")
+
+    def _attempt(self, fn: Callable[[], Any]) -> Any:
+        with self._semaphore:
+            return fn()
+
+    def call(self, key: Hashable | None, fn: Callable[[], Any]) -> Any:
+        """Executa uma chamada ao serviço com as proteções.
+
+        Args:
+            key (Hashable | None): Identifica chamadas idênticas, que são
+            agrupadas enquanto estão em andamento. None não agrupa.
+            fn (Callable[[], Any]): Chamada ao serviço.
+
+        Raises:
+            CircuitOpenError: Se o circuito estiver aberto.
+
+        Returns:
+            Any: Resultado da chamada.
+        """
+
+        def run():
+            self._check_circuit()
+            try:
+                result = Retrying(**self._retry_options())(self._attempt, fn)
+            except Exception as e:
+                self._record(e)
+                raise
+            except BaseException:
+                self.breaker.release()
+                raise
+            self._record(None)
+            return result
+
+        if key is None:
+            return run()
+        result, shared = self.single_flight.do(key, run)
+        if shared:
+            record_backend(self.name, "coalesced")
+        return result
+
+    def _async_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._async_semaphores[loop] = semaphore
+        return semaphore
+
+    async def _aattempt(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        async with self._async_semaphore():
+            return await fn()
+
+    async def acall(
+        self, key: Hashable | None, fn: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Versão assíncrona de `call`, para chamadas que retornam
+        corrotinas."""
+
+        async def run():
+            self._check_circuit()
+            try:
+                result = await AsyncRetrying(**self._retry_options())(
+                    self._aattempt, fn
+                )
+            except Exception as e:
+                self._record(e)
+                raise
+            except BaseException:
+                self.breaker.release()
+                raise
+            self._record(None)
+            return result
+
+        if key is None:
+            return await run()
+        result, shared = await self.single_flight.ado(key, run)
+        if shared:
+            record_backend(self.name, "coalesced")
+        return result
+
+
+_backends: dict[str, Backend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name: str) -> Backend:
+    """Retorna as proteções compartilhadas pelo processo para um serviço.
+
+    Args:
+        name (str): `openai` ou `chroma`.
+
+    Returns:
+        Backend: Proteções do serviço.
+    """
+    with _backends_lock:
+        if name not in _backends:
+            max_concurrency = {
+                "openai": settings.OPENAI_MAX_CONCURRENCY,
+                "chroma": settings.CHROMA_MAX_CONCURRENCY,
+            }[name]
+            _backends[name] = Backend(
+                name,
+                max_concurrency=max_concurrency,
+                retry_attempts=settings.BACKEND_RETRY_ATTEMPTS,
+                retry_max_wait=settings.BACKEND_RETRY_MAX_WAIT,
+                failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+                reset_timeout=settings.CIRCUIT_RESET_TIMEOUT,
+            )
+        return _backends[name]
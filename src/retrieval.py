@@ -0,0 +1,597 @@
+"""Etapas de recuperação e resposta sobre a coleção de teses.
+
+Funções compartilhadas pela página de consulta, pela API em lote e pelos
+demais consumidores da coleção, sem dependência do Streamlit.
+
+O ChromaDB, o modelo de embeddings e o cliente da OpenAI só são importados
+quando utilizados pela primeira vez, para que importar este módulo
+continue barato.
+"""
+
+import datetime as dt
+import json
+import threading
+from functools import wraps
+from typing import TYPE_CHECKING
+
+from src.cache import QueryEmbeddingCache, ResultCache
+from src.config import log_payload, logger, settings
+from src.facets import FacetIndex
+from src.metrics import record_payload, record_tokens, stage, timed
+from src.rerank import Reranker, rerank
+from src.resilience import get_backend
+
+if TYPE_CHECKING:
+    from chromadb import EmbeddingFunction
+    from chromadb.api.models.Collection import Collection
+    from openai import AsyncOpenAI, OpenAI
+
+    from src.collection_alias import LiveCollection
+    from src.reduction import ReducedEmbeddingFunction
+
+
+def log_step(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        tic = dt.datetime.now()
+        with stage(func.__name__):
+            result = func(*args, **kwargs)
+        time_taken = str(dt.datetime.now() - tic)
+        logger.info(f"just ran step {func.__name__} took {time_taken}s")
+        return result
+
+    return wrapper
+
+
+def load_prompts():
+    with open("src/assets/prompt-text-to-chroma.txt", encoding="utf-8") as f:
+        prompt_chroma = f.read()
+
+    with open("src/assets/prompt-rag.txt", encoding="utf-8") as f:
+        prompt_rag = f.read()
+
+    return prompt_chroma, prompt_rag
+
+
+_embedding_function = None
+_embedding_function_lock = threading.Lock()
+
+
+def get_embedding_function() -> "EmbeddingFunction":
+    """Retorna a função de embeddings compartilhada pelo processo.
+
+    O modelo é carregado uma única vez, mesmo que várias threads o
+    solicitem ao mesmo tempo. Quando `EMBEDDING_SERVER_URL` está definido,
+    os embeddings são obtidos do servidor local de embeddings, e o modelo
+    não é carregado no processo. Os embeddings retornados não são
+    reduzidos: a projeção de cada versão da coleção é aplicada às consultas
+    por `connect_collection`.
+
+    Returns:
+        EmbeddingFunction: Função de embeddings das teses.
+    """
+    global _embedding_function  # noqa: PLW0603
+    with _embedding_function_lock:
+        if _embedding_function is None:
+            from src.extract_embeddings import (  # noqa: PLC0415
+                RemoteEmbeddingFunction,
+                ThesisEmbeddingFunction,
+            )
+
+            if settings.EMBEDDING_SERVER_URL:
+                logger.info("Using embedding server")
+                _embedding_function = RemoteEmbeddingFunction(
+                    settings.EMBEDDING_SERVER_URL,
+                    socket_path=settings.EMBEDDING_SERVER_SOCKET or None,
+                    timeout=settings.EMBEDDING_SERVER_TIMEOUT,
+                )
+            else:
+                logger.info("Loading embedding model")
+                _embedding_function = ThesisEmbeddingFunction()
+    return _embedding_function
+
+
+def warm_up() -> None:
+    """Carrega o modelo de embeddings e codifica uma consulta de teste,
+    para que a primeira consulta real não pague pelo carregamento."""
+    try:
+        get_embedding_function()(["aquecimento"])
+        logger.info("Embedding model warmed up")
+    except Exception as e:
+        logger.error(f"Error warming up embedding model: {e}")
+
+
+def connect_collection(
+    embedding_function: "EmbeddingFunction | None" = None,
+) -> "LiveCollection":
+    """Conecta ao ChromaDB e carrega a coleção de teses e dissertações.
+
+    A coleção é resolvida pelo alias da versão ativa e acompanha as trocas
+    de versão feitas por `extract_embeddings`, junto com o índice de
+    facetas (`LiveCollection.facet_index`) e a projeção dos embeddings
+    (`LiveCollection.reducer`) correspondentes.
+
+    Args:
+        embedding_function (EmbeddingFunction | None, optional): Função de
+        embeddings da coleção. Defaults to `get_embedding_function()`.
+
+    Returns:
+        LiveCollection: Coleção de teses e dissertações no Chroma.
+    """
+    from src.collection_alias import LiveCollection  # noqa: PLC0415
+    from src.extract_embeddings import (  # noqa: PLC0415
+        create_configured_chroma_client,
+        create_thesis_collection,
+    )
+
+    client = create_configured_chroma_client.fn()
+    embedding_function = embedding_function or get_embedding_function()
+    collection = LiveCollection(
+        client,
+        open_collection=lambda name: create_thesis_collection.fn(
+            client, embedding_function, name=name
+        ),
+        open_facet_index=open_facet_index,
+        open_reducer=lambda path: open_reducer(path, embedding_function),
+    )
+    logger.info("Collection loaded")
+    return collection
+
+
+def open_reducer(
+    path: str, embedding_function: "EmbeddingFunction"
+) -> "ReducedEmbeddingFunction":
+    """Carrega a projeção de uma versão da coleção.
+
+    Args:
+        path (str): Caminho da projeção salva na indexação.
+        embedding_function (EmbeddingFunction): Função de embeddings
+        original das consultas.
+
+    Returns:
+        ReducedEmbeddingFunction: Função de embeddings com a projeção.
+    """
+    from src.reduction import (  # noqa: PLC0415
+        EmbeddingReducer,
+        ReducedEmbeddingFunction,
+    )
+
+    reducer = EmbeddingReducer.load(path)
+    logger.info(
+        f"Reducing query embeddings to {reducer.n_components} dimensions "
+        f"with {path}"
+    )
+    return ReducedEmbeddingFunction(embedding_function, reducer)
+
+
+def open_facet_index(path: str | None = None) -> FacetIndex | None:
+    """Carrega o índice de facetas construído junto com a coleção.
+
+    Args:
+        path (str | None, optional): Caminho do índice. Defaults to
+        `FACET_INDEX_PATH`.
+
+    Returns:
+        FacetIndex | None: Índice de facetas ou None, caso não exista.
+    """
+    try:
+        facet_index = FacetIndex.load(path or settings.FACET_INDEX_PATH)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Facet index not available: {e}")
+        return None
+    logger.info("Facet index loaded")
+    return facet_index
+
+
+def _limit_results(
+    where: dict | None, n_results: int, facet_index: FacetIndex | None
+) -> int:
+    """Limita o número de resultados ao total de candidatos do filtro.
+
+    Returns:
+        int: Número de resultados a solicitar, ou 0 quando o índice de
+        facetas garante que nenhum documento satisfaz o filtro.
+    """
+    if facet_index is None:
+        return n_results
+    candidates, exact = facet_index.resolve(where)
+    n_candidates = facet_index.count(candidates)
+    if n_candidates == 0 and exact:
+        return 0
+    return max(1, min(n_results, n_candidates))
+
+
+# A busca traz apenas os metadados (campos exibidos e filtros) e as
+# distâncias; os resumos são carregados por id com `attach_abstracts`.
+SEARCH_INCLUDE = ["metadatas", "distances"]
+
+
+def _flatten_results(results: dict) -> list[list[dict]]:
+    """Combina os metadados e a distância de cada resultado, por consulta."""
+    distances = results.get("distances") or [
+        [None] * len(items) for items in results["metadatas"]
+    ]
+    return [
+        [
+            metadata
+            if distance is None
+            else {**metadata, "distance": distance}
+            for metadata, distance in zip(items, item_distances)
+        ]
+        for items, item_distances in zip(results["metadatas"], distances)
+    ]
+
+
+def _query_key(
+    collection: "Collection", texts: list[str], where, n_results: int
+) -> tuple:
+    """Identifica buscas idênticas, agrupadas enquanto estão em andamento."""
+    return (
+        str(getattr(collection, "name", id(collection))),
+        tuple(texts),
+        json.dumps(where, sort_keys=True, default=str),
+        n_results,
+    )
+
+
+def _query_collection(
+    collection: "Collection",
+    texts: list[str],
+    where: dict | None,
+    n_results: int,
+    query_encoder: QueryEmbeddingCache | None = None,
+) -> list[list[dict]]:
+    """Consulta a coleção e retorna os resultados de cada texto."""
+    if query_encoder is not None:
+        with stage("query_encoding"):
+            query_params = {"query_embeddings": query_encoder.encode(texts)}
+    else:
+        query_params = {"query_texts": texts}
+    with stage("chroma_query"):
+        response = get_backend("chroma").call(
+            _query_key(collection, texts, where, n_results),
+            lambda: collection.query(
+                **query_params,
+                where=where,
+                n_results=n_results,
+                include=SEARCH_INCLUDE,
+            ),
+        )
+    return _flatten_results(response)
+
+
+def _search_documents(  # noqa: PLR0913
+    collection: "Collection",
+    query: str,
+    where: dict | None,
+    n_results: int,
+    *,
+    query_encoder: QueryEmbeddingCache | None,
+    result_cache: ResultCache | None,
+) -> list[dict]:
+    """Busca uma consulta, passando pelo cache de resultados."""
+    if result_cache is not None:
+        cache_key = result_cache.make_key(
+            query, where, n_results, result_cache.index_version(collection)
+        )
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Search results found in cache")
+            return cached
+    documents = [
+        item
+        for items in _query_collection(
+            collection, [query], where, n_results, query_encoder
+        )
+        for item in items
+    ]
+    record_payload("chroma_query", documents)
+    if result_cache is not None:
+        result_cache.set(cache_key, documents)
+    return documents
+
+
+@log_step
+def search_documents(  # noqa: PLR0913
+    collection: "Collection",
+    query: str,
+    where: dict = None,
+    n_results=20,
+    *,
+    facet_index: FacetIndex | None = None,
+    query_encoder: QueryEmbeddingCache | None = None,
+    result_cache: ResultCache | None = None,
+) -> list[dict]:
+    """Realiza uma busca na coleção de documentos.
+
+    Quando o índice de facetas está disponível, os filtros são resolvidos
+    antes da busca vetorial: consultas sem candidatos não chegam ao Chroma
+    e o número de resultados é limitado ao total de candidatos. Com um
+    `query_encoder`, o embedding da consulta vem do cache e é enviado
+    diretamente ao Chroma. Com um `result_cache`, buscas repetidas sobre a
+    mesma versão do índice não chegam ao Chroma.
+
+    Args:
+        collection (Collection): Objeto da coleção de documentos.
+        query (str): Texto da consulta.
+        where (dict, optional): Filtros da consulta. Defaults to None.
+        n_results (int, optional): Número de resultados. Defaults to 20.
+        facet_index (FacetIndex | None, optional): Índice de facetas.
+        Defaults to None.
+        query_encoder (QueryEmbeddingCache | None, optional): Cache dos
+        embeddings das consultas. Defaults to None.
+        result_cache (ResultCache | None, optional): Cache dos resultados
+        das buscas. Defaults to None.
+    """
+    try:
+        log_payload("Searching documents", {"query": query, "where": where})
+        n_results = _limit_results(where, n_results, facet_index)
+        if n_results == 0:
+            logger.info("No candidates found in facet index")
+            return []
+        return _search_documents(
+            collection,
+            query,
+            where,
+            n_results,
+            query_encoder=query_encoder,
+            result_cache=result_cache,
+        )
+    except Exception as e:
+        logger.error(f"Error searching documents: {e}")
+        return []
+
+
+@log_step
+def search_documents_batch(  # noqa: PLR0913
+    collection: "Collection",
+    queries: list[dict],
+    n_results: int = 20,
+    batch_size: int = 32,
+    *,
+    facet_index: FacetIndex | None = None,
+    query_encoder: QueryEmbeddingCache | None = None,
+) -> list[list[dict]]:
+    """Realiza várias buscas agrupando as consultas com os mesmos filtros.
+
+    Consultas com o mesmo `where` são enviadas em uma única chamada
+    `collection.query(query_texts=[...])`, de modo que os textos de cada
+    lote são codificados de uma só vez.
+
+    Args:
+        collection (Collection): Objeto da coleção de documentos.
+        queries (list[dict]): Consultas no formato gerado pelo LLM, com as
+        chaves `query` e, opcionalmente, `where`.
+        n_results (int, optional): Número de resultados por consulta.
+        Defaults to 20.
+        batch_size (int, optional): Máximo de consultas por chamada ao
+        Chroma. Defaults to 32.
+        facet_index (FacetIndex | None, optional): Índice de facetas.
+        Defaults to None.
+        query_encoder (QueryEmbeddingCache | None, optional): Cache dos
+        embeddings das consultas. Defaults to None.
+
+    Returns:
+        list[list[dict]]: Metadados retornados para cada consulta, na mesma
+        ordem de `queries`.
+    """
+    groups = {}
+    for position, chroma_query in enumerate(queries):
+        where = chroma_query.get("where") or None
+        key = json.dumps(where, sort_keys=True, ensure_ascii=False)
+        groups.setdefault(key, (where, []))[1].append(position)
+
+    results = [[] for _ in queries]
+    for where, positions in groups.values():
+        limit = _limit_results(where, n_results, facet_index)
+        if limit == 0:
+            continue
+        for start in range(0, len(positions), batch_size):
+            batch = positions[start : start + batch_size]
+            texts = [queries[i]["query"] for i in batch]
+            try:
+                metadatas = _query_collection(
+                    collection, texts, where, limit, query_encoder
+                )
+            except Exception as e:
+                logger.error(f"Error searching documents batch: {e}")
+                continue
+            record_payload("chroma_query", metadatas)
+            for position, items in zip(batch, metadatas):
+                results[position] = items
+    return results
+
+
+def fetch_abstracts(collection: "Collection", ids: list[str]) -> dict:
+    """Busca os resumos de documentos da coleção pelos ids.
+
+    Args:
+        collection (Collection): Objeto da coleção de documentos.
+        ids (list[str]): Ids dos documentos.
+
+    Returns:
+        dict: Resumo de cada id encontrado.
+    """
+    if not ids:
+        return {}
+    with stage("fetch_abstracts"):
+        response = get_backend("chroma").call(
+            ("get", str(getattr(collection, "name", id(collection))), *ids),
+            lambda: collection.get(ids=list(ids), include=["documents"]),
+        )
+    abstracts = dict(zip(response["ids"], response["documents"]))
+    record_payload("fetch_abstracts", abstracts)
+    return abstracts
+
+
+def attach_abstracts(
+    collection: "Collection",
+    documents: list[dict],
+    ids: list[str] | None = None,
+) -> list[dict]:
+    """Acrescenta o resumo (`DS_RESUMO`) aos documentos que não o têm.
+
+    Os resumos não fazem parte dos metadados retornados pela busca e são
+    carregados apenas para os documentos usados na resposta ou exibidos.
+
+    Args:
+        collection (Collection): Objeto da coleção de documentos.
+        documents (list[dict]): Documentos retornados pela busca.
+        ids (list[str] | None, optional): Carrega apenas os resumos destes
+        documentos. Defaults to None, que carrega todos.
+
+    Returns:
+        list[dict]: Novos dicionários dos documentos, com os resumos.
+    """
+    wanted = list(
+        dict.fromkeys(
+            str(document["id"])
+            for document in documents
+            if "id" in document
+            and not document.get("DS_RESUMO")
+            and (ids is None or str(document["id"]) in ids)
+        )
+    )
+    try:
+        abstracts = fetch_abstracts(collection, wanted)
+    except Exception as e:
+        logger.error(f"Error fetching abstracts: {e}")
+        abstracts = {}
+    return [
+        {**document, "DS_RESUMO": abstracts[str(document["id"])]}
+        if str(document.get("id")) in abstracts
+        else document
+        for document in documents
+    ]
+
+
+def select_context(
+    collection: "Collection",
+    query: str,
+    documents: list[dict],
+    reranker: Reranker | None = None,
+    top_k: int | None = None,
+) -> list[dict]:
+    """Seleciona os documentos enviados ao LLM para gerar a resposta.
+
+    Com um `reranker`, reordena os candidatos e mantém apenas os `top_k`
+    mais relevantes. Os resumos são carregados antes da reordenação quando
+    o `reranker` precisa deles (`needs_abstracts`) e, caso contrário,
+    apenas para os documentos mantidos.
+
+    Args:
+        collection (Collection): Objeto da coleção de documentos.
+        query (str): Pergunta do usuário.
+        documents (list[dict]): Documentos retornados pela busca.
+        reranker (Reranker | None, optional): Modelo de reordenação.
+        Defaults to None, que mantém todos os documentos.
+        top_k (int | None, optional): Documentos mantidos após a
+        reordenação. Defaults to `RERANK_TOP_K`.
+
+    Returns:
+        list[dict]: Documentos do contexto, com os resumos.
+    """
+    if reranker is not None:
+        if reranker.needs_abstracts:
+            documents = attach_abstracts(collection, documents)
+        documents = rerank(
+            query, documents, reranker, top_k or settings.RERANK_TOP_K
+        )
+    return attach_abstracts(collection, documents)
+
+
+@timed("context_building")
+def build_answer_text(query: str, documents: list[dict]) -> str:
+    """Monta o texto enviado ao LLM para gerar a resposta final.
+
+    Args:
+        query (str): Pergunta do usuário.
+        documents (list[dict]): Documentos recuperados.
+
+    Returns:
+        str: Texto com a pergunta e os documentos recuperados.
+    """
+    text = f"""
+            - Query: {query}
+            - Documents:
+            {documents}
+            """
+    record_payload("context_building", text)
+    return text
+
+
+def _completion_params(text: str, prompt: str) -> dict:
+    log_payload("Sending text to OpenAI", text)
+    # As instruções são fixas; basta o hash para identificá-las.
+    log_payload("Prompt", prompt, max_chars=0)
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": text},
+        ],
+        "response_format": {"type": "json_object"},
+        "timeout": settings.OPENAI_TIMEOUT,
+    }
+
+
+def _parse_completion(completion) -> dict:
+    answer = completion.choices[0].message.content
+    log_payload("Received response from OpenAI", answer)
+    record_tokens(str(completion.model), completion.usage)
+    # Respostas sem conteúdo (recusas) falham como JSON inválido.
+    return json.loads((answer or "").strip("```json").strip("```"))
+
+
+def _completion_key(params: dict) -> str:
+    """Identifica pedidos idênticos ao LLM."""
+    return json.dumps(params, sort_keys=True, ensure_ascii=False)
+
+
+@log_step
+def get_agent_response(text: str, prompt: str, client: "OpenAI") -> dict:
+    """Envia o texto ao LLM e converte a resposta de JSON.
+
+    A chamada passa pelas proteções de `src/resilience.py`: pedidos
+    idênticos em andamento são agrupados, o número de chamadas simultâneas
+    é limitado e erros transitórios são repetidos.
+
+    Args:
+        text (str): Texto enviado pelo usuário.
+        prompt (str): Instruções do sistema.
+        client (OpenAI): Cliente da OpenAI.
+
+    Returns:
+        dict: Resposta do LLM convertida de JSON.
+    """
+    params = _completion_params(text, prompt)
+    completion = get_backend("openai").call(
+        _completion_key(params),
+        lambda: client.chat.completions.create(**params),
+    )
+    return _parse_completion(completion)
+
+
+async def aget_agent_response(
+    text: str, prompt: str, client: "AsyncOpenAI"
+) -> dict:
+    """Versão assíncrona de `get_agent_response`.
+
+    Args:
+        text (str): Texto enviado pelo usuário.
+        prompt (str): Instruções do sistema.
+        client (AsyncOpenAI): Cliente assíncrono da OpenAI.
+
+    Returns:
+        dict: Resposta do LLM convertida de JSON.
+    """
+    tic = dt.datetime.now()
+    params = _completion_params(text, prompt)
+    with stage("aget_agent_response"):
+        completion = await get_backend("openai").acall(
+            _completion_key(params),
+            lambda: client.chat.completions.create(**params),
+        )
+    time_taken = str(dt.datetime.now() - tic)
+    logger.info(f"just ran step aget_agent_response took {time_taken}s")
+    return _parse_completion(completion)
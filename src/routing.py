@@ -0,0 +1,288 @@
+"""Coleções por faixa de anos e roteamento das buscas.
+
+Com `YEAR_SHARD_SPAN`, cada versão do índice grava os documentos de cada
+faixa de `YEAR_SHARD_SPAN` anos (`AN_BASE`) em uma coleção própria,
+`thesis_capes_v<N>_y<ano inicial>`. O `ShardedCollection` reúne essas
+coleções e pode ser usado no lugar de uma `Collection`:
+
+- a árvore `where` gerada pelo LLM é avaliada sobre os anos de cada
+  coleção, e apenas as coleções com anos que podem satisfazer o filtro
+  são consultadas; consultas sem filtro de ano consultam todas;
+- as coleções escolhidas são consultadas em paralelo, com o embedding da
+  consulta calculado uma única vez;
+- os resultados são unidos pela distância.
+
+Condições sobre outros campos, ou sobre o ano com operadores que não
+podem ser avaliados, não descartam nenhuma coleção.
+"""
+
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.config import settings
+
+YEAR_COLUMN = "AN_BASE"
+DEFAULT_INCLUDE = ["metadatas", "documents", "distances"]
+_COMPARISONS = {
+    "$gt": lambda a, b: a > b,
+    "$gte": lambda a, b: a >= b,
+    "$lt": lambda a, b: a < b,
+    "$lte": lambda a, b: a <= b,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Retorna o pool de threads das consultas às coleções, compartilhado
+    pelo processo, com até `ROUTING_MAX_WORKERS` consultas simultâneas."""
+    global _executor  # noqa: PLW0603
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ROUTING_MAX_WORKERS,
+                thread_name_prefix="shard-query",
+            )
+    return _executor
+
+
+def shard_start(year: int, span: int) -> int:
+    """Ano inicial da faixa de `span` anos que contém `year`."""
+    return year // span * span
+
+
+def shard_collection_name(collection: str, start: int) -> str:
+    """Nome da coleção da faixa de anos iniciada em `start`."""
+    return f"{collection}_y{start}"
+
+
+def _number(value) -> float | None:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(number) else number
+
+
+def _resolve_field(condition, years: set[int]) -> set[int]:
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+    result = set(years)
+    for operator, operand in condition.items():
+        # Os anos são comparados ao valor numérico do filtro, sem
+        # truncá-lo: `$lt 2020.5` inclui 2020, e `$eq 2020.5` nenhum ano.
+        if operator in {"$in", "$nin"}:
+            numbers = {_number(value) for value in operand}
+        else:
+            number = _number(operand)
+        if operator == "$eq":
+            matched = (
+                years
+                if number is None
+                else {year for year in years if year == number}
+            )
+        elif operator == "$ne":
+            matched = {year for year in years if year != number}
+        elif operator == "$in":
+            matched = (
+                years
+                if None in numbers
+                else {year for year in years if year in numbers}
+            )
+        elif operator == "$nin":
+            matched = {year for year in years if year not in numbers}
+        elif operator in _COMPARISONS and number is not None:
+            compare = _COMPARISONS[operator]
+            matched = {year for year in years if compare(year, number)}
+        else:
+            matched = years
+        result &= matched
+    return result
+
+
+def _resolve(where: dict, years: set[int]) -> set[int]:
+    result = set(years)
+    for key, condition in where.items():
+        if key == "$and":
+            for clause in condition:
+                result &= _resolve(clause, years)
+        elif key == "$or":
+            union = set()
+            for clause in condition:
+                union |= _resolve(clause, years)
+            result &= union
+        elif key == YEAR_COLUMN:
+            result &= _resolve_field(condition, years)
+    return result
+
+
+def route(where: dict | None, starts: list[int], span: int) -> list[int]:
+    """Escolhe as coleções que podem ter documentos que satisfazem o
+    filtro.
+
+    Args:
+        where (dict | None): Filtros da consulta.
+        starts (list[int]): Ano inicial de cada coleção.
+        span (int): Anos por coleção.
+
+    Returns:
+        list[int]: Anos iniciais das coleções a consultar.
+    """
+    if not where:
+        return list(starts)
+    years = {start + offset for start in starts for offset in range(span)}
+    matched = _resolve(where, years)
+    return [
+        start
+        for start in starts
+        if any(start + offset in matched for offset in range(span))
+    ]
+
+
+def merge_results(
+    responses: list[dict], n_results: int, include: list[str]
+) -> dict:
+    """Une as respostas de `query` de várias coleções pela distância.
+
+    Args:
+        responses (list[dict]): Respostas de cada coleção, com as mesmas
+        consultas na mesma ordem.
+        n_results (int): Resultados mantidos por consulta.
+        include (list[str]): Campos incluídos nas respostas.
+
+    Returns:
+        dict: Resposta no formato de `Collection.query`.
+    """
+    fields = ["ids", *include]
+    n_queries = max(
+        (len(response["ids"]) for response in responses), default=0
+    )
+    merged = {field: [] for field in fields}
+    for i in range(n_queries):
+        items = [
+            (response["distances"][i][j], shard, j)
+            for shard, response in enumerate(responses)
+            for j in range(len(response["ids"][i]))
+        ]
+        items.sort(key=lambda item: (item[0], item[1]))
+        for field in fields:
+            merged[field].append(
+                [
+                    responses[shard][field][i][j]
+                    for _, shard, j in items[:n_results]
+                ]
+            )
+    return merged
+
+
+class ShardedCollection:
+    """Coleções de faixas de anos consultadas como uma única coleção.
+
+    Args:
+        name (str): Nome da versão do índice.
+        shards (dict[int, Collection]): Coleção de cada ano inicial.
+        span (int): Anos por coleção.
+        embedding_function (EmbeddingFunction | None, optional): Função de
+        embeddings das consultas. Defaults to None, que usa a das coleções.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        shards: dict,
+        span: int,
+        embedding_function=None,
+    ) -> None:
+        self.name = name
+        self.shards = dict(sorted(shards.items()))
+        self.span = span
+        self.embedding_function = embedding_function or getattr(
+            next(iter(self.shards.values()), None),
+            "_embedding_function",
+            None,
+        )
+        # O pool é do processo, e não de cada instância: o `LiveCollection`
+        # cria uma instância a cada troca de versão.
+        self._executor = get_executor()
+
+    @property
+    def id(self) -> str:
+        return ",".join(str(shard.id) for shard in self.shards.values())
+
+    def count(self) -> int:
+        return sum(
+            self._executor.map(
+                lambda shard: shard.count(), self.shards.values()
+            )
+        )
+
+    def route(self, where: dict | None) -> list[int]:
+        """Anos iniciais das coleções consultadas para o filtro."""
+        return route(where, list(self.shards), self.span)
+
+    def query(
+        self,
+        query_texts: list[str] | None = None,
+        query_embeddings=None,
+        where: dict | None = None,
+        n_results: int = 10,
+        include: list[str] | None = None,
+    ) -> dict:
+        """Consulta em paralelo as coleções escolhidas pelo filtro.
+
+        Args:
+            query_texts (list[str] | None, optional): Textos das consultas.
+            query_embeddings (optional): Embeddings das consultas, usados no
+            lugar dos textos.
+            where (dict | None, optional): Filtros da consulta.
+            n_results (int, optional): Resultados por consulta. Defaults to
+            10.
+            include (list[str] | None, optional): Campos retornados.
+            Defaults to metadados, documentos e distâncias.
+
+        Returns:
+            dict: Resposta no formato de `Collection.query`.
+        """
+        include = list(include or DEFAULT_INCLUDE)
+        # As distâncias são necessárias para unir os resultados.
+        shard_include = list(dict.fromkeys([*include, "distances"]))
+        if query_embeddings is None:
+            query_embeddings = self.embedding_function(query_texts)
+        query_embeddings = [list(map(float, e)) for e in query_embeddings]
+        shards = [self.shards[start] for start in self.route(where)]
+        responses = list(
+            self._executor.map(
+                lambda shard: shard.query(
+                    query_embeddings=query_embeddings,
+                    where=where,
+                    n_results=n_results,
+                    include=shard_include,
+                ),
+                shards,
+            )
+        )
+        if not responses:
+            return {
+                field: [[] for _ in query_embeddings]
+                for field in ["ids", *include]
+            }
+        return merge_results(responses, n_results, include)
+
+    def get(self, ids: list[str] | None = None, **kwargs) -> dict:
+        """Busca documentos pelos ids em todas as coleções."""
+        responses = list(
+            self._executor.map(
+                lambda shard: shard.get(ids=ids, **kwargs),
+                self.shards.values(),
+            )
+        )
+        merged = {}
+        for response in responses:
+            for field, values in response.items():
+                if isinstance(values, list):
+                    merged.setdefault(field, []).extend(values)
+                else:
+                    merged.setdefault(field, values)
+        return merged
@@ -0,0 +1,181 @@
+"""Esquema do Catálogo de Teses e Dissertações da CAPES.
+
+Os tipos inferidos pelo `pd.read_excel` deixam as colunas de texto
+repetitivas como objetos Python e os códigos como `int64`/`float64`. O
+esquema define os tipos de cada coluna conhecida:
+
+- categorias para os campos com poucos valores distintos (UF, grau, área,
+  instituição, programa, ...), gravadas no Parquet como dicionários;
+- inteiros pequenos, que aceitam nulos, para `AN_BASE` e os códigos;
+- datas no formato do catálogo;
+- strings do Arrow para os demais textos (título, resumo, palavras-chave).
+
+O esquema é aplicado a cada arquivo logo após a leitura, antes da união
+dos arquivos, e as categorias de arquivos diferentes são unificadas com
+`union_categoricals` para que a união não as converta em objetos.
+"""
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+DT_FORMAT = "%d/%m/%Y %H:%M:%S"
+STRING_DTYPE = pd.StringDtype("pyarrow")
+
+CATEGORY_COLUMNS = [
+    "CD_PROGRAMA",
+    "NM_PROGRAMA",
+    "CD_ENTIDADE_CAPES",
+    "SG_ENTIDADE_ENSINO",
+    "NM_ENTIDADE_ENSINO",
+    "NM_GRANDE_AREA_CONHECIMENTO",
+    "NM_AREA_CONHECIMENTO",
+    "NM_SUBAREA_CONHECIMENTO",
+    "NM_ESPECIALIDADE",
+    "NM_AREA_AVALIACAO",
+    "NM_GRAU_ACADEMICO",
+    "NM_TIPO_PRODUCAO",
+    "NM_SUBTIPO_PRODUCAO",
+    "NM_AREA_CONCENTRACAO",
+    "NM_LINHA_PESQUISA",
+    "NM_REGIAO",
+    "SG_UF_IES",
+    "NM_UF_IES",
+    "NM_MUNICIPIO_PROGRAMA_IES",
+    "NM_MODALIDADE_PROGRAMA",
+    "NM_IDIOMA",
+    "NM_PAIS",
+    "NM_UF",
+    "NM_CIDADE",
+    "NM_EDITORA",
+    "NM_TP_VINCULO",
+    "NM_EXPECTATIVA_ATUACAO",
+    "DS_BIBLIOTECA_DEPOSITARIA",
+    "IN_TRABALHO_MESMA_AREA",
+    "IN_ORIENT_PARTICIPOU_BANCA",
+]
+INTEGER_COLUMNS = {
+    "AN_BASE": "Int16",
+    "CD_GRANDE_AREA_CONHECIMENTO": "Int32",
+    "CD_AREA_CONHECIMENTO": "Int32",
+    "CD_SUBAREA_CONHECIMENTO": "Int32",
+    "CD_ESPECIALIDADE": "Int32",
+    "CD_AREA_AVALIACAO": "Int16",
+    "CD_CONCEITO_PROGRAMA": "Int8",
+    "ID_GRAU_ACADEMICO": "Int8",
+    "ID_TIPO_PRODUCAO": "Int8",
+    "ID_SUBTIPO_PRODUCAO": "Int8",
+    "ID_TP_EXPECTATIVA_ATUACAO": "Int8",
+    "ID_PRODUCAO_INTELECTUAL": "Int64",
+    "ID_ADD_PRODUCAO_INTELECTUAL": "Int64",
+    "ID_AREA_CONCENTRACAO": "Int32",
+    "ID_LINHA_PESQUISA": "Int32",
+    "ID_PROJETO": "Int32",
+    "ID_PESSOA_DISCENTE": "Int64",
+    "NR_VOLUME": "Int32",
+    "NR_PAGINAS": "Int32",
+}
+DATE_COLUMNS = [
+    "DH_INICIO_AREA_CONC",
+    "DH_FIM_AREA_CONC",
+    "DH_INICIO_LINHA",
+    "DH_FIM_LINHA",
+    "DT_TITULACAO",
+    "DT_MATRICULA",
+]
+REQUIRED_COLUMNS = ["AN_BASE", "NM_PRODUCAO", "DS_RESUMO"]
+FIRST_YEAR = 1987
+LAST_YEAR = 2100
+
+
+def memory_usage(df: pd.DataFrame) -> int:
+    """Memória ocupada pelo DataFrame, em bytes, incluindo os textos."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Converte as colunas de um arquivo do catálogo para os tipos do
+    esquema.
+
+    Colunas ausentes são ignoradas, e colunas de texto que não constam do
+    esquema passam a ser strings do Arrow.
+
+    Args:
+        df (pd.DataFrame): Dados lidos de um arquivo do catálogo.
+
+    Raises:
+        ValueError: Se um código não for inteiro ou uma data estiver fora
+        do formato `DT_FORMAT`.
+
+    Returns:
+        pd.DataFrame: Dados com os tipos do esquema.
+    """
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if column in INTEGER_COLUMNS:
+            values = pd.to_numeric(values).astype(INTEGER_COLUMNS[column])
+        elif column in DATE_COLUMNS:
+            values = pd.to_datetime(values, format=DT_FORMAT)
+        elif column in CATEGORY_COLUMNS:
+            values = values.astype(STRING_DTYPE).astype("category")
+        elif not pd.api.types.is_numeric_dtype(values):
+            values = values.astype(STRING_DTYPE)
+        columns[column] = values
+    return pd.DataFrame(columns, index=df.index)
+
+
+def concat_catalogs(dfs: list[pd.DataFrame]) -> pd.DataFrame:
+    """Une os arquivos do catálogo preservando as colunas categóricas.
+
+    Args:
+        dfs (list[pd.DataFrame]): Arquivos já convertidos por
+        `apply_schema`.
+
+    Returns:
+        pd.DataFrame: Catálogo completo.
+    """
+    dfs = [df.copy(deep=False) for df in dfs]
+    for column in CATEGORY_COLUMNS:
+        parts = [df[column] for df in dfs if column in df]
+        if len(parts) < 2:  # noqa: PLR2004
+            continue
+        categories = union_categoricals(parts, ignore_order=True).categories
+        for df in dfs:
+            if column in df:
+                df[column] = df[column].cat.set_categories(categories)
+    return pd.concat(dfs, ignore_index=True)
+
+
+def validate_schema(df: pd.DataFrame) -> None:
+    """Confere as colunas obrigatórias, os tipos e os anos do catálogo.
+
+    Args:
+        df (pd.DataFrame): Catálogo completo.
+
+    Raises:
+        ValueError: Se faltar alguma coluna obrigatória, alguma coluna
+        estiver com um tipo diferente do esquema ou `AN_BASE` tiver nulos
+        ou anos inválidos.
+    """
+    missing = [column for column in REQUIRED_COLUMNS if column not in df]
+    if missing:
+        raise ValueError(f"Missing catalog columns: {missing}")
+
+    expected = {
+        **INTEGER_COLUMNS,
+        **dict.fromkeys(CATEGORY_COLUMNS, "category"),
+        **dict.fromkeys(DATE_COLUMNS, "datetime64"),
+    }
+    wrong = {
+        column: str(df[column].dtype)
+        for column, dtype in expected.items()
+        if column in df and not str(df[column].dtype).startswith(dtype)
+    }
+    if wrong:
+        raise ValueError(f"Catalog columns with unexpected dtypes: {wrong}")
+
+    years = df["AN_BASE"]
+    if years.isna().any():
+        raise ValueError("AN_BASE has missing values")
+    if len(years) and not years.between(FIRST_YEAR, LAST_YEAR).all():
+        raise ValueError(f"AN_BASE out of range: {years.min()}-{years.max()}")
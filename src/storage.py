@@ -0,0 +1,315 @@
+"""Acesso a arquivos locais e no S3/MinIO compartilhado pelos fluxos.
+
+- O cliente do boto3 é criado uma única vez por processo, com um pool de
+  conexões do tamanho da concorrência das transferências.
+- As listagens percorrem todas as páginas de `list_objects_v2`, a partir
+  do prefixo informado na URL `s3://bucket/caminho`.
+- Os envios usam transferências multipart com partes enviadas em paralelo
+  (`S3_MAX_CONCURRENCY`).
+- As leituras no S3 são feitas por intervalos de bytes, com os blocos já
+  lidos guardados em `S3_CACHE_DIR`, de modo que um Parquet lido
+  novamente, ou apenas algumas de suas colunas, não é baixado por inteiro.
+- As etapas dos fluxos trocam dados por arquivos Arrow locais, nomeados
+  pela impressão digital das entradas e lidos por mapeamento de memória.
+
+O módulo não depende de `src.config`, para que o fluxo de download possa
+utilizá-lo sem as configurações do ChromaDB. Os parâmetros vêm das
+variáveis de ambiente `S3_MAX_CONCURRENCY`, `S3_MULTIPART_CHUNK_MB` e
+`S3_CACHE_DIR`; o endpoint do MinIO e as credenciais, das variáveis
+`AWS_*` lidas pelo próprio boto3.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from typing import IO
+
+import boto3
+import fsspec
+import pandas as pd
+import pyarrow as pa
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from pyarrow import feather
+
+MAX_CONCURRENCY = int(os.environ.get("S3_MAX_CONCURRENCY", "10"))
+MULTIPART_CHUNK_SIZE = int(os.environ.get("S3_MULTIPART_CHUNK_MB", "16")) * (
+    2**20
+)
+CACHE_DIR = os.environ.get("S3_CACHE_DIR", "data/.s3cache")
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def is_s3(path: str) -> bool:
+    return str(path).startswith("s3://")
+
+
+def split_s3_url(url: str) -> tuple[str, str]:
+    """Separa o bucket e a chave de uma URL `s3://bucket/chave`."""
+    bucket, _, key = url.removeprefix("s3://").partition("/")
+    return bucket, key
+
+
+def get_s3_client():
+    """Retorna o cliente do S3 compartilhado pelo processo."""
+    global _client  # noqa: PLW0603
+    with _client_lock:
+        if _client is None:
+            _client = boto3.client(
+                "s3",
+                config=Config(
+                    max_pool_connections=MAX_CONCURRENCY,
+                    retries={"max_attempts": 5, "mode": "adaptive"},
+                ),
+            )
+    return _client
+
+
+def transfer_config() -> TransferConfig:
+    """Configuração das transferências multipart paralelas."""
+    return TransferConfig(
+        multipart_threshold=MULTIPART_CHUNK_SIZE,
+        multipart_chunksize=MULTIPART_CHUNK_SIZE,
+        max_concurrency=MAX_CONCURRENCY,
+        use_threads=True,
+    )
+
+
+def list_objects(url: str, extension: str = "") -> list[str]:
+    """Lista os objetos sob o prefixo de uma URL `s3://bucket/caminho`.
+
+    Args:
+        url (str): Bucket e prefixo.
+        extension (str, optional): Extensão dos objetos listados. Defaults
+        to "", que lista todos.
+
+    Returns:
+        list[str]: URLs dos objetos encontrados, em ordem alfabética.
+    """
+    bucket, _ = split_s3_url(url)
+    return [
+        f"s3://{bucket}/{content['Key']}"
+        for content in _list_contents(url)
+        if content["Key"].endswith(extension)
+    ]
+
+
+def _list_contents(url: str) -> list[dict]:
+    bucket, prefix = split_s3_url(url)
+    if prefix and not prefix.endswith("/"):
+        prefix += "/"
+    paginator = get_s3_client().get_paginator("list_objects_v2")
+    return [
+        content
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix)
+        for content in page.get("Contents", [])
+    ]
+
+
+def upload_fileobj(fileobj: IO[bytes], url: str, callback=None) -> None:
+    """Envia um arquivo ou fluxo de bytes ao S3 em partes paralelas.
+
+    Args:
+        fileobj (IO[bytes]): Arquivo aberto para leitura.
+        url (str): Destino `s3://bucket/chave`.
+        callback (Callable[[int], None] | None, optional): Chamado com o
+        número de bytes de cada parte enviada. Defaults to None.
+    """
+    bucket, key = split_s3_url(url)
+    get_s3_client().upload_fileobj(
+        fileobj, bucket, key, Config=transfer_config(), Callback=callback
+    )
+
+
+def open_file(path: str) -> fsspec.core.OpenFile:
+    """Abre um arquivo local ou no S3 para leitura.
+
+    No S3, o arquivo é lido por intervalos de bytes e os blocos lidos são
+    mantidos em `S3_CACHE_DIR`.
+
+    Args:
+        path (str): Caminho local ou URL `s3://`.
+
+    Returns:
+        OpenFile: Arquivo a ser usado em um bloco `with`.
+    """
+    if not is_s3(path):
+        return fsspec.open(path, "rb")
+    return fsspec.open(
+        f"blockcache::{path}",
+        "rb",
+        blockcache={"cache_storage": CACHE_DIR},
+    )
+
+
+def read_parquet(path: str, columns: list[str] | None = None) -> pd.DataFrame:
+    """Lê as colunas informadas de um arquivo Parquet local ou no S3.
+
+    Args:
+        path (str): Caminho local ou URL `s3://`.
+        columns (list[str] | None, optional): Colunas lidas. Defaults to
+        None, que lê todas.
+
+    Returns:
+        pd.DataFrame: Dados lidos.
+    """
+    if not is_s3(path):
+        return pd.read_parquet(path, columns=columns)
+    with open_file(path) as f:
+        return pd.read_parquet(f, columns=columns)
+
+
+def write_parquet(df: pd.DataFrame, path: str) -> str:
+    """Salva um DataFrame em Parquet, localmente ou no S3.
+
+    No S3, o arquivo é gravado em um diretório temporário e enviado em
+    partes paralelas.
+
+    Args:
+        df (pd.DataFrame): Dados.
+        path (str): Caminho local ou URL `s3://`.
+
+    Returns:
+        str: Caminho do arquivo salvo.
+    """
+    if not is_s3(path):
+        df.to_parquet(path)
+        return path
+    with tempfile.TemporaryFile() as f:
+        df.to_parquet(f)
+        f.seek(0)
+        upload_fileobj(f, path)
+    return path
+
+
+def fingerprint(path: str) -> str:
+    """Identifica o conteúdo de um arquivo sem lê-lo.
+
+    Usa o tamanho e a data de modificação de arquivos locais e o ETag de
+    objetos no S3, de modo que um arquivo alterado gera outra impressão
+    digital. Para um diretório local ou um prefixo no S3 (um dataset
+    Parquet particionado, por exemplo), usa os de cada arquivo contido,
+    em ordem alfabética.
+
+    Args:
+        path (str): Caminho local ou URL `s3://`.
+
+    Returns:
+        str: Impressão digital do arquivo.
+
+    Raises:
+        FileNotFoundError: Se o caminho não existe ou o prefixo está vazio.
+    """
+    if is_s3(path):
+        parts = [path, *_s3_fingerprint_parts(path)]
+    elif os.path.isdir(path):
+        members = sorted(
+            os.path.join(root, name)
+            for root, _, files in os.walk(path)
+            for name in files
+        )
+        parts = [os.path.abspath(path)]
+        for member in members:
+            stat = os.stat(member)
+            relative = os.path.relpath(member, path)
+            parts.append((relative, stat.st_size, stat.st_mtime_ns))
+    else:
+        stat = os.stat(path)
+        parts = [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+    return hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()
+
+
+def _s3_fingerprint_parts(url: str) -> list:
+    bucket, key = split_s3_url(url)
+    if key and not key.endswith("/"):
+        try:
+            head = get_s3_client().head_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            # Sem objeto com essa chave, ela pode ser um prefixo.
+            if e.response["Error"]["Code"] not in {"404", "NoSuchKey"}:
+                raise
+        else:
+            return [head["ETag"], head["ContentLength"]]
+    contents = _list_contents(url)
+    if not contents:
+        raise FileNotFoundError(url)
+    return sorted(
+        (content["Key"], content["Size"], content["ETag"])
+        for content in contents
+    )
+
+
+def handoff_path(directory: str, stage: str, *key) -> str:
+    """Caminho do arquivo de saída de uma etapa para as entradas `key`.
+
+    Args:
+        directory (str): Diretório local dos arquivos intermediários.
+        stage (str): Nome da etapa.
+        *key: Impressões digitais e parâmetros que determinam a saída.
+
+    Returns:
+        str: Caminho `<directory>/<stage>-<hash>.arrow`.
+    """
+    return os.path.join(directory, f"{stage}-{_key_digest(key)}.arrow")
+
+
+def checkpoint_dir(directory: str, stage: str, *key) -> str:
+    """Diretório dos marcadores de conclusão de uma etapa dividida em
+    partes, para as entradas `key`.
+
+    Args:
+        directory (str): Diretório local dos arquivos intermediários.
+        stage (str): Nome da etapa.
+        *key: Impressões digitais e parâmetros que determinam a saída.
+
+    Returns:
+        str: Caminho `<directory>/<stage>-<hash>/`, já criado.
+    """
+    path = os.path.join(directory, f"{stage}-{_key_digest(key)}")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _key_digest(key: tuple) -> str:
+    return hashlib.sha256("|".join(map(str, key)).encode()).hexdigest()[:16]
+
+
+def write_arrow(df: pd.DataFrame, path: str) -> str:
+    """Salva um DataFrame em um arquivo Arrow (Feather v2) sem compressão,
+    que pode ser lido por mapeamento de memória.
+
+    O arquivo é gravado com outro nome e renomeado ao final, de modo que
+    uma gravação interrompida não deixa um arquivo incompleto no lugar.
+
+    Args:
+        df (pd.DataFrame): Dados.
+        path (str): Caminho local.
+
+    Returns:
+        str: Caminho do arquivo salvo.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_arrow(path: str, columns: list[str] | None = None) -> pd.DataFrame:
+    """Lê um arquivo salvo por `write_arrow` por mapeamento de memória.
+
+    Args:
+        path (str): Caminho local.
+        columns (list[str] | None, optional): Colunas lidas. Defaults to
+        None, que lê todas.
+
+    Returns:
+        pd.DataFrame: Dados lidos.
+    """
+    table = feather.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas()
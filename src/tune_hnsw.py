@@ -0,0 +1,271 @@
+"""Ajuste dos parâmetros do índice HNSW da coleção de teses.
+
+Para cada combinação de parâmetros, uma amostra dos embeddings da coleção
+é indexada em um ChromaDB local e as consultas são comparadas com a busca
+exata (força bruta). São reportados o recall@k, a latência das consultas,
+o tempo de construção e o tamanho do índice, para que o ponto de operação
+seja escolhido de forma deliberada e configurado em `HNSW_*`.
+
+As consultas vêm de um arquivo JSONL de perguntas (campo `query` ou
+`question`) ou, se nenhum for informado, de documentos da amostra que não
+são indexados.
+
+Exemplo:
+    typer src/tune_hnsw.py run --sample-size 50000 --m 16,32 \
+        --construction-ef 100,200 --search-ef 10,50,100
+"""
+
+import itertools
+import tempfile
+import time
+from pathlib import Path
+
+import chromadb
+import numpy as np
+import pandas as pd
+
+from src.config import logger, settings
+from src.extract_embeddings import hnsw_metadata
+
+# Linhas processadas por vez na busca exata, para limitar a memória.
+EXACT_BLOCK_SIZE = 256
+
+
+def load_sample(
+    collection: chromadb.Collection, sample_size: int
+) -> tuple[list[str], np.ndarray]:
+    """Lê os identificadores e embeddings de uma amostra da coleção.
+
+    Args:
+        collection (Collection): Coleção de teses.
+        sample_size (int): Número de documentos.
+
+    Returns:
+        tuple[list[str], np.ndarray]: Identificadores e embeddings.
+    """
+    result = collection.get(limit=sample_size, include=["embeddings"])
+    return result["ids"], np.asarray(result["embeddings"], dtype=np.float32)
+
+
+def load_queries(path: str, embedding_function, n_queries: int) -> np.ndarray:
+    """Codifica as consultas de um arquivo JSONL de perguntas.
+
+    Args:
+        path (str): Arquivo com as perguntas.
+        embedding_function (EmbeddingFunction): Função de embeddings.
+        n_queries (int): Máximo de consultas.
+
+    Returns:
+        np.ndarray: Embeddings das consultas.
+    """
+    from src.batch import read_questions  # noqa: PLC0415
+
+    records = read_questions(path)[:n_queries]
+    texts = [record.get("query") or record["question"] for record in records]
+    return np.asarray(embedding_function(texts), dtype=np.float32)
+
+
+def _prepare(vectors: np.ndarray, space: str) -> np.ndarray:
+    if space == "cosine":
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+    return vectors
+
+
+def exact_neighbors(
+    data: np.ndarray, queries: np.ndarray, k: int, space: str = "l2"
+) -> np.ndarray:
+    """Calcula os k vizinhos exatos de cada consulta.
+
+    Args:
+        data (np.ndarray): Embeddings indexados.
+        queries (np.ndarray): Embeddings das consultas.
+        k (int): Número de vizinhos.
+        space (str, optional): `l2`, `cosine` ou `ip`. Defaults to "l2".
+
+    Returns:
+        np.ndarray: Posições, em `data`, dos vizinhos de cada consulta.
+    """
+    data = _prepare(data, space)
+    queries = _prepare(queries, space)
+    squared_norms = (data**2).sum(axis=1)
+    neighbors = []
+    for start in range(0, len(queries), EXACT_BLOCK_SIZE):
+        block = queries[start : start + EXACT_BLOCK_SIZE]
+        if space == "l2":
+            distances = squared_norms - 2 * block @ data.T
+        else:
+            distances = -(block @ data.T)
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(distances, top, axis=1).argsort(axis=1)
+        neighbors.append(np.take_along_axis(top, order, axis=1))
+    return np.vstack(neighbors)
+
+
+def recall_at_k(found: list[list[str]], truth: list[list[str]]) -> float:
+    """Fração média dos vizinhos exatos encontrados pelo índice."""
+    hits = [
+        len(set(approximate) & set(exact)) / len(exact)
+        for approximate, exact in zip(found, truth)
+    ]
+    return float(np.mean(hits))
+
+
+def _directory_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def evaluate(  # noqa: PLR0913
+    ids: list[str],
+    data: np.ndarray,
+    queries: np.ndarray,
+    truth: list[list[str]],
+    *,
+    metadata: dict,
+    k: int = 10,
+) -> dict:
+    """Constrói um índice com os parâmetros informados e o avalia.
+
+    Args:
+        ids (list[str]): Identificadores dos documentos.
+        data (np.ndarray): Embeddings dos documentos.
+        queries (np.ndarray): Embeddings das consultas.
+        truth (list[list[str]]): Vizinhos exatos de cada consulta.
+        metadata (dict): Parâmetros do índice HNSW.
+        k (int, optional): Número de vizinhos. Defaults to 10.
+
+    Returns:
+        dict: Recall, latências, tempo de construção e tamanho do índice.
+    """
+    with tempfile.TemporaryDirectory(prefix="hnsw-") as directory:
+        client = chromadb.PersistentClient(path=directory)
+        collection = client.create_collection(
+            "tuning", metadata=metadata, embedding_function=None
+        )
+        batch_size = client.get_max_batch_size()
+        tic = time.perf_counter()
+        for start in range(0, len(ids), batch_size):
+            collection.add(
+                ids=ids[start : start + batch_size],
+                embeddings=data[start : start + batch_size].tolist(),
+            )
+        build_time = time.perf_counter() - tic
+
+        latencies = []
+        found = []
+        for query in queries:
+            tic = time.perf_counter()
+            result = collection.query(
+                query_embeddings=[query.tolist()],
+                n_results=k,
+                include=["distances"],
+            )
+            latencies.append(time.perf_counter() - tic)
+            found.append(result["ids"][0])
+        index_size = _directory_size(Path(directory))
+        # Libera o índice em memória antes de remover o diretório.
+        client.clear_system_cache()
+
+    latencies = np.asarray(latencies) * 1000
+    return {
+        **{
+            key.removeprefix("hnsw:"): value for key, value in metadata.items()
+        },
+        f"recall@{k}": recall_at_k(found, truth),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "build_s": build_time,
+        "index_mb": index_size / 2**20,
+    }
+
+
+def _parse_ints(values: str) -> list[int]:
+    return [int(value) for value in values.split(",")]
+
+
+def main(  # noqa: PLR0913
+    *,
+    sample_size: int = 20000,
+    n_queries: int = 200,
+    k: int = 10,
+    m: str = "16,32",
+    construction_ef: str = "100,200",
+    search_ef: str = "10,50,100",
+    space: str = settings.HNSW_SPACE,
+    queries_path: str | None = None,
+    output_path: str | None = None,
+) -> None:
+    """Avalia as combinações de parâmetros do índice HNSW.
+
+    Args:
+        sample_size (int, optional): Documentos da amostra. Defaults to
+        20000.
+        n_queries (int, optional): Número de consultas. Defaults to 200.
+        k (int, optional): Número de vizinhos avaliados. Defaults to 10.
+        m (str, optional): Valores de `hnsw:M`, separados por vírgula.
+        Defaults to "16,32".
+        construction_ef (str, optional): Valores de `hnsw:construction_ef`.
+        Defaults to "100,200".
+        search_ef (str, optional): Valores de `hnsw:search_ef`. Defaults to
+        "10,50,100".
+        space (str, optional): Métrica de distância. Defaults to
+        `HNSW_SPACE`.
+        queries_path (str | None, optional): Arquivo JSONL com perguntas.
+        Defaults to None.
+        output_path (str | None, optional): Arquivo CSV com os resultados.
+        Defaults to None.
+    """
+    from src.reduction import ReducedEmbeddingFunction  # noqa: PLC0415
+    from src.retrieval import (  # noqa: PLC0415
+        connect_collection,
+        get_embedding_function,
+    )
+
+    collection = connect_collection()
+    ids, data = load_sample(collection, sample_size)
+    if queries_path:
+        embedding_function = get_embedding_function()
+        if collection.reducer is not None:
+            # A amostra vem da coleção, já projetada pela versão ativa.
+            embedding_function = ReducedEmbeddingFunction(
+                embedding_function, collection.reducer
+            )
+        queries = load_queries(queries_path, embedding_function, n_queries)
+    else:
+        rng = np.random.default_rng(0)
+        held_out = rng.choice(len(ids), size=n_queries, replace=False)
+        mask = np.ones(len(ids), dtype=bool)
+        mask[held_out] = False
+        queries = data[held_out]
+        ids = [i for i, keep in zip(ids, mask) if keep]
+        data = data[mask]
+    logger.info(
+        f"Tuning HNSW with {len(ids)} documents, {len(queries)} queries"
+    )
+
+    truth = [
+        [ids[position] for position in row]
+        for row in exact_neighbors(data, queries, k, space)
+    ]
+
+    results = []
+    for m_value, ef_construction, ef_search in itertools.product(
+        _parse_ints(m), _parse_ints(construction_ef), _parse_ints(search_ef)
+    ):
+        metadata = hnsw_metadata(
+            {
+                "hnsw:space": space,
+                "hnsw:M": m_value,
+                "hnsw:construction_ef": ef_construction,
+                "hnsw:search_ef": ef_search,
+            }
+        )
+        result = evaluate(ids, data, queries, truth, metadata=metadata, k=k)
+        logger.info(f"HNSW {metadata}: {result}")
+        results.append(result)
+
+    df = pd.DataFrame(results).sort_values(f"recall@{k}", ascending=False)
+    print(df.to_string(index=False))
+    if output_path:
+        df.to_csv(output_path, index=False)
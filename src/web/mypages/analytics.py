@@ -0,0 +1,162 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import streamlit as st
+
+from src.analytics import (
+    FILTER_COLUMNS,
+    count_by,
+    count_by_year,
+    filter_catalog,
+    load_catalog,
+    search_titles,
+    top_institutions,
+)
+from src.config import settings
+
+LABELS = {
+    "AN_BASE": "Ano",
+    "SG_UF_IES": "Estado",
+    "NM_REGIAO": "Região",
+    "NM_GRAU_ACADEMICO": "Grau Acadêmico",
+    "NM_GRANDE_AREA_CONHECIMENTO": "Grande Área de Conhecimento",
+    "NM_AREA_CONHECIMENTO": "Área de Conhecimento",
+    "SG_ENTIDADE_ENSINO": "Sigla da Instituição",
+    "NM_ENTIDADE_ENSINO": "Instituição",
+    "NM_PRODUCAO": "Título",
+    "trabalhos": "Trabalhos",
+}
+
+
+@st.cache_resource
+def load_table() -> pa.Table:
+    """Carrega, uma única vez por processo, as colunas do catálogo usadas
+    nas consultas.
+
+    Returns:
+        pa.Table: Catálogo de teses e dissertações.
+    """
+    return load_catalog(settings.CATALOG_PATH)
+
+
+@st.cache_data
+def filter_options() -> dict[str, list]:
+    """Valores disponíveis em cada filtro e o intervalo de anos."""
+    table = load_table()
+    options = {
+        column: sorted(table[column].drop_null().unique().to_pylist())
+        for column in FILTER_COLUMNS
+    }
+    years = pc.min_max(table["AN_BASE"])
+    options["AN_BASE"] = [years["min"].as_py(), years["max"].as_py()]
+    return options
+
+
+@st.cache_data(ttl=3600)
+def summarize(
+    years: tuple[int, int], filters: tuple[tuple[str, tuple], ...]
+) -> dict[str, pd.DataFrame | int]:
+    """Calcula as contagens do catálogo para os filtros selecionados.
+
+    Args:
+        years (tuple[int, int]): Intervalo de anos.
+        filters (tuple[tuple[str, tuple], ...]): Valores selecionados em
+        cada coluna.
+
+    Returns:
+        dict[str, pd.DataFrame | int]: Total e contagens por ano, grande
+        área, UF e instituição.
+    """
+    table = filter_catalog(
+        load_table(),
+        years=years,
+        **{column: list(values) for column, values in filters},
+    )
+    return {
+        "total": table.num_rows,
+        "year": count_by_year(table),
+        "area": count_by(table, "NM_GRANDE_AREA_CONHECIMENTO"),
+        "uf": count_by(table, "SG_UF_IES"),
+        "institutions": top_institutions(table, n=20),
+    }
+
+
+@st.cache_data(ttl=3600)
+def find_titles(
+    keywords: str,
+    years: tuple[int, int],
+    filters: tuple[tuple[str, tuple], ...],
+) -> pd.DataFrame:
+    """Busca os títulos com as palavras informadas dentro dos filtros."""
+    table = filter_catalog(
+        load_table(),
+        years=years,
+        **{column: list(values) for column, values in filters},
+    )
+    return search_titles(table, keywords)
+
+
+def show_counts(df: pd.DataFrame, column: str) -> None:
+    st.bar_chart(df.set_index(column)["trabalhos"], x_label=LABELS[column])
+
+
+def main():
+    st.markdown(
+        """
+        <main class="home_container">
+        <h1>Estatísticas do Catálogo</h1>
+        Contagens e filtros exatos sobre o catálogo de teses e dissertações,
+        calculados diretamente sobre os dados abertos da CAPES.
+        </main>
+        """,
+        unsafe_allow_html=True,
+    )
+
+    options = filter_options()
+    first_year, last_year = options["AN_BASE"]
+    years = st.slider(
+        LABELS["AN_BASE"],
+        min_value=first_year,
+        max_value=last_year,
+        value=(first_year, last_year),
+    )
+    columns = st.columns(len(FILTER_COLUMNS))
+    filters = tuple(
+        (column, tuple(container.multiselect(LABELS[column], options[column])))
+        for container, column in zip(columns, FILTER_COLUMNS)
+    )
+
+    summary = summarize(years, filters)
+    st.metric("Trabalhos", f"{summary['total']:,}".replace(",", "."))
+
+    by_year, by_area, by_uf, institutions, titles = st.tabs(
+        [
+            "Por ano",
+            "Por grande área",
+            "Por estado",
+            "Instituições",
+            "Busca por título",
+        ]
+    )
+    with by_year:
+        show_counts(summary["year"], "AN_BASE")
+    with by_area:
+        show_counts(summary["area"], "NM_GRANDE_AREA_CONHECIMENTO")
+    with by_uf:
+        show_counts(summary["uf"], "SG_UF_IES")
+    with institutions:
+        st.dataframe(
+            summary["institutions"].rename(columns=LABELS),
+            hide_index=True,
+            use_container_width=True,
+        )
+    with titles:
+        keywords = st.text_input("Palavras do título:")
+        if keywords.strip():
+            df = find_titles(keywords, years, filters)
+            st.caption(f"{len(df)} trabalhos encontrados (máximo de 100)")
+            st.dataframe(
+                df.rename(columns=LABELS),
+                hide_index=True,
+                use_container_width=True,
+            )
@@ -22,6 +22,7 @@ def page():
                 <ul>
                     <li> Página Inicial: Apresentação do projeto e dos dados utilizados. </li>
                     <li> Consulta: Página para realizar consultas sobre as teses e dissertações. </li>
+                    <li> Estatísticas: Contagens por ano, área, estado e instituição e busca por palavras do título. </li>
                 </ul>
         </main>
     """,  # noqa
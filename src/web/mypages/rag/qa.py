@@ -1,111 +1,260 @@
-import datetime as dt
-import json
-from functools import wraps
-
 import pandas as pd
+import requests
 import streamlit as st
-from chromadb.api.models.Collection import Collection
-from openai import OpenAI
 
-from src.config import logger, settings
-from src.extract_embeddings import (
-    create_chroma_client,
-    create_thesis_collection,
+from src.cache import QueryEmbeddingCache, ResultCache
+from src.config import settings
+from src.facets import FacetIndex
+from src.metrics import stage
+from src.profiling import profile, profiling_enabled
+from src.rerank import Reranker, candidate_count, get_reranker
+from src.retrieval import (
+    attach_abstracts,
+    build_answer_text,
+    connect_collection,
+    get_agent_response,
+    get_embedding_function,
+    load_prompts,
+    search_documents,
+    select_context,
 )
 
 
-def log_step(func):
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        tic = dt.datetime.now()
-        result = func(*args, **kwargs)
-        time_taken = str(dt.datetime.now() - tic)
-        logger.info(f"just ran step {func.__name__} took {time_taken}s")
-        return result
+@st.cache_resource
+def load_prompts_with_cache() -> tuple[str, str]:
+    return load_prompts()
 
-    return wrapper
 
+@st.cache_resource
+def load_collection():
+    """Carrega a coleção de teses e dissertações.
 
-def load_prompts():
-    with open("src/assets/prompt-text-to-chroma.txt", encoding="utf-8") as f:
-        prompt_chroma = f.read()
+    Returns:
+        Collection: Coleção de teses e dissertações no Chroma.
+    """
+    return connect_collection()
 
-    with open("src/assets/prompt-rag.txt", encoding="utf-8") as f:
-        prompt_rag = f.read()
 
-    return prompt_chroma, prompt_rag
+@st.cache_resource
+def load_query_encoder() -> QueryEmbeddingCache:
+    """Cria o cache de embeddings das consultas compartilhado pelas sessões.
+
+    Returns:
+        QueryEmbeddingCache: Cache dos embeddings das consultas.
+    """
+    return QueryEmbeddingCache(
+        get_embedding_function(), maxsize=settings.QUERY_EMBEDDING_CACHE_SIZE
+    )
 
 
 @st.cache_resource
-def load_prompts_with_cache() -> tuple[str, str]:
-    return load_prompts()
+def load_result_cache() -> ResultCache:
+    """Cria o cache de resultados de busca compartilhado pelas sessões.
+
+    Returns:
+        ResultCache: Cache dos resultados de busca.
+    """
+    return ResultCache(
+        maxsize=settings.RESULT_CACHE_SIZE,
+        shared_dir=settings.RESULT_CACHE_SHARED_DIR,
+        version_ttl=settings.RESULT_CACHE_VERSION_TTL,
+    )
 
 
 @st.cache_resource
-def load_collection():
-    """Carrega a coleção de teses e dissertações.
+def load_reranker() -> Reranker | None:
+    """Carrega o modelo de reordenação compartilhado pelas sessões.
 
     Returns:
-        Collection: Coleção de teses e dissertações no Chroma.
+        Reranker | None: Modelo de reordenação ou None, se desativado.
+    """
+    return get_reranker()
+
+
+def load_facet_index() -> FacetIndex | None:
+    """Retorna o índice de facetas da versão ativa da coleção.
+
+    Com `SEARCH_API_URL`, a coleção não é aberta neste processo, e as
+    contagens por faceta vêm da resposta do serviço de busca.
+
+    Returns:
+        FacetIndex | None: Índice de facetas ou None, caso não exista ou
+        as buscas sejam feitas pelo serviço.
+    """
+    if settings.SEARCH_API_URL:
+        return None
+    return load_collection().facet_index
+
+
+FACET_LABELS = {
+    "AN_BASE": "Ano",
+    "SG_UF_IES": "Estado",
+    "NM_REGIAO": "Região",
+    "NM_GRAU_ACADEMICO": "Grau Acadêmico",
+    "NM_GRANDE_AREA_CONHECIMENTO": "Grande Área de Conhecimento",
+}
+
+
+def show_facet_counts(counts: dict[str, dict]) -> None:
+    """Exibe a contagem de trabalhos por faceta para os filtros da consulta.
+
+    Args:
+        counts (dict[str, dict]): Contagem por faceta e valor, como em
+        `FacetIndex.counts`.
+    """
+    with st.expander("📊 Trabalhos por faceta"):
+        columns = st.columns(len(counts) or 1)
+        for column, (facet, values) in zip(columns, counts.items()):
+            label = FACET_LABELS.get(facet, facet)
+            column.dataframe(
+                pd.DataFrame(
+                    {label: list(values), "Trabalhos": list(values.values())}
+                ),
+                hide_index=True,
+            )
+
+
+def answer_with_api(search: str) -> tuple[dict, list[dict], dict]:
+    """Obtém a resposta do serviço de busca configurado em `SEARCH_API_URL`.
+
+    Args:
+        search (str): Pergunta do usuário.
+
+    Returns:
+        tuple[dict, list[dict], dict]: Consulta gerada, documentos
+        recuperados e resposta do LLM.
     """
-    client = create_chroma_client.fn(
-        host=settings.CHROMA_CLIENT_HOSTNAME,
-        port=settings.CHROMA_CLIENT_PORT,
-        auth_provider=settings.CHROMA_CLIENT_AUTH_PROVIDER,
-        auth_credentials=(
-            settings.CHROMA_CLIENT_AUTH_CREDENTIALS.get_secret_value()
-        ),
+    response = requests.post(
+        f"{settings.SEARCH_API_URL.rstrip('/')}/answer",
+        json={"question": search},
+        timeout=settings.SEARCH_API_TIMEOUT,
     )
-    collection = create_thesis_collection.fn(client)
-    logger.info("Collection loaded")
-    return collection
+    response.raise_for_status()
+    data = response.json()
+    chroma_query = {"query": data.get("query"), "where": data.get("where")}
+    return chroma_query, data.get("documents", []), data
 
 
-@log_step
-def search_documents(
-    collection: Collection,
-    query: str,
-    where: dict = None,
-    n_results=20,
-) -> list[dict]:
-    """Realiza uma busca na coleção de documentos.
+def fetch_abstracts_with_api(ids: list[str]) -> dict[str, str]:
+    """Busca os resumos pelos ids no serviço de busca (`/documents`).
 
     Args:
-        collection (Collection): Objeto da coleção de documentos.
-        query (str): Texto da consulta.
-        where (dict, optional): Filtros da consulta. Defaults to None.
-        n_results (int, optional): Número de resultados. Defaults to 20.
+        ids (list[str]): Ids dos documentos.
+
+    Returns:
+        dict[str, str]: Resumo de cada id encontrado.
     """
-    try:
-        logger.info(
-            f"Searching documents with query: {query} and where: {where}"
+    response = requests.post(
+        f"{settings.SEARCH_API_URL.rstrip('/')}/documents",
+        json={"ids": ids},
+        timeout=settings.SEARCH_API_TIMEOUT,
+    )
+    response.raise_for_status()
+    return response.json().get("abstracts", {})
+
+
+def answer_locally(
+    search: str, facet_index: FacetIndex | None
+) -> tuple[dict, list[dict], dict]:
+    """Executa a consulta e a resposta no próprio processo do Streamlit.
+
+    Args:
+        search (str): Pergunta do usuário.
+        facet_index (FacetIndex | None): Índice de facetas.
+
+    Returns:
+        tuple[dict, list[dict], dict]: Consulta gerada, documentos
+        recuperados e resposta do LLM.
+    """
+    from openai import OpenAI  # noqa: PLC0415
+
+    client = OpenAI(max_retries=0)
+    collection = load_collection()
+    query_encoder = load_query_encoder()
+    reranker = load_reranker()
+    prompt_chroma, prompt_rag = load_prompts_with_cache()
+
+    with st.spinner("Montando consulta..."), stage("query_translation"):
+        chroma_query = get_agent_response(search, prompt_chroma, client)
+    with st.spinner("Recuperando dados..."):
+        n_results = candidate_count(
+            chroma_query.get("n_results", 20), reranker
         )
-        results = collection.query(
-            query_texts=[query],
-            where=where,
-            n_results=n_results,
+        results = search_documents(
+            collection,
+            **{**chroma_query, "n_results": n_results},
+            facet_index=facet_index,
+            query_encoder=query_encoder,
+            result_cache=load_result_cache(),
         )
-        return [item for items in results["metadatas"] for item in items]
-    except Exception as e:
-        logger.error(f"Error searching documents: {e}")
-        return []
-
-
-@log_step
-def get_agent_response(text: str, prompt: str, client: OpenAI) -> dict:
-    logger.info(f"Sending text to OpenAI: {text}")
-    logger.info(f"Prompt: {prompt}")
-    completion = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": prompt},
-            {"role": "user", "content": text},
-        ],
-        response_format={"type": "json_object"},
-    )
-    answer = completion.choices[0].message.content
-    logger.info(f"Received response from OpenAI: {answer}")
-    return json.loads(answer.strip("```json").strip("```"))
+        results = select_context(collection, search, results, reranker)
+        final_query = build_answer_text(search, results)
+        with stage("answer_generation"):
+            response = get_agent_response(final_query, prompt_rag, client)
+    return chroma_query, results, response
+
+
+RESULT_COLUMNS = {
+    "AN_BASE": "Ano",
+    "NM_PRODUCAO": "Título",
+    "NM_AREA_CONHECIMENTO": "Área de Conhecimento",
+    "NM_GRANDE_AREA_CONHECIMENTO": "Grande Área de Conhecimento",
+    "NM_GRAU_ACADEMICO": "Grau Acadêmico",
+    "SG_ENTIDADE_ENSINO": "Sigla da Instituição",
+    "SG_UF_IES": "Sigla do Estado da Instituição",
+}
+
+
+def show_results(results: list[dict], ids: list) -> None:
+    """Exibe os documentos citados na resposta.
+
+    A tabela, só com os campos curtos, é exibida primeiro; os resumos vêm
+    em seguida, um por documento, e os que ainda não foram carregados são
+    buscados na coleção ou, com `SEARCH_API_URL`, no serviço de busca.
+
+    Args:
+        results (list[dict]): Documentos recuperados.
+        ids (list): Ids dos documentos citados pelo LLM.
+    """
+    ids = {str(i) for i in ids}
+    cited = [doc for doc in results if str(doc.get("id")) in ids]
+    if not cited:
+        return
+    df = pd.DataFrame(cited).reindex(columns=list(RESULT_COLUMNS))
+    st.dataframe(df.rename(columns=RESULT_COLUMNS), hide_index=True)
+
+    missing = [str(doc["id"]) for doc in cited if not doc.get("DS_RESUMO")]
+    if missing and settings.SEARCH_API_URL:
+        with st.spinner("Carregando resumos..."):
+            abstracts = fetch_abstracts_with_api(missing)
+        cited = [
+            {**doc, "DS_RESUMO": abstracts.get(str(doc["id"]))}
+            if str(doc["id"]) in abstracts
+            else doc
+            for doc in cited
+        ]
+    elif missing:
+        with st.spinner("Carregando resumos..."):
+            cited = attach_abstracts(load_collection(), cited)
+    for doc in cited:
+        with st.expander(f"{doc.get('AN_BASE')} · {doc.get('NM_PRODUCAO')}"):
+            st.write(doc.get("DS_RESUMO") or "Resumo indisponível.")
+
+
+def show_profile(report: dict) -> None:
+    """Exibe o resumo do perfil da busca.
+
+    Args:
+        report (dict): Resultado de `profile`.
+    """
+    with st.expander("⏱️ Perfil da busca"):
+        st.caption(
+            f"{report['wall_seconds']:.2f}s, "
+            f"{report['cpu_seconds']:.2f}s de CPU, pico de "
+            f"{report['peak_memory_bytes'] / 2**20:.1f} MB de memória. "
+            f"Relatórios em `{report['directory']}`."
+        )
+        st.code(report["report"], language="text")
 
 
 def main():
@@ -121,55 +270,36 @@ def main():
         unsafe_allow_html=True,
     )
 
-    client = OpenAI()
-    collection = load_collection()
-
-    prompt_chroma, prompt_rag = load_prompts_with_cache()
+    facet_index = load_facet_index()
     search = st.text_input("Faça uma consulta:")
 
     if st.button("🔍 Buscar", type="tertiary") and search.strip():
-        with st.spinner("Montando consulta..."):
-            chroma_query = get_agent_response(search, prompt_chroma, client)
-        with st.spinner("Recuperando dados..."):
-            results = search_documents(collection, **chroma_query)
-            final_query = f"""
-            - Query: {search}
-            - Documents:
-            {results}
-            """
-            response = get_agent_response(final_query, prompt_rag, client)
+        profiling = st.query_params.get(
+            "debug"
+        ) == "profile" or profiling_enabled("search")
+        with profile("search", enabled=profiling) as report:
+            if settings.SEARCH_API_URL:
+                with st.spinner("Consultando o serviço de busca..."):
+                    chroma_query, results, response = answer_with_api(search)
+            else:
+                chroma_query, results, response = answer_locally(
+                    search, facet_index
+                )
+        if report:
+            show_profile(report)
 
         answer = response.get(
             "answer", "Não foi possível encontrar uma resposta."
         )
         ids = response.get("ids", [])
         st.write(answer)
+        if settings.SEARCH_API_URL:
+            facet_counts = response.get("facet_counts")
+        elif facet_index is not None:
+            facet_counts = facet_index.counts(chroma_query.get("where"))
+        else:
+            facet_counts = None
+        if facet_counts:
+            show_facet_counts(facet_counts)
         if ids:
-            df = pd.DataFrame(results)
-            df = df[df["id"].isin(ids)][
-                [
-                    "AN_BASE",
-                    "NM_PRODUCAO",
-                    "DS_RESUMO",
-                    "NM_AREA_CONHECIMENTO",
-                    "NM_GRANDE_AREA_CONHECIMENTO",
-                    "NM_GRAU_ACADEMICO",
-                    "SG_ENTIDADE_ENSINO",
-                    "SG_UF_IES",
-                ]
-            ]
-
-            df = df.rename(
-                columns={
-                    "AN_BASE": "Ano",
-                    "NM_PRODUCAO": "Título",
-                    "DS_RESUMO": "Resumo",
-                    "NM_AREA_CONHECIMENTO": "Área de Conhecimento",
-                    "NM_GRANDE_AREA_CONHECIMENTO": "Grande Área de Conhecimento",  # noqa
-                    "NM_GRAU_ACADEMICO": "Grau Acadêmico",
-                    "SG_ENTIDADE_ENSINO": "Sigla da Instituição",
-                    "SG_UF_IES": "Sigla do Estado da Instituição",
-                }
-            )
-
-            st.write(df)
+            show_results(results, ids)
@@ -0,0 +1,106 @@
+"""Fixtures dos benchmarks.
+
+As escalas são definidas em `BENCHMARK_SCALES` (por exemplo,
+`10000,100000,1000000`) e os dados gerados são reaproveitados entre as
+execuções a partir de `BENCHMARK_DATA_DIR`.
+"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+# Os benchmarks usam apenas um ChromaDB local; as configurações do servidor
+# só precisam existir para que `src.config` possa ser importado.
+for name, value in {
+    "CHROMA_CLIENT_AUTH_CREDENTIALS": "",
+    "CHROMA_CLIENT_HOSTNAME": "localhost",
+    "CHROMA_CLIENT_PORT": "8000",
+    "CHROMA_CLIENT_AUTH_PROVIDER": "",
+}.items():
+    os.environ.setdefault(name, value)
+
+import chromadb  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from src.facets import FacetIndex  # noqa: E402
+from tests.benchmarks.synthetic import (  # noqa: E402
+    HashingEmbeddingFunction,
+    generate_catalog,
+    write_catalog_files,
+)
+
+SCALES = [
+    int(scale)
+    for scale in os.environ.get("BENCHMARK_SCALES", "10000").split(",")
+]
+DATA_DIR = Path(os.environ.get("BENCHMARK_DATA_DIR", ".benchmarks/data"))
+
+
+def pytest_generate_tests(metafunc):
+    if "scale" in metafunc.fixturenames:
+        metafunc.parametrize("scale", SCALES, scope="session")
+
+
+@pytest.fixture(scope="session")
+def catalog(scale) -> pd.DataFrame:
+    path = DATA_DIR / f"catalog_{scale}.parquet"
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        generate_catalog(scale).to_parquet(path, index=False)
+    return pd.read_parquet(path)
+
+
+@pytest.fixture(scope="session")
+def xlsx_dir(catalog, scale) -> Path:
+    directory = DATA_DIR / f"xlsx_{scale}"
+    if not any(directory.glob("*.xlsx")):
+        write_catalog_files(catalog, directory)
+    return directory
+
+
+@pytest.fixture(scope="session")
+def parquet_path(catalog, scale) -> str:
+    path = DATA_DIR / f"catalogo_de_teses_e_dissertacoes_{scale}.parquet"
+    if not path.exists():
+        catalog.to_parquet(path, index=False)
+    return path.as_posix()
+
+
+@pytest.fixture(scope="session")
+def embedding_function() -> HashingEmbeddingFunction:
+    return HashingEmbeddingFunction()
+
+
+@pytest.fixture(scope="session")
+def indexed_collection(catalog, scale, embedding_function, tmp_path_factory):
+    """Coleção local com todo o catálogo indexado."""
+    from src.extract_embeddings import (  # noqa: PLC0415
+        add_documents_to_collection,
+        preprocess_thesis_data,
+    )
+    from src.storage import read_arrow  # noqa: PLC0415
+
+    path = tmp_path_factory.mktemp(f"source_{scale}") / "catalog.parquet"
+    catalog.to_parquet(path, index=False)
+    df = read_arrow(
+        preprocess_thesis_data.fn(
+            path.as_posix(),
+            handoff_dir=tmp_path_factory.mktemp(f"handoff_{scale}").as_posix(),
+        )
+    )
+
+    client = chromadb.PersistentClient(
+        path=tmp_path_factory.mktemp(f"chroma_{scale}").as_posix()
+    )
+    collection = client.create_collection(
+        name="thesis_capes", embedding_function=embedding_function
+    )
+    add_documents_to_collection.fn(
+        client,
+        collection,
+        ids=df["id"].tolist(),
+        documents=df["DS_RESUMO"].tolist(),
+        metadatas=df.drop(columns="DS_RESUMO").to_dict(orient="records"),
+    )
+    return collection, FacetIndex.from_dataframe(df)
@@ -0,0 +1,163 @@
+"""Geradores de dados sintéticos no formato do Catálogo de Teses e
+Dissertações da CAPES e função de embeddings leve para os benchmarks.
+
+Os dados são gerados a partir de uma semente fixa, de modo que execuções
+com a mesma escala produzem exatamente o mesmo catálogo.
+"""
+
+import hashlib
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from chromadb import Documents, EmbeddingFunction, Embeddings
+
+UFS = {
+    "SP": ("SÃO PAULO", "SUDESTE"),
+    "RJ": ("RIO DE JANEIRO", "SUDESTE"),
+    "MG": ("MINAS GERAIS", "SUDESTE"),
+    "RS": ("RIO GRANDE DO SUL", "SUL"),
+    "PR": ("PARANÁ", "SUL"),
+    "BA": ("BAHIA", "NORDESTE"),
+    "PE": ("PERNAMBUCO", "NORDESTE"),
+    "CE": ("CEARÁ", "NORDESTE"),
+    "PA": ("PARÁ", "NORTE"),
+    "AM": ("AMAZONAS", "NORTE"),
+    "GO": ("GOIÁS", "CENTRO-OESTE"),
+    "DF": ("DISTRITO FEDERAL", "CENTRO-OESTE"),
+}
+AREAS = {
+    "CIÊNCIAS EXATAS E DA TERRA": ["CIÊNCIA DA COMPUTAÇÃO", "MATEMÁTICA"],
+    "CIÊNCIAS DA SAÚDE": ["MEDICINA", "ENFERMAGEM", "SAÚDE COLETIVA"],
+    "CIÊNCIAS HUMANAS": ["EDUCAÇÃO", "HISTÓRIA", "PSICOLOGIA"],
+    "ENGENHARIAS": ["ENGENHARIA CIVIL", "ENGENHARIA ELÉTRICA"],
+    "CIÊNCIAS AGRÁRIAS": ["AGRONOMIA", "ZOOTECNIA"],
+    "LINGÜÍSTICA, LETRAS E ARTES": ["LETRAS", "LINGÜÍSTICA"],
+}
+GRAUS = ["MESTRADO", "DOUTORADO", "MESTRADO PROFISSIONAL"]
+VOCABULARY = (
+    "análise estudo modelo sistema dados aprendizado rede ensino escola "
+    "saúde paciente tratamento solo cultivo produção energia estrutura "
+    "concreto algoritmo otimização linguagem discurso história memória "
+    "política pública social avaliação desenvolvimento método resultado "
+    "proposta pesquisa brasil região amazônia nordeste cidade água clima "
+    "qualidade gestão formação professor aluno leitura literatura corpo "
+    "cuidado família trabalho mercado empresa inovação tecnologia digital"
+).split()
+DT_FORMAT = "%d/%m/%Y %H:%M:%S"
+DATE_COLUMNS = [
+    "DH_INICIO_AREA_CONC",
+    "DH_FIM_AREA_CONC",
+    "DH_INICIO_LINHA",
+    "DH_FIM_LINHA",
+    "DT_TITULACAO",
+    "DT_MATRICULA",
+]
+QUERIES = [
+    "aprendizado de máquina aplicado à saúde",
+    "formação de professores na educação básica",
+    "qualidade da água na região amazônica",
+    "otimização de estruturas de concreto",
+    "políticas públicas de inovação tecnológica",
+    "literatura e memória no nordeste",
+]
+
+
+def generate_catalog(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Gera um catálogo sintético com as colunas do catálogo da CAPES.
+
+    Args:
+        n_rows (int): Número de registros.
+        seed (int, optional): Semente do gerador. Defaults to 42.
+
+    Returns:
+        pd.DataFrame: Catálogo com datas no formato dos arquivos originais.
+    """
+    rng = np.random.default_rng(seed)
+    ufs = rng.choice(list(UFS), n_rows)
+    grandes_areas = rng.choice(list(AREAS), n_rows)
+    areas = [rng.choice(AREAS[grande_area]) for grande_area in grandes_areas]
+    words = np.array(VOCABULARY)
+    lengths = rng.integers(80, 200, n_rows)
+    abstracts = [
+        " ".join(words[rng.integers(0, len(words), length)])
+        for length in lengths
+    ]
+    titles = [abstract[:80] for abstract in abstracts]
+    base = pd.Timestamp("2013-01-01")
+    df = pd.DataFrame(
+        {
+            "AN_BASE": rng.integers(2013, 2023, n_rows),
+            "SG_ENTIDADE_ENSINO": [
+                f"U{uf}{i % 7}" for i, uf in enumerate(ufs)
+            ],
+            "NM_ENTIDADE_ENSINO": [
+                f"UNIVERSIDADE {i % 7} DE {UFS[uf][0]}"
+                for i, uf in enumerate(ufs)
+            ],
+            "NM_PRODUCAO": titles,
+            "NM_SUBTIPO_PRODUCAO": rng.choice(["DISSERTAÇÃO", "TESE"], n_rows),
+            "NM_GRAU_ACADEMICO": rng.choice(GRAUS, n_rows),
+            "NM_REGIAO": [UFS[uf][1] for uf in ufs],
+            "SG_UF_IES": ufs,
+            "NM_UF_IES": [UFS[uf][0] for uf in ufs],
+            "NM_GRANDE_AREA_CONHECIMENTO": grandes_areas,
+            "NM_AREA_CONHECIMENTO": areas,
+            "DS_RESUMO": abstracts,
+        }
+    )
+    for column in DATE_COLUMNS:
+        offsets = pd.to_timedelta(rng.integers(0, 3650, n_rows), unit="D")
+        df[column] = (base + offsets).strftime(DT_FORMAT)
+    return df
+
+
+def write_catalog_files(
+    df: pd.DataFrame, directory: str | Path, extension: str = ".xlsx"
+) -> list[str]:
+    """Grava o catálogo em um arquivo por ano, como no portal da CAPES.
+
+    Args:
+        df (pd.DataFrame): Catálogo gerado por `generate_catalog`.
+        directory (str | Path): Diretório de destino.
+        extension (str, optional): `.xlsx` ou `.parquet`. Defaults to
+        ".xlsx".
+
+    Returns:
+        list[str]: Caminhos dos arquivos gravados.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for year, group in df.groupby("AN_BASE"):
+        path = directory / f"catalogo_{year}{extension}"
+        if extension == ".xlsx":
+            group.to_excel(path, index=False)
+        else:
+            group.to_parquet(path, index=False)
+        paths.append(path.as_posix())
+    return paths
+
+
+class HashingEmbeddingFunction(EmbeddingFunction):
+    """Função de embeddings determinística baseada em hashing de palavras.
+
+    Substitui o modelo INSTRUCTOR nos benchmarks: tem o mesmo formato de
+    saída, não depende de rede e tem custo proporcional ao tamanho do
+    texto.
+    """
+
+    def __init__(self, dim: int = 768) -> None:
+        self.dim = dim
+
+    def __call__(self, documents: Documents) -> Embeddings:
+        embeddings = np.zeros((len(documents), self.dim), dtype=np.float32)
+        for row, document in enumerate(documents):
+            for token in re.findall(r"\w+", document.lower()):
+                digest = hashlib.blake2b(token.encode(), digest_size=8)
+                value = int.from_bytes(digest.digest(), "little")
+                sign = 1.0 if value >> 63 else -1.0
+                embeddings[row, value % self.dim] += sign
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
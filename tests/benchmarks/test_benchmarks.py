@@ -0,0 +1,186 @@
+"""Benchmarks de ingestão, embeddings e recuperação.
+
+Exemplo:
+    BENCHMARK_SCALES=10000,100000 pytest tests/benchmarks \
+        --benchmark-json=.benchmarks/results.json
+"""
+
+import itertools
+import os
+import shutil
+
+import chromadb
+import pytest
+
+from src.cache import QueryEmbeddingCache
+from src.config import settings
+from src.download import load_and_process_data
+from src.extract_embeddings import (
+    add_documents_to_collection,
+    preprocess_thesis_data,
+)
+from src.rerank import FusionReranker
+from src.retrieval import search_documents, select_context
+from src.storage import read_arrow
+from tests.benchmarks.synthetic import QUERIES
+
+# Número de documentos usados nos benchmarks de embeddings e de inserção,
+# limitado para que cada rodada não dependa da escala do catálogo.
+SAMPLE_SIZE = int(os.environ.get("BENCHMARK_SAMPLE_SIZE", "5000"))
+
+FILTERS = {
+    "sem_filtro": None,
+    "ano": {"AN_BASE": 2018},
+    "ano_e_uf": {"$and": [{"AN_BASE": {"$gte": 2019}}, {"SG_UF_IES": "SP"}]},
+    "area_in": {
+        "NM_GRANDE_AREA_CONHECIMENTO": {
+            "$in": ["CIÊNCIAS DA SAÚDE", "ENGENHARIAS"]
+        }
+    },
+    "sem_candidatos": {"SG_UF_IES": "XX"},
+}
+
+
+def test_load_and_process_data(benchmark, xlsx_dir, tmp_path):
+    def setup():
+        output_dir = tmp_path / "load"
+        shutil.rmtree(output_dir, ignore_errors=True)
+        shutil.copytree(xlsx_dir, output_dir)
+        return (output_dir.as_posix(),), {}
+
+    benchmark.pedantic(
+        load_and_process_data.fn, setup=setup, rounds=1, iterations=1
+    )
+
+
+def test_preprocess_thesis_data(benchmark, parquet_path, scale, tmp_path):
+    def setup():
+        # Diretório vazio a cada rodada, para que o resultado não seja
+        # reaproveitado da rodada anterior.
+        handoff_dir = tmp_path / "handoff"
+        shutil.rmtree(handoff_dir, ignore_errors=True)
+        return (parquet_path, handoff_dir.as_posix()), {}
+
+    path = benchmark.pedantic(preprocess_thesis_data.fn, setup=setup, rounds=3)
+    df = read_arrow(path)
+    benchmark.extra_info["rows"] = len(df)
+    assert df["id"].is_unique
+
+
+def test_embedding_throughput(benchmark, catalog, embedding_function):
+    documents = catalog["DS_RESUMO"].head(SAMPLE_SIZE).tolist()
+
+    benchmark(embedding_function, documents)
+    benchmark.extra_info["documents"] = len(documents)
+
+
+@pytest.mark.skipif(
+    not os.environ.get("BENCHMARK_MODEL_PATH"),
+    reason="BENCHMARK_MODEL_PATH não definido",
+)
+def test_instructor_embedding_throughput(benchmark, catalog, monkeypatch):
+    from src.extract_embeddings import (  # noqa: PLC0415
+        ThesisEmbeddingFunction,
+        settings,
+    )
+
+    monkeypatch.setattr(
+        settings, "MODEL_NAME_OR_PATH", os.environ["BENCHMARK_MODEL_PATH"]
+    )
+    embedding_function = ThesisEmbeddingFunction()
+    documents = catalog["DS_RESUMO"].head(256).tolist()
+
+    benchmark.pedantic(embedding_function, args=(documents,), rounds=3)
+    benchmark.extra_info["documents"] = len(documents)
+
+
+def test_bulk_upsert(benchmark, catalog, embedding_function):
+    sample = catalog.head(SAMPLE_SIZE).reset_index(drop=True)
+    ids = [f"doc-{i}" for i in range(len(sample))]
+    documents = sample["DS_RESUMO"].tolist()
+    metadatas = sample.to_dict(orient="records")
+    client = chromadb.EphemeralClient()
+
+    def setup():
+        try:
+            client.delete_collection("benchmark_upsert")
+        except ValueError:
+            pass
+        collection = client.create_collection(
+            "benchmark_upsert", embedding_function=embedding_function
+        )
+        return (client, collection, ids, documents, metadatas), {}
+
+    benchmark.pedantic(
+        add_documents_to_collection.fn, setup=setup, rounds=3, iterations=1
+    )
+    benchmark.extra_info["documents"] = len(ids)
+
+
+@pytest.mark.parametrize("use_facets", [False, True], ids=["chroma", "facets"])
+@pytest.mark.parametrize("where", FILTERS.values(), ids=FILTERS.keys())
+def test_search_documents(
+    benchmark, indexed_collection, embedding_function, where, use_facets
+):
+    collection, facet_index = indexed_collection
+    query_encoder = QueryEmbeddingCache(embedding_function)
+    queries = itertools.cycle(QUERIES)
+
+    def search():
+        return search_documents(
+            collection,
+            query=next(queries),
+            where=where,
+            n_results=20,
+            facet_index=facet_index if use_facets else None,
+            query_encoder=query_encoder,
+        )
+
+    benchmark(search)
+
+
+def fusion_reranker(needs_abstracts: bool) -> FusionReranker:
+    reranker = FusionReranker()
+    reranker.needs_abstracts = needs_abstracts
+    return reranker
+
+
+@pytest.mark.parametrize(
+    "needs_abstracts", [False, True], ids=["titulos", "resumos"]
+)
+def test_select_context_fusion(
+    benchmark, indexed_collection, embedding_function, needs_abstracts
+):
+    """Latência da seleção do contexto no modo `fusion` e recall dos
+    `RERANK_TOP_K` documentos mantidos em relação à reordenação com os
+    resumos de todos os candidatos."""
+    collection, _ = indexed_collection
+    query_encoder = QueryEmbeddingCache(embedding_function)
+    candidates = {
+        query: search_documents(
+            collection,
+            query=query,
+            n_results=settings.RERANK_CANDIDATES,
+            query_encoder=query_encoder,
+        )
+        for query in QUERIES
+    }
+    reranker = fusion_reranker(needs_abstracts)
+    queries = itertools.cycle(QUERIES)
+
+    def select():
+        query = next(queries)
+        return select_context(collection, query, candidates[query], reranker)
+
+    benchmark(select)
+
+    reference = fusion_reranker(needs_abstracts=True)
+    recalls = []
+    for query, documents in candidates.items():
+        kept = select_context(collection, query, documents, reranker)
+        expected = select_context(collection, query, documents, reference)
+        recalls.append(
+            len({d["id"] for d in kept} & {d["id"] for d in expected})
+            / max(len(expected), 1)
+        )
+    benchmark.extra_info["recall_at_k"] = sum(recalls) / len(recalls)
@@ -0,0 +1,261 @@
+"""Teste de carga do fluxo de pergunta e resposta.
+
+Reproduz um arquivo de perguntas com a concorrência informada e reporta a
+vazão e os percentis de latência de cada etapa. No modo `local`, o fluxo
+da página de consulta é executado no próprio processo (com o ChromaDB e o
+LLM configurados no ambiente); no modo `api`, as perguntas são enviadas
+ao serviço de busca em `SEARCH_API_URL`.
+
+Exemplo, com o servidor simulado e um ChromaDB local:
+    uvicorn tests.load.mock_openai:app --port 8900 &
+    export OPENAI_BASE_URL=http://localhost:8900/v1 OPENAI_API_KEY=teste
+    export EMBEDDING_SERVER_URL=http://localhost:8900
+    export CHROMA_CLIENT_MODE=persistent
+    typer tests/load/seed.py run --rows 20000
+    typer tests/load/driver.py run tests/load/questions.jsonl \
+        --concurrency 16 --repeat 5
+"""
+
+import json
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import requests
+
+from src.batch import read_questions
+from src.config import logger, settings
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class StageTimer:
+    """Acumula as durações de cada etapa entre as threads do teste."""
+
+    def __init__(self) -> None:
+        self.durations = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.durations[stage].append(seconds)
+
+    def measure(self, stage: str, func, *args, **kwargs):
+        tic = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.record(stage, time.perf_counter() - tic)
+
+
+def summarize(durations: dict[str, list[float]]) -> dict[str, dict]:
+    """Calcula os percentis de latência, em milissegundos, por etapa."""
+    summary = {}
+    for stage, seconds in durations.items():
+        milliseconds = np.asarray(seconds) * 1000
+        summary[stage] = {
+            "count": int(milliseconds.size),
+            "mean_ms": float(milliseconds.mean()),
+            **{
+                f"p{p}_ms": float(np.percentile(milliseconds, p))
+                for p in PERCENTILES
+            },
+        }
+    return summary
+
+
+def local_pipeline(result_cache: bool = False):
+    """Monta o fluxo da página de consulta executado no próprio processo.
+
+    Args:
+        result_cache (bool, optional): Usa o cache de resultados. Defaults
+        to False, para que todas as buscas cheguem ao ChromaDB.
+
+    Returns:
+        Callable[[str, StageTimer], dict]: Função que responde uma pergunta.
+    """
+    from openai import OpenAI  # noqa: PLC0415
+
+    from src.cache import QueryEmbeddingCache, ResultCache  # noqa: PLC0415
+    from src.rerank import candidate_count, get_reranker  # noqa: PLC0415
+    from src.retrieval import (  # noqa: PLC0415
+        build_answer_text,
+        connect_collection,
+        get_agent_response,
+        get_embedding_function,
+        load_prompts,
+        search_documents,
+        select_context,
+    )
+
+    client = OpenAI()
+    collection = connect_collection()
+    query_encoder = QueryEmbeddingCache(
+        get_embedding_function(), maxsize=settings.QUERY_EMBEDDING_CACHE_SIZE
+    )
+    cache = (
+        ResultCache(maxsize=settings.RESULT_CACHE_SIZE)
+        if result_cache
+        else None
+    )
+    reranker = get_reranker()
+    prompt_chroma, prompt_rag = load_prompts()
+
+    def answer(question: str, timer: StageTimer) -> dict:
+        chroma_query = timer.measure(
+            "query_translation",
+            get_agent_response,
+            question,
+            prompt_chroma,
+            client,
+        )
+        n_results = candidate_count(
+            chroma_query.get("n_results", 20), reranker
+        )
+        documents = timer.measure(
+            "search",
+            search_documents,
+            collection,
+            **{**chroma_query, "n_results": n_results},
+            facet_index=collection.facet_index,
+            query_encoder=query_encoder,
+            result_cache=cache,
+        )
+        # Reordenação e carga dos resumos dos documentos do contexto.
+        documents = timer.measure(
+            "context_selection",
+            select_context,
+            collection,
+            question,
+            documents,
+            reranker,
+        )
+        text = timer.measure(
+            "context_building", build_answer_text, question, documents
+        )
+        return timer.measure(
+            "answer_generation", get_agent_response, text, prompt_rag, client
+        )
+
+    return answer
+
+
+def api_pipeline():
+    """Monta o fluxo que envia as perguntas ao serviço de busca."""
+    session = requests.Session()
+    url = f"{settings.SEARCH_API_URL.rstrip('/')}/answer"
+
+    def answer(question: str, timer: StageTimer) -> dict:
+        response = timer.measure(
+            "api_answer",
+            session.post,
+            url,
+            json={"question": question},
+            timeout=settings.SEARCH_API_TIMEOUT,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    return answer
+
+
+def run_load(
+    answer, questions: list[str], concurrency: int, repeat: int = 1
+) -> dict:
+    """Executa as perguntas com a concorrência informada.
+
+    Args:
+        answer (Callable[[str, StageTimer], dict]): Fluxo a ser testado.
+        questions (list[str]): Perguntas.
+        concurrency (int): Perguntas simultâneas.
+        repeat (int, optional): Repetições do arquivo. Defaults to 1.
+
+    Returns:
+        dict: Vazão, erros e percentis de latência por etapa.
+    """
+    timer = StageTimer()
+    errors = 0
+    errors_lock = threading.Lock()
+
+    def run(question: str) -> None:
+        nonlocal errors
+        tic = time.perf_counter()
+        try:
+            answer(question, timer)
+        except Exception as e:
+            logger.error(f"Error answering question: {e}")
+            with errors_lock:
+                errors += 1
+            return
+        timer.record("total", time.perf_counter() - tic)
+
+    workload = questions * repeat
+    tic = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(run, workload))
+    elapsed = time.perf_counter() - tic
+
+    return {
+        "requests": len(workload),
+        "errors": errors,
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "throughput_rps": (len(workload) - errors) / elapsed,
+        "stages": summarize(timer.durations),
+    }
+
+
+def format_report(report: dict) -> str:
+    """Formata o relatório como uma tabela de texto."""
+    lines = [
+        f"{report['requests']} perguntas, {report['errors']} erros, "
+        f"concorrência {report['concurrency']}: "
+        f"{report['throughput_rps']:.2f} perguntas/s",
+        f"{'etapa':<20}" + "".join(f"{'p' + str(p):>10}" for p in PERCENTILES),
+    ]
+    for stage, stats in report["stages"].items():
+        lines.append(
+            f"{stage:<20}"
+            + "".join(f"{stats[f'p{p}_ms']:>10.1f}" for p in PERCENTILES)
+        )
+    return "\n".join(lines)
+
+
+def main(  # noqa: PLR0913
+    questions_path: str,
+    *,
+    concurrency: int = 8,
+    repeat: int = 1,
+    mode: str = "local",
+    result_cache: bool = False,
+    output_path: str | None = None,
+) -> None:
+    """Executa o teste de carga e imprime o relatório.
+
+    Args:
+        questions_path (str): Arquivo JSONL com as perguntas.
+        concurrency (int, optional): Perguntas simultâneas. Defaults to 8.
+        repeat (int, optional): Repetições do arquivo. Defaults to 1.
+        mode (str, optional): `local` ou `api`. Defaults to "local".
+        result_cache (bool, optional): Usa o cache de resultados no modo
+        local. Defaults to False.
+        output_path (str | None, optional): Arquivo JSON para salvar o
+        relatório. Defaults to None.
+    """
+    questions = [
+        record["question"] for record in read_questions(questions_path)
+    ]
+    if mode == "api":
+        answer = api_pipeline()
+    else:
+        answer = local_pipeline(result_cache=result_cache)
+
+    report = run_load(answer, questions, concurrency, repeat)
+    print(format_report(report))
+    if output_path:
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
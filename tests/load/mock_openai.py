@@ -0,0 +1,118 @@
+"""Servidor local compatível com a API de chat da OpenAI e com o servidor
+de embeddings, para testes de carga sem acesso à rede.
+
+As respostas são fixas: a tradução da pergunta vem do arquivo de perguntas
+(`MOCK_OPENAI_QUESTIONS`), quando a pergunta tiver `query` e `where`, e a
+resposta final cita os três primeiros documentos recebidos. A latência de
+cada chamada é sorteada a partir de `MOCK_OPENAI_LATENCY_MS` e
+`MOCK_OPENAI_JITTER_MS`.
+
+Exemplo:
+    MOCK_OPENAI_LATENCY_MS=400 uvicorn tests.load.mock_openai:app \
+        --port 8900 --workers 2
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from tests.benchmarks.synthetic import HashingEmbeddingFunction
+
+LATENCY_MS = float(os.environ.get("MOCK_OPENAI_LATENCY_MS", "300"))
+JITTER_MS = float(os.environ.get("MOCK_OPENAI_JITTER_MS", "100"))
+EMBED_LATENCY_MS = float(os.environ.get("MOCK_EMBED_LATENCY_MS", "0"))
+DOCUMENT_ID = re.compile(r"'id': '([^']+)'")
+
+
+def load_translations(path: str | None) -> dict[str, dict]:
+    """Lê as traduções fixas das perguntas a partir de um arquivo JSONL."""
+    if not path:
+        return {}
+    translations = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            translation = {"query": record.get("query", record["question"])}
+            if record.get("where"):
+                translation["where"] = record["where"]
+            translations[record["question"]] = translation
+    return translations
+
+
+TRANSLATIONS = load_translations(os.environ.get("MOCK_OPENAI_QUESTIONS"))
+embedding_function = HashingEmbeddingFunction()
+app = FastAPI(title="OpenAI simulada")
+
+
+class Message(BaseModel):
+    role: str
+    content: str
+
+
+class ChatCompletionRequest(BaseModel):
+    model: str
+    messages: list[Message]
+
+
+class EmbedRequest(BaseModel):
+    texts: list[str]
+
+
+def answer_content(text: str) -> dict:
+    """Gera a resposta fixa para a pergunta ou para o texto final."""
+    if "- Documents:" in text:
+        ids = DOCUMENT_ID.findall(text)[:3]
+        return {
+            "answer": "Resposta simulada para o teste de carga.",
+            "ids": ids,
+        }
+    return TRANSLATIONS.get(text, {"query": text.upper()})
+
+
+async def simulate_latency(mean_ms: float, jitter_ms: float) -> None:
+    delay = max(0.0, random.gauss(mean_ms, jitter_ms)) / 1000
+    if delay:
+        await asyncio.sleep(delay)
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: ChatCompletionRequest) -> dict:
+    await simulate_latency(LATENCY_MS, JITTER_MS)
+    text = body.messages[-1].content
+    content = json.dumps(answer_content(text), ensure_ascii=False)
+    prompt_tokens = sum(len(m.content.split()) for m in body.messages)
+    completion_tokens = len(content.split())
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+@app.post("/embed")
+async def embed(body: EmbedRequest) -> dict:
+    await simulate_latency(EMBED_LATENCY_MS, 0)
+    embeddings = embedding_function(body.texts)
+    return {"embeddings": [list(map(float, e)) for e in embeddings]}
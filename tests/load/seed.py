@@ -0,0 +1,66 @@
+"""Popula um ChromaDB local para os testes de carga.
+
+Os documentos vêm de um arquivo Parquet no formato do catálogo da CAPES
+ou, se nenhum for informado, de um catálogo sintético. A coleção é gravada
+em `CHROMA_PERSIST_PATH` e o índice de facetas em `FACET_INDEX_PATH`.
+
+Exemplo:
+    typer tests/load/seed.py run --rows 20000
+"""
+
+from pathlib import Path
+
+from src.config import logger, settings
+from src.extract_embeddings import (
+    add_documents_to_collection,
+    collection_metadatas,
+    create_persistent_chroma_client,
+    create_thesis_collection,
+    preprocess_thesis_data,
+)
+from src.facets import FacetIndex
+from src.storage import read_arrow
+from tests.benchmarks.synthetic import (
+    HashingEmbeddingFunction,
+    generate_catalog,
+)
+
+
+def main(
+    fixture: str | None = None,
+    rows: int = 10000,
+    path: str = settings.CHROMA_PERSIST_PATH,
+) -> None:
+    """Cria a coleção local de teses a partir do fixture.
+
+    Args:
+        fixture (str | None, optional): Arquivo Parquet com o catálogo.
+        Defaults to None, que gera um catálogo sintético.
+        rows (int, optional): Registros do catálogo sintético. Defaults to
+        10000.
+        path (str, optional): Diretório do ChromaDB local. Defaults to
+        `CHROMA_PERSIST_PATH`.
+    """
+    if fixture is None:
+        fixture = Path(path).parent / f"catalogo_sintetico_{rows}.parquet"
+        fixture.parent.mkdir(parents=True, exist_ok=True)
+        generate_catalog(rows).to_parquet(fixture, index=False)
+    df = read_arrow(preprocess_thesis_data.fn(str(fixture)))
+
+    client = create_persistent_chroma_client.fn(path)
+    try:
+        client.delete_collection("thesis_capes")
+    except ValueError:
+        pass
+    collection = create_thesis_collection.fn(
+        client, HashingEmbeddingFunction()
+    )
+    add_documents_to_collection.fn(
+        client,
+        collection,
+        ids=df["id"].tolist(),
+        documents=df["DS_RESUMO"].tolist(),
+        metadatas=collection_metadatas(df),
+    )
+    FacetIndex.from_dataframe(df).save(settings.FACET_INDEX_PATH)
+    logger.info(f"Seeded {len(df)} documents into {path}")
@@ -0,0 +1,118 @@
+from unittest import mock
+
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from src.analytics import (
+    count_by,
+    count_by_year,
+    filter_catalog,
+    load_catalog,
+    search_titles,
+    top_institutions,
+)
+from src.schema import apply_schema
+
+
+@pytest.fixture
+def catalog_path(tmp_path):
+    path = tmp_path / "catalogo.parquet"
+    pd.DataFrame(
+        {
+            "AN_BASE": [2019, 2020, 2020, 2021],
+            "SG_ENTIDADE_ENSINO": ["USP", "USP", "UFRJ", "UFMG"],
+            "NM_ENTIDADE_ENSINO": [
+                "U. de São Paulo",
+                "U. de São Paulo",
+                "UFRJ",
+                "UFMG",
+            ],
+            "NM_PRODUCAO": [
+                "Redes neurais na previsão de séries",
+                "Ensino de matemática",
+                "REDES de saneamento",
+                None,
+            ],
+            "NM_GRAU_ACADEMICO": [
+                "Mestrado",
+                "Doutorado",
+                "Mestrado",
+                "Mestrado",
+            ],
+            "NM_REGIAO": ["Sudeste"] * 4,
+            "SG_UF_IES": ["SP", "SP", "RJ", "MG"],
+            "NM_GRANDE_AREA_CONHECIMENTO": [
+                "Exatas",
+                "Humanas",
+                "Exatas",
+                "Saúde",
+            ],
+            "NM_AREA_CONHECIMENTO": [
+                "Computação",
+                "Educação",
+                "Engenharia",
+                "Saúde",
+            ],
+            "DS_RESUMO": ["resumo"] * 4,
+        }
+    ).pipe(apply_schema).to_parquet(path, index=False)
+    return str(path)
+
+
+def test_load_catalog_reads_only_selected_columns(catalog_path):
+    table = load_catalog(catalog_path, columns=["AN_BASE", "SG_UF_IES", "X"])
+
+    assert table.column_names == ["AN_BASE", "SG_UF_IES"]
+    assert table.num_rows == 4  # noqa: PLR2004
+
+
+def test_filter_and_count(catalog_path):
+    table = filter_catalog(
+        load_catalog(catalog_path),
+        years=(2020, 2021),
+        NM_GRAU_ACADEMICO=["Mestrado"],
+        SG_UF_IES=[],
+    )
+
+    counts = count_by(table, "SG_UF_IES")
+    assert dict(zip(counts["SG_UF_IES"], counts["trabalhos"])) == {
+        "RJ": 1,
+        "MG": 1,
+    }
+    assert count_by_year(table)["AN_BASE"].tolist() == [2020, 2021]
+
+
+def test_top_institutions(catalog_path):
+    result = top_institutions(load_catalog(catalog_path), n=1)
+
+    assert result.to_dict("records") == [
+        {
+            "SG_ENTIDADE_ENSINO": "USP",
+            "NM_ENTIDADE_ENSINO": "U. de São Paulo",
+            "trabalhos": 2,
+        }
+    ]
+
+
+def test_search_titles(catalog_path):
+    table = load_catalog(catalog_path)
+
+    assert search_titles(table, "redes")["AN_BASE"].tolist() == [2020, 2019]
+    assert search_titles(table, "redes neurais")["AN_BASE"].tolist() == [2019]
+    assert search_titles(table, "  ").empty
+
+
+def analytics_page():
+    from src.web.mypages.analytics import main  # noqa: PLC0415
+
+    main()
+
+
+def test_analytics_page(catalog_path):
+    with mock.patch("src.web.mypages.analytics.settings") as settings:
+        settings.CATALOG_PATH = catalog_path
+        at = AppTest.from_function(analytics_page).run()
+
+    assert not at.exception
+    assert at.metric[0].value == "4"
@@ -0,0 +1,178 @@
+from http import HTTPStatus
+from unittest import mock
+
+import httpx
+import openai
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api import NO_ANSWER, app
+from src.resilience import CircuitOpenError
+
+
+@pytest.fixture
+def client():
+    with (
+        mock.patch("src.api.connect_collection") as mock_connect,
+        mock.patch("src.api.load_prompts", return_value=("chroma", "rag")),
+        mock.patch("src.api.AsyncOpenAI") as mock_openai,
+        mock.patch("src.api.get_embedding_function"),
+        mock.patch("src.api.QueryEmbeddingCache") as mock_query_encoder,
+        mock.patch("src.api.ResultCache") as mock_result_cache,
+    ):
+        mock_openai.return_value.close = mock.AsyncMock()
+        with TestClient(app) as test_client:
+            yield (
+                test_client,
+                mock_connect.return_value,
+                mock_query_encoder.return_value,
+                mock_result_cache.return_value,
+            )
+
+
+@mock.patch("src.api.search_documents")
+def test_search(mock_search_documents, client):
+    test_client, collection, query_encoder, result_cache = client
+    mock_search_documents.return_value = [{"id": "a"}]
+
+    response = test_client.post(
+        "/search", json={"query": "BUMBA MEU BOI", "n_results": 5}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {"documents": [{"id": "a"}]}
+    mock_search_documents.assert_called_once_with(
+        collection,
+        query="BUMBA MEU BOI",
+        where=None,
+        n_results=5,
+        facet_index=collection.facet_index,
+        query_encoder=query_encoder,
+        result_cache=result_cache,
+    )
+
+
+@mock.patch("src.api.search_documents")
+@mock.patch("src.api.aget_agent_response")
+def test_answer(mock_agent_response, mock_search_documents, client):
+    test_client, collection, *_ = client
+    mock_agent_response.side_effect = [
+        {"query": "BUMBA MEU BOI", "where": {"AN_BASE": {"$eq": 2020}}},
+        {"answer": "Uma resposta", "ids": ["a"]},
+    ]
+    mock_search_documents.return_value = [{"id": "a"}, {"id": "b"}]
+    collection.facet_index.counts.return_value = {"AN_BASE": {2020: 2}}
+    collection.get.return_value = {
+        "ids": ["a", "b"],
+        "documents": ["resumo a", "resumo b"],
+    }
+
+    response = test_client.post(
+        "/answer", json={"question": "trabalhos sobre bumba meu boi"}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        "answer": "Uma resposta",
+        "ids": ["a"],
+        "query": "BUMBA MEU BOI",
+        "where": {"AN_BASE": {"$eq": 2020}},
+        "documents": [{"id": "a", "DS_RESUMO": "resumo a"}, {"id": "b"}],
+        "facet_counts": {"AN_BASE": {"2020": 2}},
+    }
+    collection.facet_index.counts.assert_called_once_with(
+        {"AN_BASE": {"$eq": 2020}}
+    )
+    # O contexto enviado ao LLM traz os resumos de todos os documentos.
+    text = mock_agent_response.call_args_list[1].args[0]
+    assert "resumo a" in text
+    assert "resumo b" in text
+
+
+@pytest.mark.parametrize("response", [{"answer": None, "ids": None}, {}])
+@mock.patch("src.api.search_documents")
+@mock.patch("src.api.aget_agent_response")
+def test_answer_without_answer(
+    mock_agent_response, mock_search_documents, response, client
+):
+    test_client, collection, *_ = client
+    mock_agent_response.side_effect = [{"query": "BUMBA MEU BOI"}, response]
+    mock_search_documents.return_value = [{"id": "a"}]
+    collection.get.return_value = {"ids": ["a"], "documents": ["resumo"]}
+
+    result = test_client.post("/answer", json={"question": "bumba meu boi"})
+
+    assert result.status_code == HTTPStatus.OK
+    assert result.json()["answer"] == NO_ANSWER
+    assert result.json()["ids"] == []
+
+
+_REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat")
+
+
+@pytest.mark.parametrize(
+    ("error", "status"),
+    [
+        (CircuitOpenError("aberto"), HTTPStatus.SERVICE_UNAVAILABLE),
+        (
+            openai.APIConnectionError(request=_REQUEST),
+            HTTPStatus.SERVICE_UNAVAILABLE,
+        ),
+        (
+            openai.APIError("falhou", request=_REQUEST, body=None),
+            HTTPStatus.BAD_GATEWAY,
+        ),
+        (ValueError("JSON inválido"), HTTPStatus.BAD_GATEWAY),
+        (None, HTTPStatus.BAD_GATEWAY),
+    ],
+)
+@mock.patch("src.api.aget_agent_response")
+def test_answer_maps_llm_failures(mock_agent_response, error, status, client):
+    test_client, *_ = client
+    if error is None:
+        # JSON válido, mas que não é um objeto.
+        mock_agent_response.return_value = ["resposta"]
+    else:
+        mock_agent_response.side_effect = error
+
+    response = test_client.post("/answer", json={"question": "bumba"})
+
+    assert response.status_code == status
+
+
+@mock.patch("src.api.search_documents")
+def test_search_with_abstracts(mock_search_documents, client):
+    test_client, collection, *_ = client
+    mock_search_documents.return_value = [{"id": "a"}]
+    collection.get.return_value = {"ids": ["a"], "documents": ["resumo"]}
+
+    response = test_client.post(
+        "/search", json={"query": "BUMBA MEU BOI", "include_abstracts": True}
+    )
+
+    assert response.json() == {
+        "documents": [{"id": "a", "DS_RESUMO": "resumo"}]
+    }
+
+
+def test_documents(client):
+    test_client, collection, *_ = client
+    collection.get.return_value = {"ids": ["a"], "documents": ["resumo"]}
+
+    response = test_client.post("/documents", json={"ids": ["a"]})
+
+    assert response.json() == {"abstracts": {"a": "resumo"}}
+    collection.get.assert_called_once_with(ids=["a"], include=["documents"])
+
+
+def test_answer_rejects_empty_question(client):
+    test_client, *_ = client
+    response = test_client.post("/answer", json={"question": ""})
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_metrics(client):
+    test_client, *_ = client
+    response = test_client.get("/metrics/")
+    assert response.status_code == HTTPStatus.OK
+    assert "buscador_stage_duration_seconds" in response.text
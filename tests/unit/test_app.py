@@ -0,0 +1,83 @@
+import subprocess
+import sys
+from pathlib import Path
+from unittest import mock
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from app import load_page, warm_up_models
+from src.web.mypages.homepage import page as homepage
+
+ROOT_DIR = Path(__file__).parents[2]
+HEAVY_MODULES = (
+    "chromadb",
+    "openai",
+    "prefect",
+    "torch",
+    "sentence_transformers",
+    "instructor_embedding",
+)
+# Tempo máximo, em microssegundos, para importar a aplicação Streamlit.
+IMPORT_TIME_BUDGET_US = 3_000_000
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Executa `python -X importtime` e retorna o tempo acumulado, em
+    microssegundos, de cada módulo importado."""
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT_DIR,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_app_import_is_light():
+    times = import_times("app")
+
+    heavy = [name for name in times if name.split(".")[0] in HEAVY_MODULES]
+    assert heavy == []
+    assert times["app"] < IMPORT_TIME_BUDGET_US
+
+
+@pytest.mark.parametrize(
+    "module", ["src.web.mypages.rag.qa", "src.extract_embeddings"]
+)
+def test_model_import_is_deferred(module):
+    times = import_times(module)
+
+    assert "instructor_embedding" not in times
+    assert "sentence_transformers" not in times
+    assert "torch" not in times
+
+
+def test_load_page():
+    assert load_page("home") is homepage
+
+
+@pytest.mark.parametrize("setting", ["SEARCH_API_URL", "EMBEDDING_SERVER_URL"])
+def test_warm_up_skipped_without_local_model(setting):
+    warm_up_models.clear()
+    with (
+        mock.patch(f"src.config.settings.{setting}", "http://servico"),
+        mock.patch("app.threading.Thread") as thread,
+    ):
+        assert warm_up_models() is None
+    thread.assert_not_called()
+    warm_up_models.clear()
+
+
+def test_app_first_run_renders_without_errors():
+    with mock.patch("src.config.settings.SEARCH_API_URL", "http://api"):
+        app = AppTest.from_file(str(ROOT_DIR / "app.py")).run(timeout=60)
+
+    assert not app.exception
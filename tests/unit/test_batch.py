@@ -0,0 +1,75 @@
+import json
+from unittest import mock
+
+import pandas as pd
+
+from src.batch import answer_questions, read_questions, write_results
+
+
+def test_read_questions(tmp_path):
+    path = tmp_path / "questions.jsonl"
+    path.write_text(
+        '{"question": "pergunta 1"}\n\n'
+        '{"id": "q2", "question": "pergunta 2"}\n',
+        encoding="utf-8",
+    )
+
+    questions = read_questions(str(path))
+
+    assert questions == [
+        {"question": "pergunta 1", "id": 1},
+        {"id": "q2", "question": "pergunta 2"},
+    ]
+
+
+def test_write_results_jsonl(tmp_path):
+    path = tmp_path / "results.jsonl"
+    results = [{"question": "pergunta", "ids": ["a"]}]
+
+    write_results(results, str(path))
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == results
+
+
+def test_write_results_parquet(tmp_path):
+    path = tmp_path / "results.parquet"
+    results = [{"question": "pergunta", "where": {"AN_BASE": 2020}}]
+
+    write_results(results, str(path))
+
+    df = pd.read_parquet(path)
+    assert json.loads(df["where"].iloc[0]) == {"AN_BASE": 2020}
+
+
+@mock.patch("src.batch.load_prompts", return_value=("chroma", "rag"))
+@mock.patch("src.batch.search_documents_batch")
+@mock.patch("src.batch.get_agent_response")
+def test_answer_questions(
+    mock_get_agent_response, mock_search_batch, mock_load_prompts
+):
+    def agent_response(text, prompt, client):
+        if prompt == "chroma":
+            return {"query": text.upper()} if text != "vazia" else {}
+        return {"answer": "resposta", "ids": ["a"]}
+
+    mock_get_agent_response.side_effect = agent_response
+    mock_search_batch.return_value = [[{"id": "a"}]]
+    collection = mock.Mock()
+    collection.get.return_value = {"ids": ["a"], "documents": ["resumo"]}
+
+    results = answer_questions(
+        ["pergunta", "vazia"], client=mock.Mock(), collection=collection
+    )
+
+    mock_search_batch.assert_called_once_with(
+        collection,
+        [{"query": "PERGUNTA"}],
+        n_results=20,
+        batch_size=32,
+        facet_index=None,
+        query_encoder=None,
+    )
+    assert results[0]["documents"] == [{"id": "a", "DS_RESUMO": "resumo"}]
+    assert results[0]["answer"] == "resposta"
+    assert results[1]["documents"] == []
@@ -0,0 +1,105 @@
+from unittest import mock
+
+from src.cache import QueryEmbeddingCache, ResultCache
+
+
+def test_query_embedding_cache_reuses_normalized_queries():
+    embedding_function = mock.Mock(
+        side_effect=lambda texts: [[float(len(t))] for t in texts]
+    )
+    cache = QueryEmbeddingCache(embedding_function, maxsize=2)
+
+    assert cache("Bumba  meu boi") == [13.0]
+    assert cache.encode(["bumba meu boi", "aedes aegypti"]) == [
+        [13.0],
+        [13.0],
+    ]
+
+    assert embedding_function.call_args_list == [
+        mock.call(["bumba meu boi"]),
+        mock.call(["aedes aegypti"]),
+    ]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_query_embedding_cache_evicts_least_recently_used():
+    embedding_function = mock.Mock(
+        side_effect=lambda texts: [[1.0]] * len(texts)
+    )
+    cache = QueryEmbeddingCache(embedding_function, maxsize=2)
+
+    cache.encode(["a", "b"])
+    cache("a")
+    cache("c")
+    cache("b")
+
+    assert embedding_function.call_args_list == [
+        mock.call(["a", "b"]),
+        mock.call(["c"]),
+        mock.call(["b"]),
+    ]
+
+
+def make_collection(count=10):
+    collection = mock.Mock()
+    collection.name = "thesis_capes"
+    collection.id = "uuid"
+    collection.count.return_value = count
+    return collection
+
+
+def test_result_cache_key_is_canonical():
+    cache = ResultCache()
+    where_a = {"$and": [{"AN_BASE": 2020}], "SG_UF_IES": "RJ"}
+    where_b = {"SG_UF_IES": "RJ", "$and": [{"AN_BASE": 2020}]}
+
+    assert cache.make_key("Bumba Meu  Boi", where_a, 20, "v1") == (
+        cache.make_key("bumba meu boi", where_b, 20, "v1")
+    )
+    assert cache.make_key("bumba meu boi", None, 20, "v1") != (
+        cache.make_key("bumba meu boi", None, 20, "v2")
+    )
+
+
+def test_result_cache_lru_and_stats():
+    cache = ResultCache(maxsize=2)
+    cache.set("a", [{"id": 1}])
+    cache.set("b", [{"id": 2}])
+    assert cache.get("a") == [{"id": 1}]
+    cache.set("c", [{"id": 3}])
+
+    assert cache.get("b") is None
+    assert cache.get("c") == [{"id": 3}]
+    assert cache.stats() == {
+        "entries": 2,
+        "maxsize": 2,
+        "hits": 2,
+        "shared_hits": 0,
+        "misses": 1,
+        "hit_rate": 2 / 3,
+    }
+
+
+def test_result_cache_shared_dir(tmp_path):
+    writer = ResultCache(shared_dir=str(tmp_path / "shared"))
+    reader = ResultCache(shared_dir=str(tmp_path / "shared"))
+
+    writer.set("key", [{"id": "a"}])
+
+    assert reader.get("key") == [{"id": "a"}]
+    assert reader.stats()["shared_hits"] == 1
+
+
+@mock.patch("src.cache.time.monotonic")
+def test_result_cache_index_version(mock_monotonic):
+    cache = ResultCache(version_ttl=60)
+    collection = make_collection(count=10)
+
+    mock_monotonic.return_value = 0
+    first = cache.index_version(collection)
+    collection.count.return_value = 20
+    mock_monotonic.return_value = 30
+    assert cache.index_version(collection) == first
+
+    mock_monotonic.return_value = 61
+    assert cache.index_version(collection) == first.replace(":10", ":20")
@@ -0,0 +1,115 @@
+from unittest.mock import MagicMock
+
+import chromadb
+import pytest
+
+from src.collection_alias import (
+    LiveCollection,
+    garbage_collect,
+    list_versions,
+    resolve_alias,
+    switch_alias,
+    validate_collection,
+    version_name,
+    versioned_path,
+)
+
+
+@pytest.fixture
+def chroma_client(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    yield client
+    client.clear_system_cache()
+
+
+def test_versioned_path():
+    assert versioned_path("data/facets.npz", 3) == "data/facets_v3.npz"
+    assert versioned_path("s3://b/facets.npz", 1) == "s3://b/facets_v1.npz"
+
+
+def test_resolve_alias_defaults_to_original_collection(chroma_client):
+    assert resolve_alias(chroma_client)["collection"] == "thesis_capes"
+
+
+def test_switch_alias(chroma_client):
+    switch_alias(chroma_client, "thesis_capes_v1", facet_index_path="f1")
+    switch_alias(chroma_client, "thesis_capes_v2", facet_index_path="f2")
+
+    assert resolve_alias(chroma_client) == {
+        "collection": "thesis_capes_v2",
+        "facet_index_path": "f2",
+    }
+
+
+def test_garbage_collect_keeps_active_and_previous(chroma_client):
+    for version in range(1, 5):
+        chroma_client.create_collection(version_name(version))
+    switch_alias(chroma_client, version_name(3))
+
+    removed = garbage_collect(chroma_client, keep=1)
+
+    assert removed == ["thesis_capes_v1"]
+    assert list_versions(chroma_client) == [2, 3, 4]
+
+
+def test_validate_collection_rejects_wrong_count():
+    collection = MagicMock()
+    collection.count.return_value = 9
+
+    with pytest.raises(ValueError, match="expected 10"):
+        validate_collection(collection, expected_count=10)
+
+
+def test_live_collection_follows_alias(chroma_client):
+    switch_alias(chroma_client, "thesis_capes_v1", facet_index_path="f1")
+    open_collection = MagicMock(side_effect=lambda name: MagicMock(name=name))
+    open_facet_index = MagicMock(side_effect=lambda path: path)
+
+    live = LiveCollection(
+        chroma_client, open_collection, open_facet_index, ttl=3600
+    )
+    switch_alias(chroma_client, "thesis_capes_v2", facet_index_path="f2")
+
+    assert live.facet_index == "f1"
+    live.refresh()
+    assert live.facet_index == "f2"
+    live.query(query_texts=["teste"])
+    assert [c.args[0] for c in open_collection.call_args_list] == [
+        "thesis_capes_v1",
+        "thesis_capes_v2",
+    ]
+    live.collection.query.assert_called_once_with(query_texts=["teste"])
+
+
+def test_live_collection_projects_queries_with_version_reducer(chroma_client):
+    switch_alias(
+        chroma_client,
+        "thesis_capes_v2",
+        facet_index_path="f2",
+        reducer_path="data/reducer_v2.npz",
+    )
+    collection = MagicMock()
+    open_reducer = MagicMock()
+    query_function = open_reducer.return_value
+    query_function.reducer.transform.return_value = [[0.5]]
+
+    live = LiveCollection(
+        chroma_client,
+        lambda name: collection,
+        lambda path: None,
+        open_reducer=open_reducer,
+    )
+    live.query(query_embeddings=[[1.0, 2.0]], n_results=3)
+    live.query(query_texts=["teste"])
+
+    open_reducer.assert_called_once_with("data/reducer_v2.npz")
+    assert live.reducer is query_function.reducer
+    query_function.reducer.transform.assert_called_once_with([[1.0, 2.0]])
+    query_function.assert_called_once_with(["teste"])
+    assert collection.query.call_args_list[0].kwargs == {
+        "query_embeddings": [[0.5]],
+        "n_results": 3,
+    }
+    assert collection.query.call_args_list[1].kwargs == {
+        "query_embeddings": query_function.return_value,
+    }
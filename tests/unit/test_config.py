@@ -0,0 +1,37 @@
+import hashlib
+from unittest import mock
+
+from src.config import log_payload, summarize_payload
+
+
+def test_summarize_payload_keeps_short_text():
+    assert summarize_payload("consulta", max_chars=20) == "consulta"
+
+
+def test_summarize_payload_truncates_and_hashes():
+    text = "resumo " * 100
+    digest = hashlib.sha256(text.encode()).hexdigest()[:16]
+
+    summary = summarize_payload(text, max_chars=10)
+
+    assert summary == f"resumo res... [700 chars, sha256:{digest}]"
+
+
+def test_summarize_payload_converts_objects():
+    assert summarize_payload({"query": "boi"}) == "{'query': 'boi'}"
+
+
+@mock.patch("src.config.logger")
+@mock.patch("src.config.random.random")
+def test_log_payload_samples_records(mock_random, mock_logger):
+    with mock.patch("src.config.settings.LOG_SAMPLE_RATE", 0.1):
+        mock_random.return_value = 0.5
+        log_payload("Sending text", "texto")
+        mock_logger.opt.assert_not_called()
+
+        mock_random.return_value = 0.05
+        log_payload("Sending text", "texto")
+
+    mock_logger.opt.return_value.bind.return_value.log.assert_called_once_with(
+        "INFO", "{}: {}", "Sending text", "texto"
+    )
@@ -0,0 +1,170 @@
+import chromadb
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.collection_alias import LiveCollection, switch_alias
+from src.dedup import (
+    deduplicate,
+    duplicate_groups,
+    expand_where,
+    grouped_metadata,
+    near_duplicate_groups,
+    normalize_texts,
+)
+from src.extract_embeddings import collection_metadatas
+from src.facets import FacetIndex
+
+ABSTRACT = (
+    "Este trabalho investiga o uso de redes neurais para a previsão de "
+    "séries temporais de consumo de energia elétrica em regiões "
+    "metropolitanas brasileiras, comparando modelos estatísticos e de "
+    "aprendizado profundo"
+)
+OTHER = (
+    "A pesquisa analisa a formação de professores de matemática na "
+    "educação básica a partir de entrevistas com docentes da rede pública"
+)
+
+
+@pytest.fixture
+def deduplicated():
+    df = pd.DataFrame(
+        {
+            "id": ["a", "b", "c", "d"],
+            "AN_BASE": [2019, 2021, 2020, 2020],
+            "SG_UF_IES": ["SP", "RJ", "SP", "MG"],
+            "DS_RESUMO": [
+                ABSTRACT,
+                ABSTRACT + ".",
+                ABSTRACT + " lineares",
+                OTHER,
+            ],
+        }
+    )
+    return deduplicate(df, threshold=0.8)
+
+
+def test_normalize_texts():
+    texts = pd.Series(["Previsão  de Séries!", "PREVISAO de series"])
+
+    assert normalize_texts(texts).tolist() == [
+        "previsao de series",
+        "previsao de series",
+    ]
+
+
+def test_near_duplicate_groups():
+    texts = [ABSTRACT, OTHER, ABSTRACT + " lineares", ""]
+
+    groups = near_duplicate_groups(texts, threshold=0.8)
+
+    np.testing.assert_array_equal(groups, [0, 1, 0, 3])
+
+
+def test_duplicate_groups_exact_only():
+    texts = pd.Series([ABSTRACT, ABSTRACT.upper(), ABSTRACT + " lineares"])
+
+    groups = duplicate_groups(texts, near=False)
+
+    assert groups[0] == groups[1] != groups[2]
+
+
+def test_deduplicate_aggregates_metadata(deduplicated):
+    result = deduplicated.set_index("id")
+
+    assert result.index.tolist() == ["b", "d"]
+    assert result.loc["b", "N_DUPLICATAS"] == 3  # noqa: PLR2004
+    assert result.loc["b", "AN_BASE_AGRUPADO"] == "2019; 2020; 2021"
+    assert result.loc["b", "SG_UF_IES_AGRUPADO"] == "RJ; SP"
+    assert result.loc["d", "N_DUPLICATAS"] == 1
+    assert result.loc["d", "AN_BASE_AGRUPADO"] == "2020"
+
+
+def test_grouped_metadata():
+    record = {"AN_BASE_AGRUPADO": "2019; 2021", "SG_UF_IES_AGRUPADO": "SP"}
+
+    assert grouped_metadata(record) == {
+        "AN_BASE=2019": True,
+        "AN_BASE=2021": True,
+        "AN_BASE_MIN": 2019,
+    }
+
+
+def test_expand_where():
+    where = {
+        "$and": [
+            {"AN_BASE": {"$lte": 2019}},
+            {"SG_UF_IES": {"$in": ["SP", "RJ"]}},
+            {"NM_PRODUCAO": "Título"},
+        ]
+    }
+
+    assert expand_where(where) == {
+        "$and": [
+            {
+                "$or": [
+                    {"AN_BASE": {"$lte": 2019}},
+                    {"AN_BASE_MIN": {"$lte": 2019}},
+                ]
+            },
+            {
+                "$or": [
+                    {"SG_UF_IES": {"$in": ["SP", "RJ"]}},
+                    {"SG_UF_IES=SP": True},
+                    {"SG_UF_IES=RJ": True},
+                ]
+            },
+            {"NM_PRODUCAO": "Título"},
+        ]
+    }
+    assert expand_where({"AN_BASE": 2019.0}) == {
+        "$or": [{"AN_BASE": {"$eq": 2019.0}}, {"AN_BASE=2019": True}]
+    }
+    assert expand_where({"AN_BASE": {"$ne": 2019}}) == {
+        "AN_BASE": {"$ne": 2019}
+    }
+
+
+@pytest.mark.parametrize(
+    "where",
+    [
+        {"AN_BASE": 2019},
+        {"AN_BASE": {"$lt": 2020}},
+        {"SG_UF_IES": {"$in": ["SP", "PA"]}},
+        {"$and": [{"AN_BASE": 2020}, {"SG_UF_IES": "SP"}]},
+    ],
+)
+def test_filters_match_values_of_collapsed_duplicates(
+    deduplicated, tmp_path, where
+):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    collection = client.create_collection(
+        "thesis_capes_v1", embedding_function=None
+    )
+    collection.add(
+        ids=deduplicated["id"].tolist(),
+        embeddings=[[1.0, 0.0], [0.0, 1.0]],
+        metadatas=collection_metadatas(deduplicated),
+    )
+    switch_alias(client, "thesis_capes_v1", deduplicated=True)
+    facet_index = FacetIndex.from_dataframe(deduplicated)
+    live = LiveCollection(
+        client, client.get_collection, lambda path: facet_index
+    )
+
+    response = live.query(
+        query_embeddings=[[1.0, 0.0]], where=where, n_results=2
+    )
+    candidates, _ = facet_index.resolve(where)
+
+    # O grupo mantido é o de "b" (2021, RJ), e as duplicatas "a" (2019,
+    # SP) e "c" (2020, SP) não estão na coleção.
+    assert response["ids"] == [["b"]]
+    assert facet_index.candidate_ids(candidates) == ["b"]
+    assert facet_index.counts(where)["AN_BASE"] == {
+        2021: 1,
+        2019: 1,
+        2020: 1,
+    }
+    client.clear_system_cache()
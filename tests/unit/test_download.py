@@ -12,6 +12,7 @@ from src.download import (
     generate_task_name,
     get_all_datasets_with_resources,
     get_resource_etag,
+    list_files,
     load_and_process_data,
     main,
 )
@@ -112,14 +113,30 @@ def test_download(mock_head, mock_get, mock_mkdir, mock_open):
     assert result == "./test_data/file.xlsx"
 
 
+@patch("src.download.list_objects")
+def test_list_files_s3(mock_list_objects):
+    mock_list_objects.return_value = ["s3://teses/data/raw/a.xlsx"]
+
+    result = list_files("s3://teses/data/raw")
+
+    mock_list_objects.assert_called_once_with("s3://teses/data/raw", ".xlsx")
+    assert result == ["s3://teses/data/raw/a.xlsx"]
+
+
+@patch("src.download.write_parquet")
+@patch("src.download.open_file")
 @patch("src.download.pd.read_excel")
-@patch("src.download.pd.concat")
-@patch("src.download.pd.DataFrame.to_parquet")
-def test_load_and_process_data(mock_to_parquet, mock_concat, mock_read_excel):
+@patch("src.download.list_files")
+def test_load_and_process_data(
+    mock_list_files, mock_read_excel, mock_open_file, mock_write_parquet
+):
     data = [
         {
             "AN_BASE": 2013,
             "ID_PRODUCAO_INTELECTUAL": 98980,
+            "SG_UF_IES": "SP",
+            "NM_PRODUCAO": "Título A",
+            "DS_RESUMO": "Resumo A",
             "DH_INICIO_AREA_CONC": "01/01/2012 00:00:00",
             "DH_FIM_AREA_CONC": "11/11/2015 00:00:00",
             "DH_INICIO_LINHA": pd.NA,
@@ -128,24 +145,32 @@ def test_load_and_process_data(mock_to_parquet, mock_concat, mock_read_excel):
             "DT_MATRICULA": "01/03/2011 00:00:00",
         },
         {
-            "AN_BASE": 2013,
+            "AN_BASE": 2014,
             "ID_PRODUCAO_INTELECTUAL": 97334,
+            "SG_UF_IES": "RJ",
+            "NM_PRODUCAO": "Título B",
+            "DS_RESUMO": "Resumo B",
             "DH_INICIO_AREA_CONC": "01/01/2011 00:00:00",
             "DH_FIM_AREA_CONC": pd.NA,
             "DH_INICIO_LINHA": "01/01/2011 00:00:00",
             "DH_FIM_LINHA": pd.NA,
-            "DT_TITULACAO": "16/08/2013 00:00:00",
+            "DT_TITULACAO": "16/08/2014 00:00:00",
             "DT_MATRICULA": "29/03/2011 00:00:00",
         },
     ]
-    df = pd.DataFrame(data)
-    mock_concat.return_value = df
-    mock_to_parquet.return_value = df
-    mock_read_excel.return_value = df
+    mock_list_files.return_value = ["2013.xlsx", "2014.xlsx"]
+    mock_read_excel.side_effect = [pd.DataFrame([row]) for row in data]
 
     load_and_process_data.fn(output_dir="./test_data")
 
-    mock_concat.assert_called_once()
+    df, path = mock_write_parquet.call_args.args
+    assert path == "./test_data/catalogo_de_teses_e_dissertacoes.parquet"
+    assert len(df) == len(data)
+    assert df["AN_BASE"].dtype == "Int16"
+    assert df["SG_UF_IES"].dtype == "category"
+    assert set(df["SG_UF_IES"].cat.categories) == {"RJ", "SP"}
+    assert df["DT_TITULACAO"].dtype.kind == "M"
+    assert df["DH_FIM_LINHA"].isna().all()
 
 
 @patch("src.download.get_all_datasets_with_resources")
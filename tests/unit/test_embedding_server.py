@@ -0,0 +1,82 @@
+import asyncio
+from http import HTTPStatus
+from unittest import mock
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.embedding_server import MicroBatcher, app
+
+
+def fake_encode(texts):
+    return np.array([[float(len(text)), 1.0] for text in texts])
+
+
+def test_micro_batcher_groups_concurrent_requests():
+    encode = mock.Mock(side_effect=fake_encode)
+
+    async def run():
+        batcher = MicroBatcher(encode, max_batch_size=10, max_wait_ms=50)
+        batcher.start()
+        results = await asyncio.gather(
+            batcher.submit(["a"]),
+            batcher.submit(["bb", "ccc"]),
+            batcher.submit(["dddd"]),
+        )
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(run())
+
+    encode.assert_called_once_with(["a", "bb", "ccc", "dddd"])
+    assert [np.asarray(r)[:, 0].tolist() for r in results] == [
+        [1.0],
+        [2.0, 3.0],
+        [4.0],
+    ]
+
+
+def test_micro_batcher_respects_max_batch_size():
+    encode = mock.Mock(side_effect=fake_encode)
+
+    async def run():
+        batcher = MicroBatcher(encode, max_batch_size=2, max_wait_ms=50)
+        batcher.start()
+        await asyncio.gather(*(batcher.submit([t]) for t in "abcd"))
+        await batcher.stop()
+        return batcher
+
+    batcher = asyncio.run(run())
+
+    assert encode.call_args_list == [
+        mock.call(["a", "b"]),
+        mock.call(["c", "d"]),
+    ]
+    assert batcher.batches == encode.call_count
+
+
+def test_micro_batcher_propagates_errors():
+    async def run():
+        batcher = MicroBatcher(mock.Mock(side_effect=RuntimeError("falhou")))
+        batcher.start()
+        try:
+            await batcher.submit(["a"])
+        finally:
+            await batcher.stop()
+
+    with pytest.raises(RuntimeError, match="falhou"):
+        asyncio.run(run())
+
+
+@mock.patch("src.extract_embeddings.ThesisEmbeddingFunction")
+def test_embed_endpoint(mock_embedding_function):
+    mock_embedding_function.return_value.side_effect = fake_encode
+
+    with TestClient(app) as client:
+        response = client.post("/embed", json={"texts": ["abc", "de"]})
+        health = client.get("/health").json()
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {"embeddings": [[3.0, 1.0], [2.0, 1.0]]}
+    assert health["batches"] == 1
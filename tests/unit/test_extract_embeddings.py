@@ -1,14 +1,28 @@
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pandas as pd
+import pytest
+from chromadb.api.types import validate_metadata
 
 from src.extract_embeddings import (
+    RemoteEmbeddingFunction,
     ThesisEmbeddingFunction,
     add_documents_to_collection,
+    assign_shards,
+    collection_metadatas,
     create_chroma_client,
+    create_configured_chroma_client,
     create_thesis_collection,
+    deduplicate_abstracts,
+    hnsw_metadata,
+    index_shard,
     preprocess_thesis_data,
+    resume_or_create_version,
+    verify_shards,
 )
+from src.schema import apply_schema
+from src.storage import read_arrow, write_arrow
 
 
 def test_embedding_function(mock_instructor, mock_settings):
@@ -56,7 +70,13 @@ def test_create_chroma_client(mock_chroma_http_client, mock_chroma_settings):
     )
 
 
-def test_create_thesis_collection(mock_embedding_function):
+def test_create_thesis_collection(mock_embedding_function, mock_settings):
+    mock_settings.HNSW_SPACE = "cosine"
+    mock_settings.HNSW_M = 32
+    mock_settings.HNSW_CONSTRUCTION_EF = 200
+    mock_settings.HNSW_SEARCH_EF = 50
+    mock_settings.HNSW_BATCH_SIZE = 1000
+    mock_settings.HNSW_SYNC_THRESHOLD = 10000
     mock_client = MagicMock()
     mock_collection = MagicMock()
     mock_client.get_or_create_collection.return_value = mock_collection
@@ -64,12 +84,30 @@ def test_create_thesis_collection(mock_embedding_function):
     collection = create_thesis_collection.fn(mock_client)
 
     mock_client.get_or_create_collection.assert_called_once_with(
-        name="thesis_capes", embedding_function=mock_embedding_function()
+        name="thesis_capes",
+        embedding_function=mock_embedding_function(),
+        metadata={
+            "hnsw:space": "cosine",
+            "hnsw:M": 32,
+            "hnsw:construction_ef": 200,
+            "hnsw:search_ef": 50,
+            "hnsw:batch_size": 1000,
+            "hnsw:sync_threshold": 10000,
+        },
     )
     assert collection == mock_collection
 
 
-def test_preprocess_thesis_data(mock_read_parquet):
+def test_hnsw_metadata_overrides(mock_settings):
+    mock_settings.HNSW_M = 16
+
+    metadata = hnsw_metadata({"hnsw:M": 2 * mock_settings.HNSW_M})
+
+    assert metadata["hnsw:M"] == 2 * mock_settings.HNSW_M
+
+
+@patch("src.extract_embeddings.fingerprint")
+def test_preprocess_thesis_data(mock_fingerprint, mock_read_parquet, tmp_path):
     data = {
         "AN_BASE": [2024],
         "SG_ENTIDADE_ENSINO": ["UNI"],
@@ -86,8 +124,9 @@ def test_preprocess_thesis_data(mock_read_parquet):
     }
     df = pd.DataFrame(data)
     mock_read_parquet.return_value = df
+    mock_fingerprint.return_value = "v1"
 
-    processed_df = preprocess_thesis_data.fn("test_path")
+    path = preprocess_thesis_data.fn("test_path", handoff_dir=str(tmp_path))
 
     mock_read_parquet.assert_called_once_with(
         "test_path",
@@ -106,9 +145,40 @@ def test_preprocess_thesis_data(mock_read_parquet):
             "DS_RESUMO",
         ],
     )
+    processed_df = read_arrow(path)
     assert not processed_df.empty
     assert "id" in processed_df.columns
 
+    # O arquivo de entrada não mudou: o resultado anterior é reaproveitado.
+    assert preprocess_thesis_data.fn("test_path", str(tmp_path)) == path
+    mock_read_parquet.assert_called_once()
+
+    mock_fingerprint.return_value = "v2"
+    assert preprocess_thesis_data.fn("test_path", str(tmp_path)) != path
+    assert mock_read_parquet.call_count == 2  # noqa: PLR2004
+
+
+def test_deduplicate_abstracts(mock_settings, tmp_path):
+    mock_settings.DEDUP_MODE = "exact"
+    mock_settings.DEDUP_THRESHOLD = 0.9
+    df = pd.DataFrame(
+        {
+            "id": ["a", "b"],
+            "AN_BASE": [2023, 2024],
+            "DS_RESUMO": ["Um resumo de tese", "Um resumo de tese."],
+        }
+    )
+    path = write_arrow(df, str(tmp_path / "preprocess.arrow"))
+
+    result_path = deduplicate_abstracts.fn(path, handoff_dir=str(tmp_path))
+
+    result = read_arrow(result_path)
+    assert result["id"].tolist() == ["b"]
+    assert result["N_DUPLICATAS"].tolist() == [2]
+
+    mock_settings.DEDUP_MODE = "none"
+    assert deduplicate_abstracts.fn(path) == path
+
 
 def test_add_documents_to_collection(mock_create_batches):
     mock_client = MagicMock()
@@ -127,6 +197,169 @@ def test_add_documents_to_collection(mock_create_batches):
     mock_create_batches.assert_called_once_with(
         api=mock_client, ids=ids, documents=documents, metadatas=metadatas
     )
-    mock_collection.add.assert_called_once_with(
+    mock_collection.upsert.assert_called_once_with(
         ids=ids, documents=documents, metadatas=metadatas
     )
+
+
+@patch("src.extract_embeddings.httpx.Client")
+def test_remote_embedding_function(mock_client):
+    mock_client.return_value.post.return_value.json.return_value = {
+        "embeddings": [[0.1, 0.2]]
+    }
+
+    embedding_function = RemoteEmbeddingFunction("http://localhost:8001")
+    embeddings = embedding_function(["exemplo de resumo de tese"])
+
+    mock_client.return_value.post.assert_called_once_with(
+        "/embed", json={"texts": ["exemplo de resumo de tese"]}
+    )
+    assert np.asarray(embeddings) == pytest.approx(np.array([[0.1, 0.2]]))
+
+
+@patch("src.extract_embeddings.httpx.HTTPTransport")
+@patch("src.extract_embeddings.httpx.Client")
+def test_remote_embedding_function_ignores_blank_socket(
+    mock_client, mock_transport
+):
+    RemoteEmbeddingFunction("http://localhost:8001", socket_path="")
+
+    mock_transport.assert_called_once_with(uds=None, retries=2)
+
+
+@patch("src.extract_embeddings.chromadb.PersistentClient")
+def test_create_configured_chroma_client_persistent(
+    mock_persistent_client, mock_settings, mock_chroma_http_client
+):
+    mock_settings.CHROMA_CLIENT_MODE = "persistent"
+    mock_settings.CHROMA_PERSIST_PATH = "data/chroma"
+
+    client = create_configured_chroma_client.fn()
+
+    mock_persistent_client.assert_called_once_with(path="data/chroma")
+    mock_chroma_http_client.assert_not_called()
+    assert client == mock_persistent_client.return_value
+
+
+def test_assign_shards():
+    df = pd.DataFrame({"id": ["a", "b", "c", "d"], "AN_BASE": [2020] * 4})
+
+    by_year = assign_shards(df, "year", n_shards=4)
+    by_hash = assign_shards(df, "hash", n_shards=3)
+
+    assert by_year.tolist() == ["2020"] * 4
+    assert set(by_hash) <= {"0", "1", "2"}
+    assert by_hash.tolist() == assign_shards(df, "hash", 3).tolist()
+
+
+def test_assign_shards_by_year_span():
+    df = pd.DataFrame({"id": ["a", "b", "c"], "AN_BASE": [2019, 2020, 2021]})
+
+    assert assign_shards(df, "year", 4, span=2).tolist() == [
+        "2018",
+        "2020",
+        "2020",
+    ]
+
+
+def test_index_shard_writes_and_reuses_checkpoint(tmp_path):
+    path = write_arrow(
+        pd.DataFrame(
+            {
+                "id": ["a", "b", "c"],
+                "AN_BASE": [2020, 2021, 2020],
+                "DS_RESUMO": ["r1", "r2", "r3"],
+                "SHARD": ["0", "1", "0"],
+            }
+        ),
+        str(tmp_path / "shards.arrow"),
+    )
+    collection = MagicMock()
+    collection.get.return_value = {"ids": ["a", "c"]}
+
+    with patch("src.extract_embeddings.add_documents_to_collection") as add:
+        report = index_shard.fn(
+            MagicMock(), collection, path, "0", str(tmp_path)
+        )
+        again = index_shard.fn(
+            MagicMock(), collection, path, "0", str(tmp_path)
+        )
+
+    add.fn.assert_called_once()
+    kwargs = add.fn.call_args.kwargs
+    assert kwargs["ids"] == ["a", "c"]
+    assert kwargs["metadatas"] == [
+        {"id": "a", "AN_BASE": 2020},
+        {"id": "c", "AN_BASE": 2020},
+    ]
+    assert report["count"] == again["count"] == 2  # noqa: PLR2004
+    assert (tmp_path / "shard-0.json").exists()
+
+
+def test_collection_metadatas_omit_missing_values():
+    df = apply_schema(
+        pd.DataFrame(
+            {
+                "id": ["a", "b"],
+                "AN_BASE": [2020, 2021],
+                "NM_REGIAO": ["SUL", None],
+                "NM_PRODUCAO": [None, "Título"],
+                "DS_RESUMO": ["r1", "r2"],
+            }
+        )
+    )
+
+    metadatas = collection_metadatas(df)
+
+    assert metadatas == [
+        {"id": "a", "AN_BASE": 2020, "NM_REGIAO": "SUL"},
+        {"id": "b", "AN_BASE": 2021, "NM_PRODUCAO": "Título"},
+    ]
+    for metadata in metadatas:
+        validate_metadata(metadata)
+
+
+def test_index_shard_fails_when_documents_are_missing(tmp_path):
+    path = write_arrow(
+        pd.DataFrame({"id": ["a"], "DS_RESUMO": ["r1"], "SHARD": ["0"]}),
+        str(tmp_path / "shards.arrow"),
+    )
+    collection = MagicMock()
+    collection.get.return_value = {"ids": []}
+
+    with (
+        patch("src.extract_embeddings.add_documents_to_collection"),
+        pytest.raises(ValueError, match="0 of 1"),
+    ):
+        index_shard.fn(MagicMock(), collection, path, "0", str(tmp_path))
+    assert not (tmp_path / "shard-0.json").exists()
+
+
+def test_verify_shards():
+    collection = MagicMock()
+    collection.count.return_value = 3
+    reports = [
+        {"shard": "0", "count": 2, "docs_per_second": 10.0},
+        {"shard": "1", "count": 1, "docs_per_second": 5.0},
+    ]
+
+    verify_shards.fn(collection, reports, expected_count=3)
+    with pytest.raises(ValueError, match="Shards indexed 3"):
+        verify_shards.fn(collection, reports, expected_count=4)
+
+
+@patch("src.extract_embeddings.resolve_alias")
+@patch("src.extract_embeddings.list_versions")
+def test_resume_or_create_version(mock_versions, mock_alias, tmp_path):
+    state_path = str(tmp_path / "version.json")
+    mock_versions.return_value = [1, 2]
+    mock_alias.return_value = {"collection": "thesis_capes_v2"}
+
+    assert resume_or_create_version(MagicMock(), state_path) == 3  # noqa: PLR2004
+
+    # A versão em construção é retomada enquanto não for publicada.
+    mock_versions.return_value = [1, 2, 3]
+    assert resume_or_create_version(MagicMock(), state_path) == 3  # noqa: PLR2004
+
+    mock_alias.return_value = {"collection": "thesis_capes_v3"}
+    assert resume_or_create_version(MagicMock(), state_path) == 4  # noqa: PLR2004
@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+
+from src.facets import FacetIndex
+
+
+@pytest.fixture
+def facet_index():
+    df = pd.DataFrame(
+        {
+            "id": ["a", "b", "c", "d", "e"],
+            "AN_BASE": [2019, 2020, 2020, 2021, 2022],
+            "SG_UF_IES": ["RJ", "SP", "RJ", "MA", "SP"],
+            "NM_GRAU_ACADEMICO": [
+                "MESTRADO",
+                "DOUTORADO",
+                "MESTRADO",
+                "MESTRADO",
+                None,
+            ],
+            "SG_ENTIDADE_ENSINO": ["UFRJ", "USP", "UERJ", "UFMA", "USP"],
+        }
+    )
+    return FacetIndex.from_dataframe(df)
+
+
+def candidates(facet_index, where):
+    bitmap, exact = facet_index.resolve(where)
+    return sorted(facet_index.candidate_ids(bitmap)), exact
+
+
+def test_resolve_without_filters(facet_index):
+    assert candidates(facet_index, None) == (["a", "b", "c", "d", "e"], True)
+
+
+@pytest.mark.parametrize(
+    ("where", "expected"),
+    [
+        ({"AN_BASE": {"$eq": 2020}}, ["b", "c"]),
+        ({"AN_BASE": 2020}, ["b", "c"]),
+        ({"AN_BASE": {"$gt": 2020}}, ["d", "e"]),
+        ({"AN_BASE": {"$lte": 2020}}, ["a", "b", "c"]),
+        ({"SG_UF_IES": {"$ne": "RJ"}}, ["b", "d", "e"]),
+        ({"SG_UF_IES": {"$in": ["MA", "SP"]}}, ["b", "d", "e"]),
+        ({"SG_UF_IES": {"$nin": ["MA", "SP"]}}, ["a", "c"]),
+        (
+            {"$and": [{"SG_UF_IES": "RJ"}, {"AN_BASE": {"$gt": 2019}}]},
+            ["c"],
+        ),
+        (
+            {"$or": [{"SG_UF_IES": "MA"}, {"NM_GRAU_ACADEMICO": "DOUTORADO"}]},
+            ["b", "d"],
+        ),
+        ({"AN_BASE": {"$eq": 1999}}, []),
+    ],
+)
+def test_resolve_facet_filters(facet_index, where, expected):
+    assert candidates(facet_index, where) == (expected, True)
+
+
+def test_resolve_does_not_change_later_queries(facet_index):
+    candidates(facet_index, {"SG_UF_IES": "RJ"})
+    candidates(facet_index, {"$or": [{"SG_UF_IES": "MA"}]})
+
+    assert candidates(facet_index, None) == (["a", "b", "c", "d", "e"], True)
+    assert candidates(facet_index, {"SG_UF_IES": {"$ne": "RJ"}}) == (
+        ["b", "d", "e"],
+        True,
+    )
+
+
+def test_resolve_non_facet_field_is_superset(facet_index):
+    where = {"$and": [{"SG_UF_IES": "SP"}, {"SG_ENTIDADE_ENSINO": "USP"}]}
+    assert candidates(facet_index, where) == (["b", "e"], False)
+
+
+def test_counts(facet_index):
+    counts = facet_index.counts({"SG_UF_IES": "SP"})
+    assert counts["AN_BASE"] == {2020: 1, 2022: 1}
+    assert counts["NM_GRAU_ACADEMICO"] == {"DOUTORADO": 1}
+    assert "SG_ENTIDADE_ENSINO" not in counts
+
+
+def test_save_and_load(facet_index, tmp_path):
+    path = str(tmp_path / "facets.npz")
+    facet_index.save(path)
+    loaded = FacetIndex.load(path)
+
+    assert loaded.ids.tolist() == facet_index.ids.tolist()
+    assert candidates(loaded, {"AN_BASE": {"$gte": 2021}}) == (
+        ["d", "e"],
+        True,
+    )
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from prometheus_client import REGISTRY
+
+from src.metrics import (
+    payload_size,
+    push_metrics,
+    record_cache,
+    record_throughput,
+    record_tokens,
+    stage,
+    timed,
+)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_stage_records_latency_even_on_error():
+    before = sample("buscador_stage_duration_seconds_count", stage="teste")
+
+    with stage("teste"):
+        pass
+    with pytest.raises(ValueError, match="falhou"), stage("teste"):
+        raise ValueError("falhou")
+
+    after = sample("buscador_stage_duration_seconds_count", stage="teste")
+    assert after == before + 2
+
+
+def test_timed_decorator():
+    @timed("decorada")
+    def join(a, b):
+        return a + b
+
+    before = sample("buscador_stage_duration_seconds_count", stage="decorada")
+    assert join("a", "b") == "ab"
+    after = sample("buscador_stage_duration_seconds_count", stage="decorada")
+    assert after == before + 1
+
+
+def test_payload_size():
+    assert payload_size(b"abc") == len(b"abc")
+    assert payload_size("ç") == len("ç".encode())
+    assert payload_size([{"a": 1}]) == len('[{"a": 1}]')
+
+
+def test_record_tokens_ignores_missing_usage():
+    before = sample("buscador_llm_tokens_total", model="m", kind="prompt")
+
+    record_tokens("m", None)
+    record_tokens("m", SimpleNamespace(prompt_tokens=10, completion_tokens=4))
+
+    assert sample("buscador_llm_tokens_total", model="m", kind="prompt") == (
+        before + 10
+    )
+
+
+def test_record_cache_skips_zero_counts():
+    before = sample("buscador_cache_events_total", cache="c", result="hit")
+
+    record_cache("c", "hit", 0)
+    record_cache("c", "hit", 2)
+
+    after = sample("buscador_cache_events_total", cache="c", result="hit")
+    assert after == before + 2
+
+
+def test_record_throughput():
+    rate = record_throughput("tarefa", "rows", 100, 2)
+
+    assert rate == 100 / 2
+    assert (
+        sample("buscador_pipeline_throughput", task="tarefa", unit="rows")
+        == rate
+    )
+
+
+@mock.patch("src.metrics.push_to_gateway")
+def test_push_metrics_only_when_configured(mock_push, monkeypatch):
+    monkeypatch.delenv("PROMETHEUS_PUSHGATEWAY_URL", raising=False)
+    push_metrics("job")
+    mock_push.assert_not_called()
+
+    monkeypatch.setenv("PROMETHEUS_PUSHGATEWAY_URL", "localhost:9091")
+    push_metrics("job")
+    mock_push.assert_called_once_with(
+        "localhost:9091", job="job", registry=REGISTRY
+    )
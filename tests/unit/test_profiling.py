@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+import tracemalloc
+from unittest import mock
+
+import pytest
+
+from src.profiling import profile, profiled, profiling_enabled
+
+
+@pytest.fixture
+def profile_dir(tmp_path):
+    with mock.patch("src.profiling.PROFILE_DIR", str(tmp_path)):
+        yield tmp_path
+
+
+@pytest.mark.parametrize(
+    ("value", "name", "expected"),
+    [
+        ("", "search", False),
+        ("0", "search", False),
+        ("1", "search", True),
+        ("all", "preprocess_thesis_data", True),
+        ("search, preprocess_thesis_data", "preprocess_thesis_data", True),
+        ("search", "add_documents_to_collection", False),
+    ],
+)
+def test_profiling_enabled(value, name, expected):
+    with mock.patch.dict(os.environ, {"PROFILING": value}):
+        assert profiling_enabled(name) is expected
+
+
+def test_profile_disabled_yields_none(profile_dir):
+    with profile("search", enabled=False) as report:
+        sum(range(100))
+
+    assert report is None
+    assert not list(profile_dir.iterdir())
+
+
+def test_profile_saves_cpu_and_memory_reports(profile_dir):
+    with profile("search", enabled=True) as report:
+        data = [str(i) * 10 for i in range(10000)]
+
+    assert len(data) == 10000  # noqa: PLR2004
+    directory = report["directory"]
+    assert os.path.dirname(directory) == str(profile_dir)
+    assert {"cpu.txt", "memory.txt", "summary.json"} <= set(
+        os.listdir(directory)
+    )
+    assert report["peak_memory_bytes"] > 0
+    with open(os.path.join(directory, "summary.json"), encoding="utf-8") as f:
+        summary = json.load(f)
+    assert summary["name"] == "search"
+    assert summary["wall_seconds"] == report["wall_seconds"]
+
+
+def test_nested_profiles_only_open_outer(profile_dir):
+    with (
+        profile("outer", enabled=True),
+        profile("inner", enabled=True) as inner,
+    ):
+        pass
+
+    assert inner is None
+    assert [path.name.split("-")[0] for path in profile_dir.iterdir()] == [
+        "outer"
+    ]
+
+
+def test_overlapping_profiles_in_threads(profile_dir):
+    worker_started, first_finished = threading.Event(), threading.Event()
+    reports = {}
+
+    def worker():
+        with profile("worker", enabled=True) as report:
+            worker_started.set()
+            first_finished.wait(timeout=10)
+            data = [str(i) for i in range(1000)]
+        reports["worker"] = (report, len(data))
+
+    thread = threading.Thread(target=worker)
+    # O primeiro perfil liga o tracemalloc e termina antes do segundo.
+    with profile("first", enabled=True) as first:
+        thread.start()
+        worker_started.wait(timeout=10)
+    first_finished.set()
+    thread.join(timeout=10)
+
+    report, size = reports["worker"]
+    assert size == 1000  # noqa: PLR2004
+    assert "directory" in first
+    assert report["peak_memory_bytes"] > 0
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_errors_do_not_replace_result(profile_dir):
+    @profiled(name="search")
+    def search():
+        return "resultado"
+
+    with (
+        mock.patch.dict(os.environ, {"PROFILING": "1"}),
+        mock.patch(
+            "src.profiling._save_profile", side_effect=RuntimeError("falha")
+        ),
+    ):
+        assert search() == "resultado"
+
+
+def test_profiled_follows_environment(profile_dir):
+    @profiled
+    def preprocess(value):
+        return value * 2
+
+    with mock.patch.dict(os.environ, {"PROFILING": "other"}):
+        assert preprocess(2) == 4  # noqa: PLR2004
+    assert not list(profile_dir.iterdir())
+
+    with mock.patch.dict(os.environ, {"PROFILING": "preprocess"}):
+        assert preprocess(2) == 4  # noqa: PLR2004
+    assert len(list(profile_dir.iterdir())) == 1
+
+
+def test_profile_logs_to_mlflow_when_configured(profile_dir):
+    mlflow = mock.MagicMock()
+    mlflow.active_run.return_value = None
+    with (
+        mock.patch.dict(os.environ, {"MLFLOW_TRACKING_URI": "http://mlflow"}),
+        mock.patch.dict("sys.modules", {"mlflow": mlflow}),
+        profile("search", enabled=True) as report,
+    ):
+        pass
+
+    mlflow.set_experiment.assert_called_once_with("profiling")
+    mlflow.log_artifacts.assert_called_once_with(
+        report["directory"],
+        artifact_path=f"profiles/{os.path.basename(report['directory'])}",
+    )
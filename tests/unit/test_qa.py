@@ -3,7 +3,9 @@ from unittest import mock
 import pytest
 
 from src.web.mypages.rag.qa import (
+    fetch_abstracts_with_api,
     get_agent_response,
+    load_facet_index,
     load_prompts,
     search_documents,
 )
@@ -71,3 +73,60 @@ def test_get_agent_response_invalid_json():
         get_agent_response(
             text="user question", prompt="system prompt", client=client
         )
+
+
+def test_search_documents_skips_query_without_facet_candidates():
+    collection = mock.Mock()
+    facet_index = mock.Mock()
+    facet_index.resolve.return_value = ("bitmap", True)
+    facet_index.count.return_value = 0
+
+    results = search_documents(
+        collection,
+        query="test_query",
+        where={"AN_BASE": {"$eq": 1999}},
+        facet_index=facet_index,
+    )
+
+    assert results == []
+    collection.query.assert_not_called()
+
+
+def test_search_documents_limits_results_to_facet_candidates():
+    collection = mock.Mock()
+    collection.query.return_value = {"metadatas": [[{"id": 1}]]}
+    facet_index = mock.Mock()
+    facet_index.resolve.return_value = ("bitmap", True)
+    facet_index.count.return_value = 3
+
+    search_documents(
+        collection,
+        query="test_query",
+        where={"AN_BASE": {"$eq": 2020}},
+        facet_index=facet_index,
+    )
+
+    collection.query.assert_called_once_with(
+        query_texts=["test_query"],
+        where={"AN_BASE": {"$eq": 2020}},
+        n_results=3,
+        include=["metadatas", "distances"],
+    )
+
+
+@mock.patch("src.web.mypages.rag.qa.load_collection")
+def test_load_facet_index_skips_collection_with_api(mock_load_collection):
+    with mock.patch("src.config.settings.SEARCH_API_URL", "http://api"):
+        assert load_facet_index() is None
+    mock_load_collection.assert_not_called()
+
+
+@mock.patch("src.web.mypages.rag.qa.requests.post")
+def test_fetch_abstracts_with_api(mock_post):
+    mock_post.return_value.json.return_value = {"abstracts": {"a": "resumo"}}
+
+    with mock.patch("src.config.settings.SEARCH_API_URL", "http://api/"):
+        assert fetch_abstracts_with_api(["a"]) == {"a": "resumo"}
+
+    assert mock_post.call_args.args == ("http://api/documents",)
+    assert mock_post.call_args.kwargs["json"] == {"ids": ["a"]}
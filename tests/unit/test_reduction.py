@@ -0,0 +1,94 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from src.reduction import (
+    EmbeddingReducer,
+    ReducedEmbeddingFunction,
+    fit_on_sample,
+    reduction_recall,
+)
+
+N_COMPONENTS = 8
+
+
+def low_rank_embeddings(n_rows=500, dim=32, rank=4, seed=0):
+    rng = np.random.default_rng(seed)
+    basis = rng.normal(size=(rank, dim))
+    return (rng.normal(size=(n_rows, rank)) @ basis).astype(np.float32)
+
+
+def test_pca_keeps_neighbors_of_low_rank_data():
+    embeddings = low_rank_embeddings()
+
+    reducer = EmbeddingReducer.fit(embeddings[50:], n_components=N_COMPONENTS)
+
+    assert reducer.n_components == N_COMPONENTS
+    assert reducer.transform(embeddings).shape == (500, N_COMPONENTS)
+    assert reduction_recall(
+        embeddings[50:], embeddings[:50], reducer, k=5
+    ) == pytest.approx(1.0)
+
+
+def test_random_projection_shapes():
+    embeddings = low_rank_embeddings()
+
+    reducer = EmbeddingReducer.fit(
+        embeddings, n_components=16, method="random_projection"
+    )
+
+    assert reducer.transform(embeddings[:3]).shape == (3, 16)
+    np.testing.assert_array_equal(reducer.mean, np.zeros(32))
+
+
+@pytest.mark.parametrize(
+    ("n_components", "method", "message"),
+    [(N_COMPONENTS, "svd", "Unknown"), (32, "pca", "smaller")],
+)
+def test_fit_rejects_invalid_arguments(n_components, method, message):
+    with pytest.raises(ValueError, match=message):
+        EmbeddingReducer.fit(
+            low_rank_embeddings(), n_components, method=method
+        )
+
+
+def test_save_and_load(tmp_path):
+    reducer = EmbeddingReducer.fit(
+        low_rank_embeddings(), n_components=N_COMPONENTS
+    )
+    path = str(tmp_path / "reducer.npz")
+
+    reducer.save(path)
+    loaded = EmbeddingReducer.load(path)
+
+    assert loaded.method == "pca"
+    np.testing.assert_allclose(loaded.components, reducer.components)
+    np.testing.assert_allclose(loaded.mean, reducer.mean)
+
+
+def test_reduced_embedding_function():
+    embeddings = low_rank_embeddings(n_rows=10)
+    reducer = EmbeddingReducer.fit(embeddings, n_components=4)
+
+    class FixedEmbeddingFunction:
+        def __call__(self, documents):
+            return embeddings[: len(documents)]
+
+    function = ReducedEmbeddingFunction(FixedEmbeddingFunction(), reducer)
+    result = function(["a", "b"])
+
+    np.testing.assert_allclose(
+        np.asarray(result), reducer.transform(embeddings[:2]), rtol=1e-5
+    )
+
+
+def test_fit_on_sample_reports_recall():
+    with patch("src.reduction.logger") as logger:
+        reducer, recall = fit_on_sample(
+            low_rank_embeddings(), n_components=N_COMPONENTS, k=5
+        )
+
+    assert reducer.n_components == N_COMPONENTS
+    assert recall == pytest.approx(1.0)
+    logger.info.assert_called_once()
@@ -0,0 +1,129 @@
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from src.rerank import (
+    CrossEncoderReranker,
+    FusionReranker,
+    bm25_scores,
+    candidate_count,
+    rerank,
+    tokenize,
+)
+from src.retrieval import select_context
+
+DOCUMENTS = [
+    {"id": "a", "NM_PRODUCAO": "Economia regional", "DS_RESUMO": "Renda."},
+    {"id": "b", "NM_PRODUCAO": "Festas populares", "DS_RESUMO": "Dança."},
+    {
+        "id": "c",
+        "NM_PRODUCAO": "O Bumba meu boi no Maranhão",
+        "DS_RESUMO": "Estudo sobre o bumba meu boi e a cultura popular.",
+    },
+]
+
+
+def test_tokenize_removes_accents_and_case():
+    assert tokenize("Maranhão, São Luís!") == ["maranhao", "sao", "luis"]
+
+
+def test_bm25_scores_favor_matching_texts():
+    scores = bm25_scores("bumba boi", ["bumba meu boi", "economia", ""])
+
+    assert scores[0] > 0
+    assert scores[1] == scores[2] == 0
+
+
+def test_fusion_reranker_promotes_lexical_matches():
+    scores = FusionReranker().score("bumba meu boi", DOCUMENTS)
+
+    assert np.argmax(scores) == 2  # noqa: PLR2004
+
+
+def test_rerank_keeps_top_k_with_scores():
+    reranker = mock.Mock()
+    reranker.score.return_value = np.array([0.1, 0.9, 0.5])
+
+    result = rerank("pergunta", DOCUMENTS, reranker, top_k=2)
+
+    assert [doc["id"] for doc in result] == ["b", "c"]
+    assert result[0]["rerank_score"] == pytest.approx(0.9)
+    assert "rerank_score" not in DOCUMENTS[1]
+
+
+def test_rerank_without_documents():
+    reranker = mock.Mock()
+
+    assert rerank("pergunta", [], reranker, top_k=5) == []
+    reranker.score.assert_not_called()
+
+
+def test_cross_encoder_scores_pairs_in_batches():
+    model = mock.Mock()
+    model.predict.return_value = [0.2, 0.8]
+    with mock.patch.object(
+        CrossEncoderReranker, "_load_model", return_value=model
+    ):
+        reranker = CrossEncoderReranker("modelo", batch_size=16)
+
+    scores = reranker.score("boi", DOCUMENTS[:2])
+
+    np.testing.assert_allclose(scores, [0.2, 0.8])
+    pairs = model.predict.call_args.args[0]
+    assert pairs == [
+        ("boi", "Economia regional Renda."),
+        ("boi", "Festas populares Dança."),
+    ]
+    assert model.predict.call_args.kwargs["batch_size"] == 16  # noqa: PLR2004
+
+
+def test_candidate_count():
+    assert candidate_count(20, None) == 20  # noqa: PLR2004
+    with mock.patch("src.rerank.settings") as settings:
+        settings.RERANK_CANDIDATES = 100
+        assert candidate_count(20, FusionReranker()) == 100  # noqa: PLR2004
+
+
+def test_select_context_reranks_before_loading_abstracts():
+    collection = mock.Mock()
+    collection.get.return_value = {"ids": ["b"], "documents": ["resumo b"]}
+    documents = [
+        {"id": "a", "NM_PRODUCAO": "Economia e renda"},
+        {"id": "b", "NM_PRODUCAO": "O bumba meu boi"},
+    ]
+
+    result = select_context(
+        collection, "bumba meu boi", documents, FusionReranker(), top_k=1
+    )
+
+    assert [doc["id"] for doc in result] == ["b"]
+    assert result[0]["DS_RESUMO"] == "resumo b"
+    collection.get.assert_called_once_with(ids=["b"], include=["documents"])
+
+
+def test_select_context_loads_abstracts_before_cross_encoder():
+    collection = mock.Mock()
+    collection.get.return_value = {
+        "ids": ["a", "b"],
+        "documents": ["economia e renda", "bumba meu boi"],
+    }
+    documents = [{"id": "a"}, {"id": "b"}]
+    model = mock.Mock()
+    model.predict.side_effect = lambda pairs, **_: [
+        float("boi" in text) for _, text in pairs
+    ]
+    with mock.patch.object(
+        CrossEncoderReranker, "_load_model", return_value=model
+    ):
+        reranker = CrossEncoderReranker("modelo")
+
+    result = select_context(
+        collection, "bumba meu boi", documents, reranker, top_k=1
+    )
+
+    assert [doc["id"] for doc in result] == ["b"]
+    assert result[0]["DS_RESUMO"] == "bumba meu boi"
+    collection.get.assert_called_once_with(
+        ids=["a", "b"], include=["documents"]
+    )
@@ -0,0 +1,241 @@
+import asyncio
+import threading
+import time
+from unittest import mock
+
+import httpx
+import pytest
+
+from src.resilience import (
+    Backend,
+    CircuitBreaker,
+    CircuitOpenError,
+    SingleFlight,
+    is_retryable,
+)
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def make_backend(**kwargs):
+    options = {
+        "max_concurrency": 2,
+        "retry_attempts": 3,
+        "retry_max_wait": 0,
+        "failure_threshold": 2,
+        "reset_timeout": 60,
+    }
+    options.update(kwargs)
+    return Backend("teste", **options)
+
+
+@pytest.mark.parametrize(
+    ("exc", "expected"),
+    [
+        (StatusError(429), True),
+        (StatusError(503), True),
+        (StatusError(400), False),
+        (httpx.ConnectError("recusada"), True),
+        (TimeoutError(), True),
+        (ValueError("JSON inválido"), False),
+        (CircuitOpenError("aberto"), False),
+    ],
+)
+def test_is_retryable(exc, expected):
+    assert is_retryable(exc) is expected
+
+
+def test_backend_retries_transient_errors():
+    fn = mock.Mock(side_effect=[StatusError(429), StatusError(502), "ok"])
+
+    assert make_backend().call(None, fn) == "ok"
+    assert fn.call_count == 3  # noqa: PLR2004
+
+
+def test_backend_does_not_retry_client_errors():
+    fn = mock.Mock(side_effect=StatusError(400))
+
+    with pytest.raises(StatusError):
+        make_backend().call(None, fn)
+    fn.assert_called_once()
+
+
+def test_circuit_opens_after_failures_and_fails_fast():
+    backend = make_backend(retry_attempts=1)
+    fn = mock.Mock(side_effect=StatusError(503))
+
+    for _ in range(2):
+        with pytest.raises(StatusError):
+            backend.call(None, fn)
+    with pytest.raises(CircuitOpenError):
+        backend.call(None, fn)
+
+    assert fn.call_count == 2  # noqa: PLR2004
+    assert backend.breaker.state == "open"
+
+
+def test_circuit_half_open_probe_closes_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    time.sleep(0.02)
+    assert breaker.allow()
+    assert not breaker.allow()  # apenas uma chamada de teste por vez
+    breaker.record_success()
+
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_single_flight_coalesces_identical_calls():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "resultado"
+
+    results = []
+
+    def leader():
+        results.append(single_flight.do("chave", slow))
+
+    def follower():
+        results.append(single_flight.do("chave", mock.Mock()))
+
+    threads = [threading.Thread(target=leader)]
+    threads[0].start()
+    started.wait(5)
+    threads += [threading.Thread(target=follower) for _ in range(3)]
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert (
+        sorted(results) == [("resultado", False)] + [("resultado", True)] * 3
+    )
+
+
+def test_single_flight_follower_takes_over_a_cancelled_call():
+    single_flight = SingleFlight()
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "resultado"
+
+    async def run():
+        leader = asyncio.ensure_future(single_flight.ado("chave", slow))
+        await asyncio.sleep(0.01)
+        followers = [
+            asyncio.ensure_future(single_flight.ado("chave", slow))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+
+    results = asyncio.run(run())
+
+    assert calls == [1, 1]
+    assert (
+        sorted(results) == [("resultado", False)] + [("resultado", True)] * 2
+    )
+
+
+def test_backend_limits_concurrency():
+    backend = make_backend(max_concurrency=2)
+    lock = threading.Lock()
+    running, peak = 0, 0
+
+    def call():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+
+    threads = [
+        threading.Thread(target=backend.call, args=(None, call))
+        for _ in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert peak == 2  # noqa: PLR2004
+
+
+def test_async_backend_coalesces_and_retries():
+    backend = make_backend()
+    calls = []
+
+    async def completion():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise StatusError(429)
+        return "resposta"
+
+    async def burst():
+        return await asyncio.gather(
+            *(backend.acall("pergunta", completion) for _ in range(5))
+        )
+
+    assert asyncio.run(burst()) == ["resposta"] * 5
+    assert calls == [1, 1]
+
+
+def test_cancelled_half_open_probe_releases_circuit():
+    backend = make_backend(
+        retry_attempts=1, failure_threshold=1, reset_timeout=0.01
+    )
+    with pytest.raises(StatusError):
+        backend.call(None, mock.Mock(side_effect=StatusError(503)))
+    time.sleep(0.02)
+
+    async def probe():
+        task = asyncio.ensure_future(
+            backend.acall(None, lambda: asyncio.sleep(10))
+        )
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(probe())
+    assert backend.call(None, lambda: "ok") == "ok"
+    assert backend.breaker.state == "closed"
+
+
+def test_interrupted_half_open_probe_releases_circuit():
+    backend = make_backend(
+        retry_attempts=1, failure_threshold=1, reset_timeout=0.01
+    )
+    with pytest.raises(StatusError):
+        backend.call(None, mock.Mock(side_effect=StatusError(503)))
+    time.sleep(0.02)
+
+    with pytest.raises(KeyboardInterrupt):
+        backend.call(None, mock.Mock(side_effect=KeyboardInterrupt))
+
+    assert backend.call(None, lambda: "ok") == "ok"
@@ -0,0 +1,135 @@
+from unittest import mock
+
+from src.retrieval import (
+    attach_abstracts,
+    search_documents,
+    search_documents_batch,
+)
+
+
+def test_search_documents_batch_groups_by_where():
+    collection = mock.Mock()
+    collection.query.side_effect = [
+        {"metadatas": [[{"id": 1}], [{"id": 3}]]},
+        {"metadatas": [[{"id": 2}]]},
+    ]
+    queries = [
+        {"query": "A", "where": {"AN_BASE": {"$eq": 2020}}},
+        {"query": "B"},
+        {"query": "C", "where": {"AN_BASE": {"$eq": 2020}}},
+    ]
+
+    results = search_documents_batch(collection, queries, n_results=5)
+
+    assert results == [[{"id": 1}], [{"id": 2}], [{"id": 3}]]
+    collection.query.assert_any_call(
+        query_texts=["A", "C"],
+        where={"AN_BASE": {"$eq": 2020}},
+        n_results=5,
+        include=["metadatas", "distances"],
+    )
+    collection.query.assert_any_call(
+        query_texts=["B"],
+        where=None,
+        n_results=5,
+        include=["metadatas", "distances"],
+    )
+
+
+def test_search_documents_batch_splits_batches():
+    collection = mock.Mock()
+    collection.query.side_effect = [
+        {"metadatas": [[{"id": 1}], [{"id": 2}]]},
+        {"metadatas": [[{"id": 3}]]},
+    ]
+    queries = [{"query": q} for q in ("A", "B", "C")]
+
+    results = search_documents_batch(collection, queries, batch_size=2)
+
+    assert results == [[{"id": 1}], [{"id": 2}], [{"id": 3}]]
+    assert [
+        call.kwargs["query_texts"] for call in collection.query.call_args_list
+    ] == [["A", "B"], ["C"]]
+
+
+def test_search_documents_with_query_encoder():
+    collection = mock.Mock()
+    collection.query.return_value = {"metadatas": [[{"id": 1}]]}
+    query_encoder = mock.Mock()
+    query_encoder.encode.return_value = [[0.1, 0.2]]
+
+    results = search_documents(
+        collection, query="test_query", query_encoder=query_encoder
+    )
+
+    assert results == [{"id": 1}]
+    query_encoder.encode.assert_called_once_with(["test_query"])
+    collection.query.assert_called_once_with(
+        query_embeddings=[[0.1, 0.2]],
+        where=None,
+        n_results=20,
+        include=["metadatas", "distances"],
+    )
+
+
+def test_search_documents_uses_result_cache():
+    collection = mock.Mock()
+    collection.query.return_value = {"metadatas": [[{"id": 1}]]}
+    result_cache = mock.Mock()
+    result_cache.index_version.return_value = "v1"
+    result_cache.make_key.return_value = "key"
+    result_cache.get.side_effect = [None, [{"id": 1}]]
+
+    first = search_documents(
+        collection, query="test_query", result_cache=result_cache
+    )
+    second = search_documents(
+        collection, query="test_query", result_cache=result_cache
+    )
+
+    assert first == second == [{"id": 1}]
+    collection.query.assert_called_once()
+    result_cache.make_key.assert_called_with("test_query", None, 20, "v1")
+    result_cache.set.assert_called_once_with("key", [{"id": 1}])
+
+
+def test_search_documents_adds_distances():
+    collection = mock.Mock()
+    collection.query.return_value = {
+        "metadatas": [[{"id": "a"}, {"id": "b"}]],
+        "distances": [[0.1, 0.3]],
+    }
+
+    results = search_documents(collection, query="test_query")
+
+    assert results == [
+        {"id": "a", "distance": 0.1},
+        {"id": "b", "distance": 0.3},
+    ]
+
+
+def test_attach_abstracts_fetches_only_missing():
+    collection = mock.Mock()
+    collection.get.return_value = {"ids": ["b"], "documents": ["resumo b"]}
+    documents = [
+        {"id": "a", "DS_RESUMO": "resumo a"},
+        {"id": "b"},
+        {"id": "c"},
+    ]
+
+    result = attach_abstracts(collection, documents, ids=["a", "b"])
+
+    collection.get.assert_called_once_with(ids=["b"], include=["documents"])
+    assert result == [
+        {"id": "a", "DS_RESUMO": "resumo a"},
+        {"id": "b", "DS_RESUMO": "resumo b"},
+        {"id": "c"},
+    ]
+    assert documents[1] == {"id": "b"}
+
+
+def test_attach_abstracts_keeps_documents_on_error():
+    collection = mock.Mock()
+    collection.get.side_effect = RuntimeError("falhou")
+
+    assert attach_abstracts(collection, [{"id": "a"}]) == [{"id": "a"}]
@@ -0,0 +1,183 @@
+import chromadb
+import pytest
+
+from src.collection_alias import (
+    LiveCollection,
+    garbage_collect,
+    list_versions,
+    resolve_alias,
+    switch_alias,
+)
+from src.routing import (
+    ShardedCollection,
+    get_executor,
+    merge_results,
+    route,
+    shard_collection_name,
+    shard_start,
+)
+
+STARTS = [2018, 2020, 2022]
+
+
+@pytest.fixture
+def chroma_client(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    yield client
+    client.clear_system_cache()
+
+
+@pytest.fixture
+def sharded(chroma_client):
+    shards = {}
+    for start in STARTS:
+        collection = chroma_client.create_collection(
+            shard_collection_name("thesis_capes_v1", start),
+            embedding_function=None,
+        )
+        collection.add(
+            ids=[f"{start}", f"{start + 1}"],
+            embeddings=[[float(start - 2018), 0.0], [start - 2017.5, 0.0]],
+            metadatas=[{"AN_BASE": start}, {"AN_BASE": start + 1}],
+            documents=[f"resumo {start}", f"resumo {start + 1}"],
+        )
+        shards[start] = collection
+    return ShardedCollection(
+        "thesis_capes_v1",
+        shards,
+        span=2,
+        embedding_function=lambda texts: [[0.0, 0.0] for _ in texts],
+    )
+
+
+def test_shard_start():
+    assert shard_start(2021, 2) == 2020  # noqa: PLR2004
+    assert shard_start(2021, 1) == 2021  # noqa: PLR2004
+
+
+@pytest.mark.parametrize(
+    ("where", "expected"),
+    [
+        (None, STARTS),
+        ({"AN_BASE": 2021}, [2020]),
+        ({"AN_BASE": {"$eq": "2019"}}, [2018]),
+        ({"AN_BASE": {"$gt": 2021}}, [2022]),
+        ({"AN_BASE": {"$gte": 2019, "$lt": 2021}}, [2018, 2020]),
+        ({"AN_BASE": {"$in": [2018, 2023]}}, [2018, 2022]),
+        ({"AN_BASE": {"$ne": 2019}}, STARTS),
+        ({"AN_BASE": {"$eq": 2030}}, []),
+        (
+            {
+                "$or": [
+                    {"AN_BASE": {"$lt": 2019}},
+                    {"AN_BASE": {"$eq": 2023}},
+                ]
+            },
+            [2018, 2022],
+        ),
+        (
+            {
+                "$and": [
+                    {"SG_UF_IES": "MA"},
+                    {"AN_BASE": {"$gte": 2020}},
+                ]
+            },
+            [2020, 2022],
+        ),
+        ({"SG_UF_IES": {"$eq": "MA"}}, STARTS),
+        ({"AN_BASE": {"$eq": "recente"}}, STARTS),
+        ({"AN_BASE": {"$lt": 2020.5}}, [2018, 2020]),
+        ({"AN_BASE": {"$gt": 2019.5}}, [2020, 2022]),
+        ({"AN_BASE": {"$gte": 2019.5}}, [2020, 2022]),
+        ({"AN_BASE": {"$lte": 2019.5}}, [2018]),
+        ({"AN_BASE": {"$eq": 2020.5}}, []),
+        ({"AN_BASE": {"$eq": 2021.0}}, [2020]),
+        ({"AN_BASE": {"$in": [2019.5, 2022.0]}}, [2022]),
+    ],
+)
+def test_route(where, expected):
+    assert route(where, STARTS, span=2) == expected
+
+
+def test_merge_results_orders_by_distance():
+    responses = [
+        {"ids": [["a", "b"]], "distances": [[0.1, 0.5]]},
+        {"ids": [["c"]], "distances": [[0.3]]},
+    ]
+
+    merged = merge_results(responses, n_results=2, include=["distances"])
+
+    assert merged == {"ids": [["a", "c"]], "distances": [[0.1, 0.3]]}
+
+
+def test_sharded_query_merges_routed_shards(sharded):
+    result = sharded.query(
+        query_texts=["consulta"],
+        n_results=3,
+        include=["metadatas", "distances"],
+    )
+    assert result["ids"] == [["2018", "2019", "2020"]]
+
+    result = sharded.query(
+        query_texts=["consulta"],
+        where={"AN_BASE": {"$gte": 2021}},
+        n_results=2,
+        include=["metadatas", "distances"],
+    )
+    assert result["ids"] == [["2021", "2022"]]
+    assert [m["AN_BASE"] for m in result["metadatas"][0]] == [2021, 2022]
+
+
+def test_sharded_query_without_matching_shards(sharded):
+    result = sharded.query(
+        query_embeddings=[[0.0, 0.0]],
+        where={"AN_BASE": 1990},
+        include=["distances"],
+    )
+
+    assert result == {"ids": [[]], "distances": [[]]}
+
+
+def test_sharded_count_and_get(sharded):
+    assert sharded.count() == 6  # noqa: PLR2004
+    response = sharded.get(ids=["2019", "2022"], include=["documents"])
+    assert sorted(response["documents"]) == ["resumo 2019", "resumo 2022"]
+
+
+def test_live_collection_opens_year_shards(chroma_client, sharded):
+    switch_alias(
+        chroma_client,
+        "thesis_capes_v1",
+        facet_index_path="f1",
+        year_shards="2018,2020,2022",
+        year_shard_span=2,
+    )
+    assert resolve_alias(chroma_client)["year_shards"] == STARTS
+
+    live = LiveCollection(
+        chroma_client,
+        chroma_client.get_collection,
+        lambda path: path,
+    )
+
+    assert isinstance(live.collection, ShardedCollection)
+    assert live.name == "thesis_capes_v1"
+    assert live.count() == 6  # noqa: PLR2004
+
+
+def test_garbage_collect_removes_year_shards(chroma_client, sharded):
+    chroma_client.create_collection("thesis_capes_v2")
+    switch_alias(chroma_client, "thesis_capes_v2")
+
+    removed = garbage_collect(chroma_client, keep=0)
+
+    assert removed == [
+        shard_collection_name("thesis_capes_v1", start) for start in STARTS
+    ]
+    assert list_versions(chroma_client) == [2]
+
+
+def test_sharded_collections_share_one_executor(sharded):
+    other = ShardedCollection("thesis_capes_v2", sharded.shards, span=2)
+
+    assert other._executor is sharded._executor is get_executor()
@@ -0,0 +1,86 @@
+import pandas as pd
+import pytest
+
+from src.schema import (
+    apply_schema,
+    concat_catalogs,
+    memory_usage,
+    validate_schema,
+)
+
+
+@pytest.fixture
+def catalog_file():
+    return pd.DataFrame(
+        {
+            "AN_BASE": [2020, 2020, 2021],
+            "CD_GRANDE_AREA_CONHECIMENTO": [10000003, 70000000, 10000003],
+            "SG_UF_IES": ["SP", "SP", "MG"],
+            "NM_GRAU_ACADEMICO": ["MESTRADO", "DOUTORADO", "MESTRADO"],
+            "NM_PRODUCAO": ["Título A", "Título B", "Título C"],
+            "DS_RESUMO": ["Resumo A", None, "Resumo C"],
+            "DT_TITULACAO": [
+                "16/04/2020 00:00:00",
+                None,
+                "01/12/2021 00:00:00",
+            ],
+            "NR_PAGINAS": [120.0, None, 98.0],
+        }
+    )
+
+
+def test_apply_schema_types(catalog_file):
+    result = apply_schema(catalog_file)
+
+    assert result["AN_BASE"].dtype == "Int16"
+    assert result["CD_GRANDE_AREA_CONHECIMENTO"].dtype == "Int32"
+    assert result["NR_PAGINAS"].dtype == "Int32"
+    assert result["NR_PAGINAS"].isna().sum() == 1
+    assert result["SG_UF_IES"].dtype == "category"
+    assert result["DS_RESUMO"].dtype == pd.StringDtype("pyarrow")
+    assert result["DT_TITULACAO"].iloc[0] == pd.Timestamp("2020-04-16")
+    assert pd.isna(result["DT_TITULACAO"].iloc[1])
+    validate_schema(result)
+
+
+def test_apply_schema_rejects_invalid_dates(catalog_file):
+    catalog_file.loc[0, "DT_TITULACAO"] = "2020-04-16"
+
+    with pytest.raises(ValueError, match="format"):
+        apply_schema(catalog_file)
+
+
+def test_apply_schema_saves_memory():
+    df = pd.DataFrame(
+        {
+            "AN_BASE": [2020] * 1000,
+            "NM_GRANDE_AREA_CONHECIMENTO": ["CIÊNCIAS HUMANAS"] * 1000,
+        }
+    ).astype({"NM_GRANDE_AREA_CONHECIMENTO": object})
+
+    assert memory_usage(apply_schema(df)) < memory_usage(df) / 4
+
+
+def test_concat_catalogs_keeps_categories(catalog_file):
+    other = catalog_file.assign(SG_UF_IES=["RJ", "BA", "RJ"])
+
+    result = concat_catalogs([apply_schema(catalog_file), apply_schema(other)])
+
+    assert result["SG_UF_IES"].dtype == "category"
+    assert set(result["SG_UF_IES"].cat.categories) == {"BA", "MG", "RJ", "SP"}
+    assert result["SG_UF_IES"].tolist() == ["SP", "SP", "MG", "RJ", "BA", "RJ"]
+
+
+def test_validate_schema_errors(catalog_file):
+    df = apply_schema(catalog_file)
+
+    with pytest.raises(ValueError, match="Missing"):
+        validate_schema(df.drop(columns="DS_RESUMO"))
+    with pytest.raises(ValueError, match="dtypes"):
+        validate_schema(df.astype({"SG_UF_IES": str}))
+    with pytest.raises(ValueError, match="AN_BASE"):
+        validate_schema(df.assign(AN_BASE=pd.array([2020, None, 2021])))
+    with pytest.raises(ValueError, match="out of range"):
+        validate_schema(
+            df.assign(AN_BASE=pd.array([2020, 1900, 2021], dtype="Int16"))
+        )
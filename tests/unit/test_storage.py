@@ -0,0 +1,204 @@
+from unittest.mock import MagicMock, patch
+
+import pandas as pd
+import pytest
+from botocore.exceptions import ClientError
+
+from src import storage
+
+
+@pytest.fixture
+def mock_s3_client():
+    client = MagicMock()
+    with patch("src.storage.get_s3_client", return_value=client):
+        yield client
+
+
+def test_split_s3_url():
+    assert storage.split_s3_url("s3://teses/data/raw/a.xlsx") == (
+        "teses",
+        "data/raw/a.xlsx",
+    )
+    assert storage.split_s3_url("s3://teses") == ("teses", "")
+
+
+@patch("src.storage.boto3.client")
+def test_get_s3_client_is_shared(mock_client):
+    with patch("src.storage._client", None):
+        first = storage.get_s3_client()
+        second = storage.get_s3_client()
+
+    assert first is second
+    mock_client.assert_called_once()
+
+
+def test_list_objects_reads_every_page(mock_s3_client):
+    pages = [
+        {"Contents": [{"Key": f"data/raw/{i}.xlsx"} for i in range(1000)]},
+        {"Contents": [{"Key": "data/raw/extra.xlsx"}, {"Key": "data/raw/x"}]},
+    ]
+    paginator = mock_s3_client.get_paginator.return_value
+    paginator.paginate.return_value = pages
+
+    files = storage.list_objects("s3://teses/data/raw", ".xlsx")
+
+    paginator.paginate.assert_called_once_with(
+        Bucket="teses", Prefix="data/raw/"
+    )
+    assert len(files) == 1001  # noqa: PLR2004
+    assert files[-1] == "s3://teses/data/raw/extra.xlsx"
+
+
+def test_upload_fileobj_uses_parallel_multipart(mock_s3_client):
+    fileobj = MagicMock()
+
+    storage.upload_fileobj(fileobj, "s3://teses/data/a.parquet")
+
+    args, kwargs = mock_s3_client.upload_fileobj.call_args
+    assert args == (fileobj, "teses", "data/a.parquet")
+    assert kwargs["Config"].max_concurrency == storage.MAX_CONCURRENCY
+
+
+@patch("src.storage.fsspec.open")
+def test_open_file_uses_block_cache_on_s3(mock_open):
+    storage.open_file("s3://teses/data/a.parquet")
+
+    mock_open.assert_called_once_with(
+        "blockcache::s3://teses/data/a.parquet",
+        "rb",
+        blockcache={"cache_storage": storage.CACHE_DIR},
+    )
+
+
+def test_parquet_roundtrip(tmp_path):
+    df = pd.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+    path = str(tmp_path / "a.parquet")
+
+    storage.write_parquet(df, path)
+
+    pd.testing.assert_frame_equal(
+        storage.read_parquet(path, columns=["b"]), df[["b"]]
+    )
+
+
+def test_write_parquet_uploads_to_s3(mock_s3_client):
+    storage.write_parquet(pd.DataFrame({"a": [1]}), "s3://teses/a.parquet")
+
+    args, _ = mock_s3_client.upload_fileobj.call_args
+    assert args[1:] == ("teses", "a.parquet")
+
+
+def test_fingerprint_changes_with_file(tmp_path):
+    path = tmp_path / "catalogo.parquet"
+    path.write_bytes(b"abc")
+    first = storage.fingerprint(str(path))
+
+    assert storage.fingerprint(str(path)) == first
+    path.write_bytes(b"abcd")
+    assert storage.fingerprint(str(path)) != first
+
+
+def test_fingerprint_s3_uses_etag(mock_s3_client):
+    mock_s3_client.head_object.return_value = {
+        "ETag": '"abc"',
+        "ContentLength": 3,
+    }
+    first = storage.fingerprint("s3://teses/catalogo.parquet")
+    mock_s3_client.head_object.return_value = {
+        "ETag": '"def"',
+        "ContentLength": 3,
+    }
+
+    assert storage.fingerprint("s3://teses/catalogo.parquet") != first
+    mock_s3_client.head_object.assert_called_with(
+        Bucket="teses", Key="catalogo.parquet"
+    )
+
+
+def test_handoff_path():
+    path = storage.handoff_path("data/.handoff", "preprocess", "abc", 1)
+
+    assert path.startswith("data/.handoff/preprocess-")
+    assert path.endswith(".arrow")
+    assert path == storage.handoff_path(
+        "data/.handoff", "preprocess", "abc", 1
+    )
+    assert path != storage.handoff_path(
+        "data/.handoff", "preprocess", "abd", 1
+    )
+
+
+def test_write_and_read_arrow(tmp_path):
+    df = pd.DataFrame(
+        {
+            "AN_BASE": pd.array([2020, 2021], dtype="Int16"),
+            "SG_UF_IES": pd.Series(["SP", "RJ"], dtype="category"),
+            "DS_RESUMO": ["a", "b"],
+        }
+    )
+    path = storage.write_arrow(df, str(tmp_path / "stage" / "df.arrow"))
+
+    result = storage.read_arrow(path)
+    pd.testing.assert_frame_equal(result, df)
+    assert list(storage.read_arrow(path, columns=["DS_RESUMO"])) == [
+        "DS_RESUMO"
+    ]
+    assert list(tmp_path.joinpath("stage").iterdir()) == [
+        tmp_path / "stage" / "df.arrow"
+    ]
+
+
+def test_checkpoint_dir(tmp_path):
+    path = storage.checkpoint_dir(str(tmp_path), "index", "abc")
+
+    assert (tmp_path / path.rsplit("/", 1)[1]).is_dir()
+    assert path.rsplit("/", 1)[1].startswith("index-")
+    assert path == storage.checkpoint_dir(str(tmp_path), "index", "abc")
+    assert path != storage.checkpoint_dir(str(tmp_path), "index", "abd")
+
+
+def test_fingerprint_directory_tracks_member_files(tmp_path):
+    dataset = tmp_path / "catalogo"
+    (dataset / "AN_BASE=2020").mkdir(parents=True)
+    member = dataset / "AN_BASE=2020" / "part-0.parquet"
+    member.write_bytes(b"abc")
+    first = storage.fingerprint(str(dataset))
+
+    assert storage.fingerprint(str(dataset)) == first
+    member.write_bytes(b"abcd")
+    second = storage.fingerprint(str(dataset))
+    assert second != first
+    (dataset / "part-1.parquet").write_bytes(b"abc")
+    assert storage.fingerprint(str(dataset)) not in {first, second}
+
+
+def test_fingerprint_s3_prefix_lists_objects(mock_s3_client):
+    mock_s3_client.head_object.side_effect = ClientError(
+        {"Error": {"Code": "404"}}, "HeadObject"
+    )
+    paginator = mock_s3_client.get_paginator.return_value
+    contents = [
+        {"Key": "catalogo/part-1.parquet", "Size": 3, "ETag": '"b"'},
+        {"Key": "catalogo/part-0.parquet", "Size": 3, "ETag": '"a"'},
+    ]
+    paginator.paginate.return_value = [{"Contents": contents}]
+    first = storage.fingerprint("s3://teses/catalogo")
+
+    # A ordem da listagem não altera a impressão digital.
+    paginator.paginate.return_value = [{"Contents": contents[::-1]}]
+    assert storage.fingerprint("s3://teses/catalogo") == first
+    contents[0] = {**contents[0], "ETag": '"c"'}
+    paginator.paginate.return_value = [{"Contents": contents}]
+    assert storage.fingerprint("s3://teses/catalogo") != first
+    paginator.paginate.assert_called_with(Bucket="teses", Prefix="catalogo/")
+
+
+def test_fingerprint_missing_s3_prefix(mock_s3_client):
+    mock_s3_client.head_object.side_effect = ClientError(
+        {"Error": {"Code": "404"}}, "HeadObject"
+    )
+    paginator = mock_s3_client.get_paginator.return_value
+    paginator.paginate.return_value = [{}]
+
+    with pytest.raises(FileNotFoundError):
+        storage.fingerprint("s3://teses/catalogo")
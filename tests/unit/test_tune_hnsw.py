@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from src.tune_hnsw import evaluate, exact_neighbors, recall_at_k
+
+# Recall mínimo esperado do índice avaliado, com `hnsw:search_ef` alto.
+MIN_RECALL = 0.9
+SEARCH_EF = 100
+
+
+@pytest.mark.parametrize("space", ["l2", "cosine", "ip"])
+def test_exact_neighbors_matches_full_sort(space):
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(300, 8)).astype(np.float32)
+    queries = rng.normal(size=(5, 8)).astype(np.float32)
+
+    neighbors = exact_neighbors(data, queries, k=4, space=space)
+
+    if space == "l2":
+        distances = ((queries[:, None] - data[None]) ** 2).sum(axis=2)
+    elif space == "cosine":
+        normalized = data / np.linalg.norm(data, axis=1, keepdims=True)
+        distances = -(queries @ normalized.T)
+    else:
+        distances = -(queries @ data.T)
+    np.testing.assert_array_equal(neighbors, distances.argsort(axis=1)[:, :4])
+
+
+def test_recall_at_k():
+    assert recall_at_k([["a", "b"], ["c", "x"]], [["a", "b"], ["c", "d"]]) == (
+        pytest.approx(0.75)
+    )
+
+
+def test_evaluate_reports_recall_and_costs():
+    rng = np.random.default_rng(1)
+    data = rng.normal(size=(200, 8)).astype(np.float32)
+    queries = rng.normal(size=(10, 8)).astype(np.float32)
+    ids = [f"doc-{i}" for i in range(len(data))]
+    truth = [
+        [ids[i] for i in row] for row in exact_neighbors(data, queries, 5)
+    ]
+
+    result = evaluate(
+        ids,
+        data,
+        queries,
+        truth,
+        metadata={"hnsw:space": "l2", "hnsw:search_ef": SEARCH_EF},
+        k=5,
+    )
+
+    assert result["recall@5"] > MIN_RECALL
+    assert result["search_ef"] == SEARCH_EF
+    assert result["index_mb"] > 0
+    assert result["build_s"] > 0